@@ -0,0 +1,125 @@
+"""Contention benchmark for ConcurrentDictAnyKey.
+
+Runs a read mostly workload (80% get, 15% set, 5% get_or_compute) over
+hashable and unhashable keys with 1 to 32 threads, and compares:
+    striped: ConcurrentDictAnyKey with 16 stripes
+    one lock: ConcurrentDictAnyKey with 1 stripe
+    DictAnyKey + Lock: a DictAnyKey behind one threading.Lock
+
+Usage: python benchmarks/concurrent_contention.py [--ops N] [--keys N]
+
+On a build with the GIL, threads don't run Python code in parallel and
+throughput stays flat; on a free-threaded build (3.13t) striped reads
+and writes on different keys scale with the threads.
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from dictanykey import ConcurrentDictAnyKey, DictAnyKey
+
+THREADS = (1, 2, 4, 8, 16, 32)
+
+
+class LockedDictAnyKey:
+    """A DictAnyKey behind one lock, offering the benchmarked methods."""
+
+    def __init__(self) -> None:
+        self.data = DictAnyKey()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.data.get(key, default)
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.data[key] = value
+
+    def get_or_compute(self, key, func):
+        with self.lock:
+            value = self.data.get(key, None)
+            if value is None:
+                value = self.data[key] = func(key)
+            return value
+
+
+def make_keys(count: int) -> list:
+    keys: list = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            keys.append(i)
+        elif kind == 1:
+            keys.append(f"key-{i}")
+        elif kind == 2:
+            keys.append([i, "list"])
+        else:
+            keys.append({"id": i})
+    return keys
+
+
+def worker(table, keys: list, ops: int, seed: int, barrier: threading.Barrier) -> None:
+    rng = random.Random(seed)
+    picks = [rng.choice(keys) for _ in range(ops)]
+    rolls = [rng.random() for _ in range(ops)]
+    barrier.wait()
+    for key, roll in zip(picks, rolls):
+        if roll < 0.8:
+            table.get(key)
+        elif roll < 0.95:
+            table[key] = roll
+        else:
+            table.get_or_compute(key, len_or_zero)
+
+
+def len_or_zero(key) -> int:
+    try:
+        return len(key)
+    except TypeError:
+        return 0
+
+
+def run(factory, keys: list, threads: int, ops: int) -> float:
+    """Return total operations per second."""
+    table = factory()
+    for key in keys[::2]:
+        table[key] = 0
+    barrier = threading.Barrier(threads + 1)
+    workers = [
+        threading.Thread(target=worker, args=(table, keys, ops, n, barrier))
+        for n in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=20_000, help="operations per thread")
+    parser.add_argument("--keys", type=int, default=10_000, help="distinct keys")
+    args = parser.parse_args()
+    keys = make_keys(args.keys)
+    tables = {
+        "striped": lambda: ConcurrentDictAnyKey(stripes=16),
+        "one lock": lambda: ConcurrentDictAnyKey(stripes=1),
+        "DictAnyKey + Lock": LockedDictAnyKey,
+    }
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    print("threads" + "".join(f"{name:>20}" for name in tables) + "   (ops/s)")
+    for threads in THREADS:
+        row = [run(factory, keys, threads, args.ops) for factory in tables.values()]
+        print(f"{threads:>7}" + "".join(f"{ops:>20,.0f}" for ops in row))
+
+
+if __name__ == "__main__":
+    main()
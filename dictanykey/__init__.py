@@ -1,6 +1,34 @@
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+from dictanykey.concurrent_dictanykey import ConcurrentDictAnyKey
+from dictanykey.counts import CountsAnyKey, value_counts
 from dictanykey.default_dictanykey import DefaultDictAnyKey
 from dictanykey.dictanykey import DictAnyKey
+from dictanykey.fingerprints import register_key_adapter, unregister_key_adapter
 from dictanykey.frozen_dictanykey import FrozenDictAnyKey
-from dictanykey.counts import value_counts
+from dictanykey.hamt import HamtDictAnyKey
+from dictanykey.lru_dictanykey import LRUDictAnyKey
+from dictanykey.memoize import memoize_anykey
+from dictanykey.setanykey import SetAnyKey
+from dictanykey.snapshot import SnapshotDictAnyKey
+
+if TYPE_CHECKING:
+    from dictanykey.persistent import PersistentDictAnyKey
+    from dictanykey.shared import SharedDictAnyKey
 
 __version__ = "0.1.3"
+
+# imported on first use, so that importing dictanykey doesn't load
+# sqlite3, or multiprocessing.shared_memory and mmap
+_LAZY = {
+    "PersistentDictAnyKey": "dictanykey.persistent",
+    "SharedDictAnyKey": "dictanykey.shared",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'dictanykey' has no attribute {name!r}")
+    return getattr(import_module(module), name)
@@ -0,0 +1,332 @@
+from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping
+from threading import Lock
+from typing import Any, Optional, Union
+
+from dictanykey.dictanykey import DictAnyKey, peek_value
+from dictanykey.fingerprints import fingerprint
+from dictanykey.iterables import MISSING, DictItems, DictKeys, DictValues
+from dictanykey.iterators import DictKeyIterator
+from dictanykey.utils import quote_string
+
+
+class _AllLocks:
+    """Context manager holding every lock of locks, taken in order."""
+
+    __slots__ = ("locks",)
+
+    def __init__(self, locks: tuple[Lock, ...]) -> None:
+        self.locks = locks
+
+    def __enter__(self) -> None:
+        for lock in self.locks:
+            lock.acquire()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        for lock in reversed(self.locks):
+            lock.release()
+
+
+class ConcurrentDictAnyKey(MutableMapping[Any, Any]):
+    """A thread safe dictionary where the keys don't need to be hashable.
+
+    Keys are indexed by stripe: each stripe is a DictAnyKey from key to
+    entry number, guarded by its own lock in _locks. Hashable keys are
+    striped by hash and unhashable keys by the hash of their fingerprint,
+    so equal keys always share a stripe and threads using keys of
+    different stripes don't wait for each other.
+    Unhashable keys without a fingerprint could equal keys of any
+    stripe: they are indexed in _loose, and operations on them hold
+    every stripe lock.
+
+    Stores items in insertion order in _entries: dict,
+    entry number -> (key, value), written to under _order_lock.
+
+    Each method is atomic, including setdefault, get_or_compute and
+    update_if. update() is atomic per item. Iterating reads a snapshot
+    of the items, so it never raises RuntimeError.
+    """
+
+    __slots__ = (
+        "_stripes",
+        "_locks",
+        "_all_locks",
+        "_loose",
+        "_entries",
+        "_order_lock",
+        "_next",
+        "_version",
+    )
+
+    def __init__(
+        self, data: Optional[Union[Iterable, Mapping]] = None, stripes: int = 16
+    ) -> None:
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self._stripes = tuple(DictAnyKey() for _ in range(stripes))
+        self._locks = tuple(Lock() for _ in range(stripes))
+        self._all_locks = _AllLocks(self._locks)
+        self._loose = DictAnyKey()
+        self._entries: dict[int, tuple[Any, Any]] = {}
+        self._order_lock = Lock()
+        self._next = 0
+        # never bumped: iterators read a snapshot
+        self._version = 0
+        self.update(data)
+
+    def _stripe(self, key: Any) -> int:
+        """Return the stripe of key, or -1 for keys indexed in _loose."""
+        try:
+            h = hash(key)
+        except TypeError:
+            try:
+                h = hash(fingerprint(key))
+            except TypeError:
+                return -1
+        return h % len(self._locks)
+
+    def _locked(self, stripe: int) -> Any:
+        """Return the lock guarding the keys of stripe."""
+        if stripe < 0:
+            return self._all_locks
+        return self._locks[stripe]
+
+    def _find(self, key: Any, stripe: int) -> tuple[Optional[DictAnyKey], int]:
+        """Return the index holding key and its entry number, or (None, -1).
+        Call holding the lock of stripe.
+        """
+        if stripe >= 0:
+            index = self._stripes[stripe]
+            number = index.get(key, -1)
+            if number >= 0:
+                return index, number
+            # _loose only changes under every lock, so it can be read
+            if self._loose:
+                number = self._loose.get(key, -1)
+                if number >= 0:
+                    return self._loose, number
+            return None, -1
+        for index in (self._loose, *self._stripes):
+            number = index.get(key, -1)
+            if number >= 0:
+                return index, number
+        return None, -1
+
+    def _add(self, key: Any, value: Any, stripe: int) -> None:
+        """Append a new item. Call holding the lock of stripe."""
+        with self._order_lock:
+            number = self._next
+            self._next += 1
+            self._entries[number] = (key, value)
+        if stripe < 0:
+            self._loose[key] = number
+        else:
+            self._stripes[stripe][key] = number
+
+    def _set(self, number: int, value: Any) -> None:
+        """Replace the value of entry number, keeping its original key."""
+        with self._order_lock:
+            self._entries[number] = (self._entries[number][0], value)
+
+    def _remove(self, index: DictAnyKey, key: Any, number: int) -> tuple[Any, Any]:
+        """Remove the entry of key and return its item."""
+        del index[key]
+        with self._order_lock:
+            return self._entries.pop(number)
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: Any, default: Optional[Any] = None) -> Any:
+        """Return the value for key if key is in the dictionary, else default."""
+        stripe = self._stripe(key)
+        with self._locked(stripe):
+            number = self._find(key, stripe)[1]
+            if number < 0:
+                return default
+            return self._entries[number][1]
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        stripe = self._stripe(key)
+        with self._locked(stripe):
+            number = self._find(key, stripe)[1]
+            if number < 0:
+                self._add(key, value, stripe)
+            else:
+                self._set(number, value)
+
+    def __delitem__(self, key: Any) -> None:
+        stripe = self._stripe(key)
+        with self._locked(stripe):
+            index, number = self._find(key, stripe)
+            if index is None:
+                raise KeyError(key)
+            self._remove(index, key, number)
+
+    def pop(self, key: Any, default: Any = MISSING) -> Any:
+        """Remove key and return its value.
+
+        If key is not found, default is returned if given, otherwise KeyError is raised
+        """
+        stripe = self._stripe(key)
+        with self._locked(stripe):
+            index, number = self._find(key, stripe)
+            if index is None:
+                if default is MISSING:
+                    raise KeyError(key)
+                return default
+            return self._remove(index, key, number)[1]
+
+    def popitem(self) -> tuple[Any, Any]:
+        """Remove and return a (key, value) pair as a 2-tuple.
+
+        Pairs are returned in LIFO (last-in, first-out) order.
+        Raises KeyError if the dict is empty.
+        """
+        while True:
+            with self._order_lock:
+                if not self._entries:
+                    raise KeyError("popitem(): dictionary is empty")
+                last = next(reversed(self._entries))
+                key = self._entries[last][0]
+            stripe = self._stripe(key)
+            with self._locked(stripe):
+                index, number = self._find(key, stripe)
+                # retry if another thread removed the item meanwhile
+                if number == last:
+                    return self._remove(index, key, number)  # type: ignore
+
+    def setdefault(self, key: Any, default: Optional[Any] = None) -> Any:
+        """Insert key with a value of default if key is not in the dictionary.
+
+        Return the value for key if key is in the dictionary, else default.
+        """
+        stripe = self._stripe(key)
+        with self._locked(stripe):
+            number = self._find(key, stripe)[1]
+            if number >= 0:
+                return self._entries[number][1]
+            self._add(key, default, stripe)
+            return default
+
+    def get_or_compute(self, key: Any, func: Callable[[Any], Any]) -> Any:
+        """Return the value for key, inserting func(key) first if key is
+        not in the dictionary. func is called at most once per missing
+        key, even when threads ask for the same key at the same time.
+
+        func runs holding a lock: it must not use this dictionary.
+        """
+        stripe = self._stripe(key)
+        with self._locked(stripe):
+            number = self._find(key, stripe)[1]
+            if number >= 0:
+                return self._entries[number][1]
+            value = func(key)
+            self._add(key, value, stripe)
+            return value
+
+    def update_if(self, key: Any, value: Any, condition: Callable[[Any], bool]) -> bool:
+        """Set the value for key to value if key is in the dictionary and
+        condition(current value) is true.
+
+        Return True if the value was set.
+        condition runs holding a lock: it must not use this dictionary.
+        """
+        stripe = self._stripe(key)
+        with self._locked(stripe):
+            number = self._find(key, stripe)[1]
+            if number < 0 or not condition(self._entries[number][1]):
+                return False
+            self._set(number, value)
+            return True
+
+    def update(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:  # type: ignore
+        """Update dict from dict/iterable data, one item at a time.
+        If data is present and has a .keys() method, then does:  for k in data: self[k] = data[k]
+        If data is present and lacks a .keys() method, then does:  for k, v in data: self[k] = v
+        """
+        if data is None:
+            return
+        if isinstance(data, Mapping):
+            for key in data.keys():
+                self[key] = data[key]
+        else:
+            for key, value in data:
+                self[key] = value
+
+    def clear(self) -> None:
+        """Remove all items from self."""
+        with self._all_locks:
+            for index in (self._loose, *self._stripes):
+                index.clear()
+            with self._order_lock:
+                self._entries.clear()
+
+    def copy(self) -> "ConcurrentDictAnyKey":
+        """Return a shallow copy of a snapshot of self."""
+        return type(self)(self._get_items_list(), stripes=len(self._locks))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator:
+        return DictKeyIterator(self)
+
+    def keys(self) -> DictKeys:  # type: ignore
+        return DictKeys(self)
+
+    def values(self) -> DictValues:  # type: ignore
+        return DictValues(self)
+
+    def items(self) -> DictItems:  # type: ignore
+        return DictItems(self)
+
+    def _get_items_list(self) -> list[tuple[Any, Any]]:
+        with self._order_lock:
+            return list(self._entries.values())
+
+    def _get_keys_list(self) -> list[Any]:
+        return [key for key, _ in self._get_items_list()]
+
+    def _get_values_list(self) -> list[Any]:
+        return [value for _, value in self._get_items_list()]
+
+    def _iter_keys(self) -> Iterator[Any]:
+        return iter(self._get_keys_list())
+
+    def _iter_values(self) -> Iterator[Any]:
+        return iter(self._get_values_list())
+
+    def _iter_items(self) -> Iterator[tuple[Any, Any]]:
+        return iter(self._get_items_list())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return False
+        items = self._get_items_list()
+        if len(items) != len(other):
+            return False
+        for key, value in items:
+            other_value = peek_value(other, key)
+            if other_value is MISSING or value != other_value:
+                return False
+        return True
+
+    def __reduce__(self) -> tuple:
+        # locks can't be pickled: rebuild from a snapshot of the items
+        return (type(self), (self._get_items_list(), len(self._locks)))
+
+    def __str__(self) -> str:
+        s = ", ".join(
+            f"{quote_string(key)}: {quote_string(value)}"
+            for key, value in self._get_items_list()
+        )
+        return "{" + f"{s}" + "}"
+
+    def __repr__(self) -> str:
+        return f"ConcurrentDictAnyKey({self._get_items_list()})"
@@ -1,16 +1,217 @@
-from collections.abc import Iterable
-from typing import Any
+import sys
+from collections import Counter, deque
+from collections.abc import Iterable, Iterator, Mapping
+from heapq import nlargest
+from itertools import chain, compress, islice
+from operator import add, itemgetter, sub
+from typing import Any, Callable, Optional, Union
 
-from dictanykey.default_dictanykey import DefaultDictAnyKey
-from dictanykey.dictanykey import DictAnyKey
+from dictanykey.dictanykey import HASHABLE, DictAnyKey
+from dictanykey.unhashmap import UnHashMap
+
+# values handed to Counter at a time
+CHUNK_SIZE = 4096
+# array dtype kinds counted with NumPy: bool, int, uint, float, str, bytes
+_VECTOR_KINDS = frozenset("biufUS")
+# largest int range counted with bincount instead of sorting
+_BINCOUNT_SPAN = 1 << 22
+
+
+class CountsAnyKey(DictAnyKey):
+    """A DictAnyKey that counts values, like collections.Counter.
+    Values can be unhashable, like the keys of DictAnyKey.
+
+    CountsAnyKey(iterable) counts the values of iterable,
+    CountsAnyKey(mapping) adds up the counts in mapping.
+    Missing values have a count of zero.
+
+    Counting updates each distinct value with a single probe, and
+    CountsAnyKeys are merged partition by partition: shared hashable
+    values are found with native set operations and new values are
+    appended without probing the index again.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: Any) -> Any:
+        slot, _ = self._lookup(key)
+        if slot < 0:
+            return 0
+        return self._values[slot]
+
+    def __delitem__(self, key: Any) -> None:
+        """Like dict.__delitem__() but does not raise KeyError for missing values."""
+        slot, probe = self._lookup(key)
+        if slot >= 0:
+            self._delete(key, slot, probe)
+
+    def __repr__(self) -> str:
+        items = [(key, value) for key, value in self._get_items_list()]
+        return f"CountsAnyKey(DictAnyKey({items}))"
+
+    def total(self) -> int:
+        """Sum of the counts."""
+        return sum(self._iter_values())
+
+    def update(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:  # type: ignore
+        """Add counts from a mapping of counts, or count the values of an iterable."""
+        self._count(data, add)
+
+    def subtract(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:
+        """Subtract counts from a mapping of counts, or subtract one for
+        each value of an iterable. Counts can go to zero or below.
+        """
+        self._count(data, sub)
+
+    def _count(
+        self,
+        data: Optional[Union[Iterable, Mapping]],
+        combine: Callable[[Any, Any], Any],
+    ) -> None:
+        if data is None:
+            return
+        if isinstance(data, CountsAnyKey):
+            self._merge(data, combine)
+            return
+        if isinstance(data, Mapping):
+            pairs: Iterable[tuple[Any, Any]] = [(k, data[k]) for k in data.keys()]
+        else:
+            array_counts = _iter_array_counts(data)
+            pairs = _iter_counts(data) if array_counts is None else array_counts
+        if not self and combine is add:
+            DictAnyKey.update_many(self, pairs)
+            return
+        for key, count in pairs:
+            slot, probe = self._lookup(key)
+            if slot < 0:
+                self._insert(key, combine(0, count), probe)
+            else:
+                if self._shared:
+                    self._own("_values")
+                self._values[slot] = combine(self._values[slot], count)
+
+    def _merge(self, other: "CountsAnyKey", combine: Callable[[Any, Any], Any]) -> None:
+        """Combine the counts of other into self, partition by partition.
+        Values missing from self are appended in the order of other.
+        """
+        if self._shared:
+            self._own("_values")
+        hashmap = self._hashmap
+        values = self._values
+        other_hashmap = other._hashmap
+        other_keys = other._keys
+        other_values = other._values
+        shared = other_hashmap.keys() & hashmap.keys() if hashmap else ()
+        for key in shared:
+            slot = hashmap[key]
+            values[slot] = combine(values[slot], other_values[other_hashmap[key]])
+        if shared:
+            new_hashable = other_hashmap.keys() - shared
+            new_slots = sorted(map(other_hashmap.__getitem__, new_hashable))
+        else:
+            new_slots = sorted(other_hashmap.values())
+        # other slot -> probe of self, for unhashable values missing from self
+        missing: dict[int, Any] = {}
+        other_unhashmap = other._unhashmap
+        unhashable = () if other_unhashmap is None else other_unhashmap._iter_items()
+        for key, other_slot in unhashable:
+            slot, probe = self._lookup_unhashable(key)
+            if slot < 0:
+                missing[other_slot] = probe
+            else:
+                values[slot] = combine(values[slot], other_values[other_slot])
+        if missing:
+            new_slots = sorted(chain(new_slots, missing))
+        if not new_slots:
+            return
+        if self._shared:
+            if missing:
+                self._own("_hashmap", "_keys", "_unhashmap")
+            else:
+                self._own("_hashmap", "_keys")
+            hashmap = self._hashmap
+        start = len(self._keys)
+        new_keys = list(map(other_keys.__getitem__, new_slots))
+        self._keys.extend(new_keys)
+        values.extend(combine(0, other_values[slot]) for slot in new_slots)
+        if missing:
+            slots = range(start, start + len(new_keys))
+            for slot, key, other_slot in zip(slots, new_keys, new_slots):
+                probe = missing.get(other_slot, HASHABLE)
+                if probe is HASHABLE:
+                    hashmap[key] = slot
+                else:
+                    if self._unhashmap is None:
+                        self._unhashmap = UnHashMap()
+                    self._unhashmap._insert(key, slot, probe)
+        else:
+            hashmap.update(zip(new_keys, range(start, start + len(new_keys))))
+        self._version += 1
+
+    def _positive(self) -> "CountsAnyKey":
+        """Return self without the values whose count is zero or below."""
+        if all(count > 0 for count in self._iter_values()):
+            return self
+        return type(self).from_pairs(
+            (key, count) for key, count in self._iter_items() if count > 0
+        )
+
+    def __add__(self, other: Any) -> "CountsAnyKey":
+        """Add counts, keeping only positive counts."""
+        if not isinstance(other, CountsAnyKey):
+            return NotImplemented
+        result = self.copy()
+        result._merge(other, add)
+        return result._positive()
+
+    def __sub__(self, other: Any) -> "CountsAnyKey":
+        """Subtract counts, keeping only positive counts."""
+        if not isinstance(other, CountsAnyKey):
+            return NotImplemented
+        result = self.copy()
+        result._merge(other, sub)
+        return result._positive()
+
+    def __or__(self, other: Any) -> "CountsAnyKey":
+        """Maximum of counts, keeping only positive counts."""
+        if not isinstance(other, CountsAnyKey):
+            return NotImplemented
+        result = self.copy()
+        result._merge(other, max)
+        return result._positive()
+
+    def __and__(self, other: Any) -> "CountsAnyKey":
+        """Minimum of counts, keeping only positive counts."""
+        if not isinstance(other, CountsAnyKey):
+            return NotImplemented
+        pairs = []
+        for key, count in self._iter_items():
+            count = min(count, other[key])
+            if count > 0:
+                pairs.append((key, count))
+        return type(self).from_pairs(pairs)
+
+    def most_common(self, n: Optional[int] = None) -> list[tuple[Any, int]]:
+        """List the n most common values and their counts, most common first.
+        Values with equal counts keep insertion order. If n is None, list
+        all values. Picks the n values with a heap, in O(len(self) log n).
+        """
+        if n is None:
+            return sorted(self._iter_items(), key=itemgetter(1), reverse=True)
+        return nlargest(n, self._iter_items(), key=itemgetter(1))
 
 
 def value_counts(
-    values: Iterable[Any], sort: bool = True, ascending: bool = True
-) -> DictAnyKey:
+    values: Iterable[Any],
+    sort: bool = True,
+    ascending: bool = True,
+    top: Optional[int] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 100_000,
+) -> CountsAnyKey:
     """
     Count up each value.
-    Return a DictAnyKey[value] -> count
+    Return a CountsAnyKey[value] -> count
     Allows for unhashable values.
 
     Parameters
@@ -19,29 +220,266 @@ def value_counts(
         values to be counted up
     sort : default True, sort results by counts
     ascending: default False, sort highest to lowest
+    top : default None, only keep the top most common values.
+        They are picked with a heap, without sorting every value.
+    workers : default None, count chunks of values in this many processes.
+        Values must be picklable. The result is the same as counting
+        in this process. Arrays are always counted in this process.
+    chunksize : default 100_000, values per chunk sent to a worker
 
 
     Returns
     -------
-    DictAnyKey[Any, int]
+    CountsAnyKey[Any, int]
         {value: value_count}
 
     Example
     -------
     >>> values = [4, 1, 1, 4, 5, 1]
     >>> value_counts(values)
-    DictAnyKey((1, 3), (4, 2), (5, 1))
-    """
-    d = DefaultDictAnyKey(int)
-    for value in values:
-        d[value] += 1
-    if sort:
-        return DictAnyKey(
-            sorted(
-                d.items(),
-                key=lambda item: item[1],
-                reverse=not ascending,
-            )
-        )
-    else:
-        return DictAnyKey(d)
+    CountsAnyKey(DictAnyKey([(5, 1), (4, 2), (1, 3)]))
+    >>> value_counts(values, top=1)
+    CountsAnyKey(DictAnyKey([(1, 3)]))
+    """
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be at least 1")
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    pairs: Optional[Iterable[tuple[Any, int]]] = _iter_array_counts(values)
+    if pairs is None and workers is not None and workers > 1:
+        pairs = _iter_parallel_counts(values, workers, chunksize)
+    elif pairs is None:
+        pairs = _iter_counts(values)
+    if top is not None and not sort:
+        ranked = nlargest(top, enumerate(pairs), key=_ranked_count)
+        ranked.sort(key=itemgetter(0))
+        pairs = [pair for _, pair in ranked]
+    elif top is not None:
+        # most common first, ties in first seen order
+        pairs = nlargest(top, pairs, key=itemgetter(1))
+        if ascending:
+            pairs.sort(key=itemgetter(1))
+    elif sort:
+        pairs = sorted(pairs, key=itemgetter(1), reverse=not ascending)
+    return CountsAnyKey.from_pairs(pairs)
+
+
+class _Tally:
+    """Counts in first seen order.
+    Hashable values are counted in a Counter: counter
+    Unhashable values are counted in a DictAnyKey: unhashable
+    Each unhashable value remembers len(counter) when it was first
+    seen in positions, to merge both back in first seen order.
+    """
+
+    def __init__(self) -> None:
+        self.counter: Counter = Counter()
+        self.unhashable = DictAnyKey()
+        self.positions: list[int] = []
+
+    def add_unhashable(self, value: Any, count: int = 1) -> None:
+        unhashable = self.unhashable
+        slot, probe = unhashable._lookup(value)
+        if slot < 0:
+            unhashable._insert(value, count, probe)
+            self.positions.append(len(self.counter))
+        else:
+            unhashable._values[slot] += count
+
+    def add_values(self, chunk: list[Any]) -> None:
+        """Count each value in chunk.
+        The runs of hashable values between unhashable ones are fed to
+        the Counter, which counts them in C.
+        """
+        counter = self.counter
+        start = 0
+        for stop in chain(_unhashable_indexes(chunk), (len(chunk),)):
+            while start < stop:
+                try:
+                    counter.update(islice(chunk, start, stop))
+                    break
+                except TypeError:
+                    # Counter stopped at a value of a hashable type,
+                    # such as a tuple, holding unhashable items
+                    start = _first_unhashable(chunk, start, stop)
+                    if start < 0:
+                        raise
+                    self.add_unhashable(chunk[start])
+                    start += 1
+            if stop < len(chunk):
+                self.add_unhashable(chunk[stop])
+            start = stop + 1
+
+    def add_pairs(self, pairs: Iterable[tuple[Any, int]]) -> None:
+        """Add (value, count) pairs, such as the counts of a later chunk."""
+        counter = self.counter
+        for value, count in pairs:
+            try:
+                counter[value] += count
+            except TypeError:
+                self.add_unhashable(value, count)
+
+    def __iter__(self) -> Iterator[tuple[Any, int]]:
+        """Yield (value, count) pairs in first seen order."""
+        if not self.positions:
+            yield from self.counter.items()
+            return
+        hashable = iter(self.counter.items())
+        start = 0
+        for position, item in zip(self.positions, self.unhashable._iter_items()):
+            yield from islice(hashable, position - start)
+            yield item
+            start = position
+        yield from hashable
+
+
+def _chunks(values: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    iterator = iter(values)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_counts(values: Iterable[Any]) -> Iterator[tuple[Any, int]]:
+    """Count up each value, yielding (value, count) pairs in first seen order."""
+    tally = _Tally()
+    for chunk in _chunks(values, CHUNK_SIZE):
+        tally.add_values(chunk)
+    return iter(tally)
+
+
+def _count_chunk(chunk: list[Any]) -> list[tuple[Any, int]]:
+    """Count up one chunk in a worker process."""
+    return list(_iter_counts(chunk))
+
+
+def _iter_parallel_counts(
+    values: Iterable[Any], workers: int, chunksize: int
+) -> Iterator[tuple[Any, int]]:
+    """Count up chunks of values in a process pool, yielding (value, count)
+    pairs in first seen order. Partial counts are merged in chunk order,
+    so the result is the same as counting serially. At most two chunks
+    per worker are in flight, so values is read lazily.
+    """
+    # imported here: it loads multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    tally = _Tally()
+    pending: deque = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(values, chunksize):
+            pending.append(pool.submit(_count_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                tally.add_pairs(pending.popleft().result())
+        while pending:
+            tally.add_pairs(pending.popleft().result())
+    return iter(tally)
+
+
+def _as_array(values: Any) -> Any:
+    """Return values as a NumPy array if it is an ndarray, or supports the
+    buffer protocol and NumPy is installed. Otherwise return None.
+    NumPy is only imported for buffer inputs. ndarray subclasses, such as
+    masked arrays, return None: their buffer may not hold their values.
+    """
+    loaded = sys.modules.get("numpy")
+    if loaded is not None and isinstance(values, loaded.ndarray):
+        return values if type(values) is loaded.ndarray else None
+    try:
+        view = memoryview(values)
+    except TypeError:
+        return None
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy.asarray(view)
+
+
+def _iter_array_counts(values: Any) -> Optional[Iterator[tuple[Any, int]]]:
+    """Count up the values of an array with NumPy, yielding (value, count)
+    pairs in first seen order. Items of 1-D arrays are counted as Python
+    scalars; rows of N-D arrays are counted as arrays.
+    Returns None for inputs that are not arrays, or whose dtype NumPy
+    can't count the same way as value_counts (object, datetime, records).
+    1-D float arrays holding NaN are counted by iterating their items:
+    numpy.unique counts all NaNs together, value_counts counts each one
+    apart as nan != nan.
+    """
+    array = _as_array(values)
+    if array is None or array.ndim == 0 or array.dtype.kind not in _VECTOR_KINDS:
+        return None
+    numpy = sys.modules["numpy"]
+    if len(array) == 0:
+        return iter(())
+    if array.ndim == 1:
+        if array.dtype.kind == "f" and numpy.isnan(array).any():
+            return _iter_counts(array.tolist())
+        uniques, first, counts = _unique_with_first(numpy, array)
+        order = numpy.argsort(first)
+        return zip(uniques[order].tolist(), counts[order].tolist())
+    rows = array.reshape(len(array), -1)
+    _, first, counts = _unique_with_first(numpy, rows)
+    order = numpy.argsort(first)
+    return zip(
+        (array[index] for index in first[order].tolist()), counts[order].tolist()
+    )
+
+
+def _unique_with_first(numpy: Any, array: Any) -> tuple[Any, Any, Any]:
+    """Return the unique items (or rows) of array, the index where each is
+    first seen, and their counts. Ints in a small range are counted with
+    bincount, everything else is sorted by numpy.unique.
+    """
+    size = len(array)
+    if array.ndim == 1 and array.dtype.kind in "biu":
+        codes = array.view(numpy.uint8) if array.dtype.kind == "b" else array
+        low, high = int(codes.min()), int(codes.max())
+        span = high - low + 1
+        if span <= _BINCOUNT_SPAN and span <= max(size, 256):
+            if codes.dtype.kind == "u":
+                # can't go below zero, and may not fit in intp before
+                codes = (codes - codes.dtype.type(low)).astype(numpy.intp)
+            else:
+                # narrow ints would wrap around in their own dtype
+                codes = codes.astype(numpy.intp) - low
+            counts = numpy.bincount(codes, minlength=span)
+            present = numpy.flatnonzero(counts)
+            first = numpy.full(span, size, dtype=numpy.intp)
+            numpy.minimum.at(first, codes, numpy.arange(size))
+            first = first[present]
+            return array[first], first, counts[present]
+    uniques, inverse, counts = numpy.unique(
+        array,
+        return_inverse=True,
+        return_counts=True,
+        axis=None if array.ndim == 1 else 0,
+    )
+    first = numpy.full(len(uniques), size, dtype=numpy.intp)
+    numpy.minimum.at(first, inverse.reshape(-1), numpy.arange(size))
+    return uniques, first, counts
+
+
+def _ranked_count(ranked: tuple[int, tuple[Any, int]]) -> int:
+    return ranked[1][1]
+
+
+def _unhashable_indexes(values: list[Any]) -> list[int]:
+    """Return the indexes of values whose type is unhashable."""
+    unhashable_types = {cls for cls in set(map(type, values)) if cls.__hash__ is None}
+    if not unhashable_types:
+        return []
+    flags = map(unhashable_types.__contains__, map(type, values))
+    return list(compress(range(len(values)), flags))
+
+
+def _first_unhashable(values: list[Any], start: int, stop: int) -> int:
+    """Return the index of the first unhashable value in values[start:stop], or -1."""
+    for index in range(start, stop):
+        try:
+            hash(values[index])
+        except TypeError:
+            return index
+    return -1
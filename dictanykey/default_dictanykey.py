@@ -14,6 +14,8 @@ class DefaultDictAnyKey(DictAnyKey):
     passed to the dict constructor, including keyword arguments.
     """
 
+    __slots__ = ("default_factory",)
+
     def __init__(
         self,
         default_factory: Optional[Callable] = None,
@@ -29,13 +31,19 @@ class DefaultDictAnyKey(DictAnyKey):
         self.default_factory = default_factory
 
     def __getitem__(self, key: Any) -> Any:
-        try:
-            return super().__getitem__(key)
-        except KeyError as e:
-            if self.default_factory is None:
-                raise e
-            self[key] = self.default_factory()
-            return self[key]
+        slot, probe = self._lookup(key)
+        if slot >= 0:
+            return self._values[slot]
+        if self.default_factory is None:
+            raise KeyError(key)
+        version = self._version
+        value = self.default_factory()
+        if self._version != version:
+            # default_factory changed self, the probe may be stale
+            self[key] = value
+        else:
+            self._insert(key, value, probe)
+        return value
 
     def __repr__(self) -> str:
         try:
@@ -47,5 +55,11 @@ class DefaultDictAnyKey(DictAnyKey):
             name = str(self.default_factory)
         return f"{type(self).__name__}({name}, {[(key, value) for key, value in self._get_items_list()]})"
 
+    def __reduce__(self) -> tuple:
+        function, args = super().__reduce__()
+        return (function, args, (None, {"default_factory": self.default_factory}))
+
     def copy(self) -> "DefaultDictAnyKey":
-        return type(self)(self.default_factory, self._get_items_list())
+        new = super().copy()
+        new.default_factory = self.default_factory
+        return new
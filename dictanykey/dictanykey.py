@@ -1,15 +1,50 @@
-from collections.abc import Iterable, Iterator, Mapping, MutableMapping
-from typing import Any, Optional, Union
+from collections.abc import Iterable, Iterator, KeysView, Mapping, MutableMapping
+from itertools import repeat
+from typing import Any, Optional, TypeVar, Union
 
-from dictanykey.iterables import DictItems, DictKeys, DictValues, OrderedKeys
+from dictanykey.iterables import MISSING, DictItems, DictKeys, DictValues
+from dictanykey.iterators import DictKeyIterator
 from dictanykey.unhashmap import UnHashMap
-from dictanykey.utils import quote_string
+from dictanykey.utils import Marker, quote_string
+
+# stored in _keys in place of a removed key
+DELETED = Marker("deleted")
+# probe returned by DictAnyKey._lookup for keys indexed in _hashmap
+HASHABLE = Marker("hashable")
+# storage attributes that copy() shares until either side writes to them
+_STORAGE = frozenset({"_hashmap", "_unhashmap", "_keys", "_values"})
+_NOT_SHARED: frozenset = frozenset()
+
+_D = TypeVar("_D", bound="DictAnyKey")
+
+
+def peek_value(mapping: Mapping, key: Any) -> Any:
+    """Return the value for key in mapping, or MISSING if key is not in it.
+    Reading a DictAnyKey this way doesn't count as a use of key in an
+    LRUDictAnyKey, so comparing dictionaries doesn't reorder them.
+    """
+    if isinstance(mapping, DictAnyKey):
+        return mapping._peek(key, MISSING)
+    if key not in mapping:
+        return MISSING
+    return mapping[key]
 
 
 class DictAnyKey(MutableMapping[Any, Any]):
     """A dictionary where the keys don't need to be hashable
-    Stores hashable keys with values in _hashmap: dict
-    Stores unhashable keys with values in _unhashmap: UnHashMap
+    Stores keys and values in insertion ordered entry lists: _keys, _values
+    Indexes hashable keys to their entry slot in _hashmap: dict
+    Indexes unhashable keys to their entry slot in _unhashmap: UnHashMap,
+    created when the first unhashable key is inserted (None until then)
+
+    Removed entries are left as DELETED tombstones and the
+    entry lists are compacted once tombstones outnumber live entries.
+    _version is bumped whenever keys are added or removed, so
+    iterators can detect changes during iteration.
+
+    copy() shares the storage with the copy: _shared names the
+    storage attributes self may share, and each one is copied
+    (by _own) the first time it is written to.
 
     Maintains order of items inserted.
 
@@ -17,30 +52,145 @@ class DictAnyKey(MutableMapping[Any, Any]):
     Hashable key lookups are the same speed as built in dict.
     """
 
+    __slots__ = (
+        "_hashmap",
+        "_unhashmap",
+        "_keys",
+        "_values",
+        "_version",
+        "_shared",
+        "__weakref__",
+    )
+
     def __init__(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:
-        self._hashmap: dict = {}
-        self._unhashmap = UnHashMap()
-        self._keys = OrderedKeys()
+        self._init_storage()
+        self._version = 0
         self.update(data)
 
-    def __getitem__(self, key: Any) -> Any:
-        if key in self._keys:
-            return self.get(key)
+    def _init_storage(self) -> None:
+        self._hashmap: dict = {}
+        self._unhashmap: Optional[UnHashMap] = None
+        self._keys: list = []
+        self._values: list = []
+        self._shared: frozenset = _NOT_SHARED
+
+    def _own(self, *names: str) -> None:
+        """Copy the storage attributes in names that self may share with
+        a copy, so they can be written to.
+        """
+        shared = self._shared
+        for name in names:
+            if name in shared:
+                storage = getattr(self, name)
+                if storage is not None:
+                    setattr(self, name, storage.copy())
+        self._shared = shared.difference(names)
+
+    def _lookup(self, key: Any) -> tuple[int, Any]:
+        """Probe the index once for key.
+        Returns (slot, probe): slot is the entry slot of key or -1 on a miss.
+        probe is HASHABLE for keys indexed in _hashmap, otherwise the
+        UnHashMap probe for key. Pass probe on to _insert after a miss or
+        to _delete after a hit so the index is not searched again.
+        """
+        try:
+            return self._hashmap.get(key, -1), HASHABLE
+        except TypeError:
+            return self._lookup_unhashable(key)
+
+    def _lookup_unhashable(self, key: Any) -> tuple[int, Any]:
+        """_lookup for a key that is not hashable."""
+        unhashmap = self._unhashmap
+        if unhashmap is None:
+            return -1, UnHashMap._miss(key)
+        probe = unhashmap._lookup(key)
+        index = probe[0]
+        if index < 0:
+            return -1, probe
+        return unhashmap._values[index], probe
+
+    def _insert(self, key: Any, value: Any, probe: Any) -> None:
+        """Append a new entry for key, which _lookup just missed."""
+        if self._shared:
+            self._own(
+                "_keys", "_values", "_hashmap" if probe is HASHABLE else "_unhashmap"
+            )
+        slot = len(self._keys)
+        if probe is HASHABLE:
+            self._hashmap[key] = slot
         else:
+            if self._unhashmap is None:
+                self._unhashmap = UnHashMap()
+            self._unhashmap._insert(key, slot, probe)
+        self._keys.append(key)
+        self._values.append(value)
+        self._version += 1
+
+    def _delete(self, key: Any, slot: int, probe: Any) -> None:
+        """Remove the entry for key, which _lookup just found at slot."""
+        if self._shared:
+            self._own(
+                "_keys", "_values", "_hashmap" if probe is HASHABLE else "_unhashmap"
+            )
+        if probe is HASHABLE:
+            del self._hashmap[key]
+        else:
+            self._unhashmap._remove(probe[0])  # type: ignore
+        self._version += 1
+        keys = self._keys
+        if slot == len(keys) - 1:
+            keys.pop()
+            self._values.pop()
+            # keep the last entry live so popitem never scans
+            while keys and keys[-1] is DELETED:
+                keys.pop()
+                self._values.pop()
+            return
+        keys[slot] = DELETED
+        self._values[slot] = None
+        if len(keys) > 2 * len(self):
+            self._compact()
+
+    def _compact(self) -> dict[int, int]:
+        """Drop tombstones from the entry lists and renumber the index.
+        Returns the new slot of each live entry by its old slot.
+        """
+        if self._shared:
+            self._own("_unhashmap")
+            # the other storage is rebuilt below
+            self._shared = _NOT_SHARED
+        keys, values = self._keys, self._values
+        live = [slot for slot, key in enumerate(keys) if key is not DELETED]
+        renumber = {old: new for new, old in enumerate(live)}
+        self._keys = [keys[slot] for slot in live]
+        self._values = [values[slot] for slot in live]
+        self._hashmap = {key: renumber[slot] for key, slot in self._hashmap.items()}
+        if self._unhashmap is not None:
+            self._unhashmap._remap_values(renumber)
+        return renumber
+
+    def __getitem__(self, key: Any) -> Any:
+        slot, _ = self._lookup(key)
+        if slot < 0:
             raise KeyError(key)
+        return self._values[slot]
 
     def __contains__(self, value: Any) -> bool:
-        return value in self._keys
+        return self._lookup(value)[0] >= 0
 
     def __setitem__(self, key: Any, value: Any) -> None:
-        try:
-            self._hashmap[key] = value
-        except TypeError:
-            self._unhashmap[key] = value
-        self._keys.add(key)
+        slot, probe = self._lookup(key)
+        if slot < 0:
+            self._insert(key, value, probe)
+        else:
+            if self._shared:
+                self._own("_values")
+            self._values[slot] = value
 
     def __len__(self) -> int:
-        return len(self._keys)
+        if self._unhashmap is None:
+            return len(self._hashmap)
+        return len(self._hashmap) + len(self._unhashmap)
 
     def __str__(self) -> str:
         s = ", ".join(
@@ -50,59 +200,113 @@ class DictAnyKey(MutableMapping[Any, Any]):
         return "{" + f"{s}" + "}"
 
     def __delitem__(self, key: Any) -> None:
-        try:
-            del self._hashmap[key]
-        except (KeyError, TypeError):
-            del self._unhashmap[key]
-        self._keys.delete(key)
+        slot, probe = self._lookup(key)
+        if slot < 0:
+            raise KeyError(key)
+        self._delete(key, slot, probe)
 
     def __repr__(self) -> str:
         return f"DictAnyKey({[(key, value) for key, value in self._get_items_list()]})"
 
     def __iter__(self) -> Iterator:
-        return iter(self._get_keys_list())
+        return DictKeyIterator(self)
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Mapping):
             return False
         if len(self) != len(other):
             return False
-        for key in self._keys:
-            if key not in other:
-                return False
-            if self[key] != other[key]:
+        for key, value in self._iter_items():
+            other_value = peek_value(other, key)
+            if other_value is MISSING or value != other_value:
                 return False
         return True
 
+    def _peek(self, key: Any, default: Any = None) -> Any:
+        """Return the value for key if key is in the dictionary, else
+        default, without counting a use, see peek_value.
+        """
+        slot = self._lookup(key)[0]
+        if slot < 0:
+            return default
+        return self._values[slot]
+
     def _get_keys_list(self) -> list[Any]:
-        return list(self._keys)
+        return [key for key in self._keys if key is not DELETED]
 
     def _get_values_list(self) -> list[Any]:
-        return [self[key] for key in self._get_keys_list()]
+        return [
+            value for key, value in zip(self._keys, self._values) if key is not DELETED
+        ]
 
     def _get_items_list(self) -> list[tuple]:
-        return [(key, self[key]) for key in self._get_keys_list()]
+        return [
+            (key, value)
+            for key, value in zip(self._keys, self._values)
+            if key is not DELETED
+        ]
+
+    def _iter_keys(self) -> Iterator[Any]:
+        for key in self._keys:
+            if key is not DELETED:
+                yield key
+
+    def _iter_values(self) -> Iterator[Any]:
+        # read values by slot, so values set during iteration are seen
+        for slot, key in enumerate(self._keys):
+            if key is not DELETED:
+                yield self._values[slot]
+
+    def _iter_items(self) -> Iterator[tuple[Any, Any]]:
+        for slot, key in enumerate(self._keys):
+            if key is not DELETED:
+                yield key, self._values[slot]
+
+    def _hashable_keys(self) -> KeysView:
+        """The hashable keys of self, as a native dict keys view."""
+        return self._hashmap.keys()
+
+    def _unhashable_keys(self) -> Iterator[Any]:
+        """The unhashable keys of self, in insertion order."""
+        if self._unhashmap is None:
+            return iter(())
+        return self._unhashmap._iter_keys()
+
+    @classmethod
+    def _from_partitions(
+        cls, hashable: Iterable[Any], unhashable: Iterable[Any], value: Any = None
+    ) -> "DictAnyKey":
+        """Build a new dictionary mapping every key to value.
+        hashable must only hold hashable keys: they are indexed with a single
+        native dict build. unhashable keys are inserted one at a time.
+        """
+        new = cls()
+        if isinstance(hashable, (set, frozenset, KeysView)):
+            keys = list(hashable)
+        else:
+            keys = list(dict.fromkeys(hashable))
+        new._hashmap = dict(zip(keys, range(len(keys))))
+        new._keys = keys
+        new._values = [value] * len(keys)
+        for key in unhashable:
+            DictAnyKey.__setitem__(new, key, value)
+        return new
 
     def keys(self) -> DictKeys:  # type: ignore
-        return DictKeys(self)  # type: ignore
+        return DictKeys(self)
 
     def values(self) -> DictValues:  # type: ignore
-        return DictValues(self)  # type: ignore
+        return DictValues(self)
 
     def items(self) -> DictItems:  # type: ignore
-        return DictItems(self)  # type: ignore
+        return DictItems(self)
 
     def get(self, key: Any, default: Optional[Any] = None) -> Any:
         """Return the value for key if key is in the dictionary, else default."""
-        if key not in self._keys:
+        slot, _ = self._lookup(key)
+        if slot < 0:
             return default
-        try:
-            return self._hashmap[key]
-        except (KeyError, TypeError):
-            try:
-                return self._unhashmap[key]
-            except KeyError:
-                return default
+        return self._values[slot]
 
     def update(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:  # type: ignore
         """Update dict from dict/iterable data.
@@ -111,32 +315,153 @@ class DictAnyKey(MutableMapping[Any, Any]):
         """
         if data is None:
             return
-
+        self.update_many(data)
+
+    def update_many(self, data: Union[Iterable, Mapping]) -> None:
+        """Update dict from dict/iterable data in bulk.
+        Same result as update, but keys are classified in batch:
+        a plain dict, or pairs whose keys are all hashable, are merged with
+        native dict operations. Otherwise the pairs are merged in one pass
+        that only falls back to the UnHashMap for unhashable keys.
+        """
+        if isinstance(data, dict):
+            self._update_hashable(data)
+            return
         if isinstance(data, Mapping):
-            for k in data.keys():
-                self[k] = data[k]
+            pairs = [(k, data[k]) for k in data.keys()]
+        else:
+            pairs = data if isinstance(data, list) else list(data)
+        try:
+            batch = dict(pairs)
+        except (TypeError, ValueError):
+            # unhashable keys, or malformed pairs which the loop reports
+            self._update_pairs(pairs)
         else:
-            for k, v in data:
-                self[k] = v
+            self._update_hashable(batch)
+
+    def _update_hashable(self, batch: dict) -> None:
+        """Merge batch, whose keys are all hashable, with native dict operations."""
+        hashmap = self._hashmap
+        existing = batch.keys() & hashmap.keys() if hashmap else ()
+        if existing:
+            if self._shared:
+                self._own("_values")
+            for key in existing:
+                self._values[hashmap[key]] = batch[key]
+            new_keys = [key for key in batch if key not in existing]
+        else:
+            new_keys = list(batch)
+        if not new_keys:
+            return
+        if self._shared:
+            self._own("_hashmap", "_keys", "_values")
+        start = len(self._keys)
+        self._hashmap.update(zip(new_keys, range(start, start + len(new_keys))))
+        self._keys.extend(new_keys)
+        self._values.extend(map(batch.__getitem__, new_keys))
+        self._version += 1
+
+    def _update_pairs(self, pairs: Iterable) -> None:
+        """Merge pairs in order, indexing each hashable key with a single dict call
+        and sending unhashable keys straight to the UnHashMap.
+        """
+        if self._shared:
+            self._own("_hashmap", "_keys", "_values")
+        hashmap = self._hashmap
+        keys = self._keys
+        values = self._values
+        added = False
+        for key, value in pairs:
+            try:
+                slot = hashmap.setdefault(key, len(keys))
+            except TypeError:
+                slot, probe = self._lookup_unhashable(key)
+                if slot < 0:
+                    self._insert(key, value, probe)
+                else:
+                    values[slot] = value
+                continue
+            if slot == len(keys):
+                keys.append(key)
+                values.append(value)
+                added = True
+            else:
+                values[slot] = value
+        if added:
+            self._version += 1
 
     def clear(self) -> None:
         """Remove all items from self."""
-        self._hashmap.clear()
-        self._unhashmap = UnHashMap()
-        self._keys = OrderedKeys()
+        self._init_storage()
+        self._version += 1
+
+    def copy(self: _D) -> _D:
+        """Return a shallow copy of self in O(1).
+        The copy shares storage with self until either one writes to it,
+        then only the part written to is copied: the values, the entry
+        lists and the index of the key's partition.
+        """
+        new = type(self).__new__(type(self))
+        new._hashmap = self._hashmap
+        new._unhashmap = self._unhashmap
+        new._keys = self._keys
+        new._values = self._values
+        new._version = 0
+        new._shared = self._shared = _STORAGE
+        return new
+
+    def __copy__(self: _D) -> _D:
+        return self.copy()
+
+    def __reduce__(self) -> tuple:
+        """Pickle the live keys and values as two ordered lists, without
+        the index: it is rebuilt in bulk by _from_columns when loaded.
+        Array values in the values list are pickled by their own
+        __reduce_ex__, so protocol 5 can send their buffers out-of-band.
+        """
+        keys, values = self._get_keys_list(), self._get_values_list()
+        return (_unpickle, (type(self), keys, values))
 
-    def copy(self) -> "DictAnyKey":
-        return type(self)(self._get_items_list())
+    @classmethod
+    def _from_columns(cls, keys: list, values: list) -> "DictAnyKey":
+        """Create a new dictionary from lists of distinct keys and their
+        values, as pickled by __reduce__. The lists become the entry lists
+        and the keys are indexed without searching for duplicates.
+        """
+        new = cls.__new__(cls)
+        new._init_storage()
+        new._version = 0
+        unhashmap = None
+        try:
+            hashmap = dict(zip(keys, range(len(keys))))
+        except TypeError:
+            hashmap = {}
+            unhashmap = new._unhashmap = UnHashMap()
+            for slot, key in enumerate(keys):
+                try:
+                    hashmap[key] = slot
+                except TypeError:
+                    unhashmap._insert(key, slot, UnHashMap._miss(key))
+        if len(hashmap) + len(unhashmap or ()) != len(keys):
+            # equal hashable keys: not pickled by __reduce__
+            new._init_storage()
+            new._update_pairs(zip(keys, values))
+            return new
+        new._hashmap = hashmap
+        new._keys = keys
+        new._values = values
+        return new
 
     def setdefault(self, key: Any, default: Optional[Any] = None) -> Any:
         """Insert key with a value of default if key is not in the dictionary.
 
         Return the value for key if key is in the dictionary, else default.
         """
-        if key not in self:
-            self[key] = default
+        slot, probe = self._lookup(key)
+        if slot < 0:
+            self._insert(key, default, probe)
             return default
-        return self[key]
+        return self._values[slot]
 
     # TODO: pop method tests
     def pop(self, key: Any, default: Optional[Any] = None) -> Any:
@@ -145,14 +470,13 @@ class DictAnyKey(MutableMapping[Any, Any]):
 
         If key is not found, default is returned if given, otherwise KeyError is raised
         """
-        try:
-            value = self[key]
-        except KeyError as e:
+        slot, probe = self._lookup(key)
+        if slot < 0:
             if default is None:
-                raise e
-            else:
-                return default
-        del self[key]
+                raise KeyError(key)
+            return default
+        value = self._values[slot]
+        self._delete(key, slot, probe)
         return value
 
     # TODO: popitem tests
@@ -165,9 +489,11 @@ class DictAnyKey(MutableMapping[Any, Any]):
         """
         if len(self) == 0:
             raise KeyError("popitem(): dictionary is empty")
-        last_key = self._get_keys_list()[-1]
-        item = self[last_key]
-        del self[last_key]
+        # the last entry is never a tombstone, see _delete
+        last_key = self._keys[-1]
+        item = self._values[-1]
+        slot, probe = self._lookup(last_key)
+        self._delete(last_key, slot, probe)
         return (last_key, item)
 
     # TODO: fromkeys tests
@@ -178,7 +504,28 @@ class DictAnyKey(MutableMapping[Any, Any]):
         """Signature: d.fromkeys(iterable, value=None, /)
         Docstring: Create a new dictionary with keys from iterable and values set to value.
         """
+        return cls.from_pairs(zip(iterable, repeat(value)))
+
+    @classmethod
+    def from_pairs(cls: type[_D], pairs: Iterable[tuple[Any, Any]]) -> _D:
+        """Create a new dictionary from (key, value) pairs in bulk, see update_many.
+        Later duplicates of a key overwrite its value but keep its first position.
+        """
         new = cls()
-        for key in iterable:
-            new[key] = value
+        DictAnyKey.update_many(new, pairs)
         return new
+
+    @classmethod
+    def from_mapping(cls: type[_D], mapping: Mapping) -> _D:
+        """Create a new dictionary with the items of mapping in bulk, see update_many.
+        A plain dict is copied with native dict operations.
+        """
+        if not isinstance(mapping, Mapping):
+            raise TypeError(f"'{type(mapping).__name__}' object is not a mapping")
+        new = cls()
+        DictAnyKey.update_many(new, mapping)
+        return new
+
+
+def _unpickle(cls: type[DictAnyKey], keys: list, values: list) -> DictAnyKey:
+    return cls._from_columns(keys, values)
@@ -0,0 +1,322 @@
+from collections.abc import Iterable
+from typing import Any, Callable, Optional
+
+from dictanykey.utils import Marker
+
+# Tags keep container fingerprints from colliding with user tuples.
+_LIST = Marker("list")
+_DICT = Marker("dict")
+
+# Types that are hashable and hold no other objects.
+_ATOMIC = frozenset({int, float, complex, str, bytes, bool, type(None)})
+
+
+class KeyAdapter:
+    """How fingerprint and keys_equal treat instances of one type.
+    Also serves as the tag of fingerprints made by to_hashable.
+    """
+
+    __slots__ = ("cls", "to_hashable", "eq")
+
+    def __init__(
+        self,
+        cls: type,
+        to_hashable: Callable[[Any], Any],
+        eq: Optional[Callable[[Any, Any], bool]] = None,
+    ) -> None:
+        self.cls = cls
+        self.to_hashable = to_hashable
+        self.eq = eq
+
+    def __repr__(self) -> str:
+        return f"<key adapter for {self.cls.__qualname__}>"
+
+    def __reduce__(self) -> tuple:
+        # unpickle as the adapter registered for cls when loaded
+        return (get_key_adapter, (self.cls,))
+
+
+_adapters: dict[type, KeyAdapter] = {}
+# number of registered adapters with eq, whose fingerprints can be shared
+# by keys that are not equal
+_inexact = 0
+# adapter per concrete type, including subclasses of registered types
+_resolved: dict[type, Optional[KeyAdapter]] = {}
+
+
+def register_key_adapter(
+    cls: type,
+    to_hashable: Callable[[Any], Any],
+    eq: Optional[Callable[[Any, Any], bool]] = None,
+) -> None:
+    """Teach DictAnyKey and UnHashMap to index unhashable keys of type cls.
+
+    to_hashable(key) must return a hashable value that is equal for
+    keys that should be treated as the same key. If eq is None, equal
+    to_hashable values mean equal keys and == is never called on
+    instances of cls. Otherwise to_hashable only has to agree for equal
+    keys and eq(a, b) decides between keys with the same to_hashable.
+
+    Applies to subclasses of cls. Register adapters before storing
+    instances of cls, keys stored earlier are not re-indexed.
+    """
+    global _inexact
+    old = _adapters.get(cls)
+    _inexact += (eq is not None) - (old is not None and old.eq is not None)
+    _adapters[cls] = KeyAdapter(cls, to_hashable, eq)
+    _resolved.clear()
+
+
+def unregister_key_adapter(cls: type) -> None:
+    """Remove the adapter registered for cls.
+    Raises KeyError if cls has no adapter.
+    """
+    global _inexact
+    _inexact -= _adapters.pop(cls).eq is not None
+    _resolved.clear()
+
+
+def fingerprints_exact() -> bool:
+    """Return True if objects with equal fingerprints are always equal:
+    no key adapter with eq is registered.
+    """
+    return not _inexact
+
+
+def _ndarray_adapter(cls: type) -> KeyAdapter:
+    def to_hashable(array: Any) -> Any:
+        if array.dtype.hasobject:
+            return (array.dtype.str, array.shape, fingerprint(array.tolist()))
+        return (array.dtype.str, array.shape, array.tobytes())
+
+    return KeyAdapter(cls, to_hashable)
+
+
+# Adapters for optional dependencies, created the first time an instance
+# is seen so that the dependency is never imported here.
+_deferred_adapters: dict[tuple[str, str], Callable[[type], KeyAdapter]] = {
+    ("numpy", "ndarray"): _ndarray_adapter,
+}
+
+
+def get_key_adapter(cls: type) -> Optional[KeyAdapter]:
+    """Return the adapter used for instances of cls, or None."""
+    try:
+        return _resolved[cls]
+    except KeyError:
+        pass
+    adapter = None
+    for base in cls.__mro__:
+        adapter = _adapters.get(base)
+        if adapter is None:
+            make = _deferred_adapters.get((base.__module__, base.__qualname__))
+            if make is not None:
+                adapter = _adapters[base] = make(base)
+        if adapter is not None:
+            break
+    _resolved[cls] = adapter
+    return adapter
+
+
+def fingerprint(obj: Any) -> Any:
+    """Return a hashable stand-in for obj.
+
+    Objects that compare equal get equal fingerprints, so fingerprints
+    can be hashed to find candidate keys before comparing with ==.
+    Hashable objects are their own fingerprint. Unhashable containers
+    are canonicalized recursively:
+        list -> (<list>, tuple of item fingerprints)
+        tuple -> tuple of item fingerprints
+        dict -> (<dict>, frozenset of (key, value fingerprint))
+        set -> frozenset
+    Unhashable types with a registered key adapter become
+    (adapter, to_hashable(obj)).
+
+    Raises TypeError if obj has no canonical form.
+    """
+    cls = type(obj)
+    if cls in _ATOMIC:
+        return obj
+    if cls is list:
+        items = tuple(obj)
+        try:
+            hash(items)
+        except TypeError:
+            items = tuple(map(fingerprint, obj))
+        return (_LIST, items)
+    if cls is tuple:
+        try:
+            hash(obj)
+        except TypeError:
+            return tuple(map(fingerprint, obj))
+        return obj
+    if cls is dict:
+        return (
+            _DICT,
+            frozenset([(key, fingerprint(value)) for key, value in obj.items()]),
+        )
+    if cls is set:
+        return frozenset(obj)
+    try:
+        hash(obj)
+    except TypeError:
+        adapter = get_key_adapter(cls)
+        if adapter is None:
+            raise
+        return (adapter, adapter.to_hashable(obj))
+    return obj
+
+
+def bucket_eq(obj: Any) -> Optional[Callable[[Any, Any], bool]]:
+    """Return the function that tells obj apart from keys sharing its
+    fingerprint, or None if sharing a fingerprint means equal.
+    """
+    adapter = get_key_adapter(type(obj))
+    if adapter is None:
+        return None
+    return adapter.eq
+
+
+def keys_equal(a: Any, b: Any) -> bool:
+    """Compare two keys, using key adapters instead of == where registered."""
+    if a is b:
+        return True
+    adapter = get_key_adapter(type(a))
+    if adapter is not get_key_adapter(type(b)):
+        return False
+    if adapter is None:
+        return bool(a == b)
+    if adapter.eq is None:
+        return bool(adapter.to_hashable(a) == adapter.to_hashable(b))
+    return bool(adapter.eq(a, b))
+
+
+# Builtin types grouped by the builtin types they can compare equal to.
+_EQ_GROUPS: dict[type, type] = {
+    bool: int,
+    int: int,
+    float: int,
+    complex: int,
+    str: str,
+    bytes: bytes,
+    bytearray: bytes,
+    list: list,
+    tuple: tuple,
+    dict: dict,
+    set: set,
+    frozenset: set,
+    type(None): type(None),
+}
+# Groups whose equal members always have equal len.
+_SIZED_GROUPS = frozenset({str, bytes, list, tuple, dict, set})
+
+
+def partition_key(obj: Any) -> Optional[tuple]:
+    """Return the partition of obj: keys in different partitions
+    never compare equal. Builtin containers are split by len as well.
+    Returns None for types whose == could accept anything.
+    """
+    cls = type(obj)
+    group = _EQ_GROUPS.get(cls)
+    if group is not None:
+        if group in _SIZED_GROUPS:
+            return (group, len(obj))
+        return (group, -1)
+    adapter = get_key_adapter(cls)
+    if adapter is not None:
+        return (adapter, -1)
+    return None
+
+
+def encode_key(key: Any) -> bytes:
+    """Return the canonical byte encoding of key.
+
+    Keys that DictAnyKey treats as the same key get the same bytes, in
+    any process: 1, 1.0 and True encode alike, dicts and sets encode
+    independently of their order. Like fingerprints, items nested in a
+    key encode sets as frozensets. An unhashable key never encodes like
+    a hashable one, so {1} and frozenset({1}) differ as keys, as do
+    bytearray and bytes (also when nested: a bytearray's fingerprint is
+    its adapter's).
+    Encodes None, numbers, str, bytes, tuples, lists, dicts, sets and
+    types with a key adapter registered without eq (encoded by their
+    to_hashable value).
+
+    Raises TypeError if key has no canonical encoding.
+    """
+    try:
+        hash(key)
+    except TypeError:
+        return b"u" + _encoded(key)
+    return _encoded(key)
+
+
+def _encoded(obj: Any) -> bytes:
+    out: list[bytes] = []
+    _encode(obj, out)
+    return b"".join(out)
+
+
+def _encode(obj: Any, out: list[bytes]) -> None:
+    if obj is None:
+        out.append(b"n")
+    elif isinstance(obj, (int, float, complex)):
+        _encode_number(obj, out)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8", "surrogatepass")
+        out.append(b"s%d:" % len(data))
+        out.append(data)
+    elif isinstance(obj, bytes):
+        out.append(b"b%d:" % len(obj))
+        out.append(obj)
+    elif isinstance(obj, tuple):
+        _encode_items(b"t", obj, out)
+    elif isinstance(obj, list):
+        _encode_items(b"l", obj, out)
+    elif isinstance(obj, dict):
+        items = [_encoded(key) + _encoded(value) for key, value in obj.items()]
+        _encode_sorted(b"d", items, out)
+    elif isinstance(obj, (set, frozenset)):
+        _encode_sorted(b"f", list(map(_encoded, obj)), out)
+    else:
+        adapter = get_key_adapter(type(obj))
+        if adapter is None or adapter.eq is not None:
+            raise TypeError(
+                f"'{type(obj).__name__}' object has no canonical key encoding"
+            )
+        out.append(b"a")
+        _encode(f"{adapter.cls.__module__}.{adapter.cls.__qualname__}", out)
+        _encode(adapter.to_hashable(obj), out)
+
+
+def _encode_number(number: Any, out: list[bytes]) -> None:
+    # equal numbers of any type encode alike, like their hashes
+    if isinstance(number, complex):
+        if number.imag:
+            out.append(b"c")
+            _encode_number(number.real, out)
+            _encode_number(number.imag, out)
+            return
+        number = number.real
+    if isinstance(number, float):
+        if not number.is_integer():
+            out.append(b"x%s;" % number.hex().encode())
+            return
+        number = int(number)
+    out.append(b"i%d;" % number)
+
+
+def _encode_items(tag: bytes, items: Iterable[Any], out: list[bytes]) -> None:
+    items = list(items)
+    out.append(tag + b"%d:" % len(items))
+    for item in items:
+        _encode(item, out)
+
+
+def _encode_sorted(tag: bytes, encoded: list[bytes], out: list[bytes]) -> None:
+    encoded.sort()
+    out.append(tag + b"%d:" % len(encoded))
+    out.extend(encoded)
+
+
+register_key_adapter(bytearray, bytes)
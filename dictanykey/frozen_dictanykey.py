@@ -1,26 +1,187 @@
-from collections.abc import Iterable, Mapping
-from typing import Any, Optional, Union
+from collections.abc import Iterable, Iterator, Mapping
+from typing import TYPE_CHECKING, Any, Optional, Union
 
-from dictanykey.dictanykey import DictAnyKey
-from dictanykey.iterables import OrderedKeys
-from dictanykey.unhashmap import UnHashMap
+from dictanykey.dictanykey import _STORAGE, DictAnyKey
+from dictanykey.fingerprints import bucket_eq, fingerprint, keys_equal, partition_key
+from dictanykey.unhashmap import UNBUCKETED, scan_candidates
+
+if TYPE_CHECKING:
+    # imported when used: it needs multiprocessing.shared_memory and mmap
+    from dictanykey.shared import SharedDictAnyKey
+
+# empty index shared by frozen dicts, never modified
+_NO_INDEX: dict = {}
+
+
+def _tuples(index: dict[tuple, list[int]]) -> dict[tuple, tuple[int, ...]]:
+    """Return index with its lists of slots as tuples."""
+    return {part: tuple(slots) for part, slots in index.items()} or _NO_INDEX
 
 
 class FrozenDictAnyKey(DictAnyKey):
-    """A DictAnyKey that cannot be edited."""
+    """A DictAnyKey that cannot be edited.
+
+    Built once into a read only layout:
+    Stores keys and values in tuples: _keys, _values
+    Indexes hashable keys to their slot in _hashmap: dict
+    Indexes unhashable keys to their slot by fingerprint in _buckets: dict
+    (a tuple of slots for key adapters whose keys can share a fingerprint).
+    Unhashable keys without a fingerprint are listed by partition in
+    _unbucketed, or in _foreign when any key could equal them.
+    _unhashable holds the slots of all unhashable keys, and _partitions
+    the slots of those with a partition, by partition.
+
+    Hashable even with unhashable keys or values: the hash is computed
+    from their fingerprints the first time it is needed, then cached
+    in _hash.
+    """
+
+    __slots__ = (
+        "_buckets",
+        "_unbucketed",
+        "_partitions",
+        "_foreign",
+        "_unhashable",
+        "_hash",
+    )
 
     def __init__(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:
-        self._hashmap: dict = {}
-        self._unhashmap = UnHashMap()
-        self._keys = OrderedKeys()
-        if data is None:
-            return
-        if isinstance(data, Mapping):
-            for k in data.keys():
-                super().__setitem__(k, data[k])
+        staging = DictAnyKey()
+        if data is not None:
+            DictAnyKey.update_many(staging, data)
+        self._freeze(staging)
+        self._version = 0
+        self._hash: Optional[int] = None
+
+    def _freeze(self, staging: DictAnyKey) -> None:
+        """Build the read only layout from staging, which has no deleted entries."""
+        self._keys: tuple = tuple(staging._keys)  # type: ignore
+        self._values: tuple = tuple(staging._values)  # type: ignore
+        self._hashmap = staging._hashmap
+        # the index below replaces the UnHashMap, the storage is never written
+        self._unhashmap = None
+        self._shared = _STORAGE
+        buckets: dict[Any, Union[int, list[int]]] = {}
+        unbucketed: dict[tuple, list[int]] = {}
+        partitions: dict[tuple, list[int]] = {}
+        foreign: list[int] = []
+        unhashmap = staging._unhashmap
+        # reuse the fingerprints and partitions computed while staging
+        placed = () if unhashmap is None else unhashmap._values.items()
+        for token, slot in placed:
+            fp, part = unhashmap._placement[token]  # type: ignore
+            if part is not None:
+                partitions.setdefault(part, []).append(slot)
+            if fp is not UNBUCKETED:
+                hit = buckets.get(fp)
+                if hit is None:
+                    buckets[fp] = slot
+                elif isinstance(hit, list):
+                    hit.append(slot)
+                else:
+                    buckets[fp] = [hit, slot]
+            elif part is None:
+                foreign.append(slot)
+            else:
+                unbucketed.setdefault(part, []).append(slot)
+        # most frozen dicts have no unhashable keys: share one empty index
+        self._buckets: dict[Any, Union[int, tuple[int, ...]]] = {
+            fp: tuple(hit) if isinstance(hit, list) else hit
+            for fp, hit in buckets.items()
+        } or _NO_INDEX
+        self._unbucketed = _tuples(unbucketed)
+        self._partitions = _tuples(partitions)
+        self._foreign = tuple(foreign)
+        self._unhashable = tuple(slot for _, slot in placed)
+
+    def _lookup_unhashable(self, key: Any) -> tuple[int, Any]:
+        return self._find_unhashable(key), None
+
+    def _find_unhashable(self, key: Any) -> int:
+        """Return the slot of unhashable key, or -1."""
+        keys = self._keys
+        try:
+            fp = fingerprint(key)
+        except TypeError:
+            fp = UNBUCKETED
         else:
-            for k, v in data:
-                super().__setitem__(k, v)
+            hit = self._buckets.get(fp)
+            if hit is not None:
+                slots = hit if isinstance(hit, tuple) else (hit,)
+                eq = bucket_eq(key)
+                if eq is None:
+                    # canonical fingerprints are equal only for equal keys
+                    return slots[0]
+                for slot in slots:
+                    if eq(keys[slot], key):
+                        return slot
+        part = partition_key(key)
+        candidates = scan_candidates(
+            fp,
+            part,
+            self._unhashable,
+            self._partitions,
+            self._unbucketed,
+            self._foreign,
+        )
+        for slot in candidates:
+            if keys_equal(keys[slot], key):
+                return slot
+        return -1
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _unhashable_keys(self) -> Iterator[Any]:
+        return map(self._keys.__getitem__, self._unhashable)
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[Any, Any]]) -> "FrozenDictAnyKey":
+        return cls(pairs)
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping) -> "FrozenDictAnyKey":
+        if not isinstance(mapping, Mapping):
+            raise TypeError(f"'{type(mapping).__name__}' object is not a mapping")
+        return cls(mapping)
+
+    def copy(self) -> "FrozenDictAnyKey":
+        """Return self, which cannot be edited, like frozenset.copy."""
+        return self
+
+    def export(
+        self, name: Optional[str] = None, path: Optional[str] = None
+    ) -> "SharedDictAnyKey":
+        """Export to a new shared memory segment called name (a generated
+        name by default), or to a file at path, in a layout with a
+        prebuilt index. Other processes read it without loading it with
+        FrozenDictAnyKey.attach.
+
+        Returns the exported table attached to this process. The segment
+        outlives this process, until unlink() is called on the table in
+        any process (on Windows, until no process has it open).
+        Raises TypeError if a key has no canonical encoding (see
+        dictanykey.fingerprints.encode_key).
+        """
+        from dictanykey.shared import SharedDictAnyKey
+
+        if name is not None and path is not None:
+            raise TypeError("pass at most one of name or path")
+        return SharedDictAnyKey._create(self._iter_items(), name, path)
+
+    @staticmethod
+    def attach(
+        name: Optional[str] = None, path: Optional[str] = None
+    ) -> "SharedDictAnyKey":
+        """Attach to a table exported by export() to the shared memory
+        segment called name or the file at path.
+
+        Returns a read only mapping that looks keys up in the shared
+        buffer and only unpickles the values read.
+        """
+        from dictanykey.shared import SharedDictAnyKey
+
+        return SharedDictAnyKey(name, path)
 
     def __setitem__(self, key: Any, value: Any) -> None:
         raise TypeError(
@@ -32,6 +193,16 @@ class FrozenDictAnyKey(DictAnyKey):
             f"'{self.__class__.__name__}' object doesn't support item deletion"
         )
 
+    def update(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:  # type: ignore
+        raise TypeError(
+            f"'{self.__class__.__name__}' object doesn't support item assignment"
+        )
+
+    def update_many(self, data: Union[Iterable, Mapping]) -> None:
+        raise TypeError(
+            f"'{self.__class__.__name__}' object doesn't support item assignment"
+        )
+
     def clear(self) -> None:
         raise AttributeError(f"'{self.__class__.__name__}' object is read-only")
 
@@ -51,10 +222,40 @@ class FrozenDictAnyKey(DictAnyKey):
         return f"FrozenDictAnyKey({[(key, value) for key, value in self._get_items_list()]})"
 
     def __hash__(self) -> int:
-        """Return hash value based on frozenset of items for immutability.
-        Note: This will fail if any keys or values are unhashable."""
-        try:
-            return hash(frozenset(self._get_items_list()))
-        except TypeError:
-            # If items contain unhashable types, we cannot hash this object
-            raise TypeError(f"unhashable type: '{self.__class__.__name__}'") from None
+        """Return hash value based on the frozenset of the fingerprints of items.
+        Computed once, then cached.
+        Raises TypeError if a key or value has no canonical fingerprint.
+        """
+        if self._hash is None:
+            try:
+                self._hash = hash(
+                    frozenset(
+                        zip(
+                            map(fingerprint, self._iter_keys()),
+                            map(fingerprint, self._iter_values()),
+                        )
+                    )
+                )
+            except TypeError:
+                # If items have no canonical form, we cannot hash this object
+                raise TypeError(
+                    f"unhashable type: '{self.__class__.__name__}'"
+                ) from None
+        return self._hash
+
+    @classmethod
+    def _from_staging(cls, staging: DictAnyKey) -> "FrozenDictAnyKey":
+        """Freeze staging, which has no deleted entries, reusing its index.
+        staging must not be modified afterwards.
+        """
+        new = cls.__new__(cls)
+        new._freeze(staging)
+        new._version = 0
+        new._hash = None
+        return new
+
+    @classmethod
+    def _from_columns(cls, keys: list, values: list) -> "FrozenDictAnyKey":
+        # the cached hash and the fingerprint index are never pickled:
+        # they depend on str hashes, which differ between processes
+        return cls._from_staging(DictAnyKey._from_columns(keys, values))
@@ -0,0 +1,543 @@
+from collections.abc import Iterable, Iterator, Mapping
+from itertools import chain
+from typing import Any, Callable, Optional, Union
+
+from dictanykey.dictanykey import DELETED, HASHABLE, DictAnyKey, _unpickle, peek_value
+from dictanykey.fingerprints import bucket_eq, fingerprint, keys_equal, partition_key
+from dictanykey.iterables import MISSING, DictItems, DictKeys, DictValues
+from dictanykey.iterators import DictKeyIterator
+from dictanykey.unhashmap import UNBUCKETED
+from dictanykey.utils import quote_string
+
+# bits of the hash consumed per trie level, and the width of a node
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+# hashes are folded to 64 bits, so tries are at most 13 levels deep
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+
+class _Node:
+    """Bitmap indexed trie node.
+    items holds, in bit order, one entry per set bit of bitmap:
+    a leaf (hash, fingerprint, seq) tuple or a child node.
+    """
+
+    __slots__ = ("bitmap", "items")
+
+    def __init__(self, bitmap: int, items: tuple) -> None:
+        self.bitmap = bitmap
+        self.items = items
+
+
+class _Collision:
+    """Leaves whose 64 bit hashes are all equal."""
+
+    __slots__ = ("hash", "leaves")
+
+    def __init__(self, hash: int, leaves: tuple) -> None:
+        self.hash = hash
+        self.leaves = leaves
+
+
+_EMPTY = _Node(0, ())
+
+
+def _position(bitmap: int, bit: int) -> int:
+    return bin(bitmap & (bit - 1)).count("1")
+
+
+def _pair(a: tuple, b: tuple, shift: int) -> Any:
+    """Return the smallest subtrie at shift holding leaves a and b."""
+    if a[0] == b[0]:
+        return _Collision(a[0], (a, b))
+    bit_a = (a[0] >> shift) & _MASK
+    bit_b = (b[0] >> shift) & _MASK
+    if bit_a == bit_b:
+        return _Node(1 << bit_a, (_pair(a, b, shift + _BITS),))
+    if bit_a < bit_b:
+        return _Node((1 << bit_a) | (1 << bit_b), (a, b))
+    return _Node((1 << bit_a) | (1 << bit_b), (b, a))
+
+
+def _insert(node: Any, shift: int, leaf: tuple) -> Any:
+    """Return a copy of node with leaf added, sharing every untouched subtrie.
+    The key of leaf must not be in node.
+    """
+    h = leaf[0]
+    if type(node) is _Collision:
+        if node.hash == h:
+            return _Collision(h, node.leaves + (leaf,))
+        node = _Node(1 << ((node.hash >> shift) & _MASK), (node,))
+    bit = 1 << ((h >> shift) & _MASK)
+    items = node.items
+    pos = _position(node.bitmap, bit)
+    if not node.bitmap & bit:
+        return _Node(node.bitmap | bit, items[:pos] + (leaf,) + items[pos:])
+    child = items[pos]
+    if type(child) is tuple:
+        child = _pair(child, leaf, shift + _BITS)
+    else:
+        child = _insert(child, shift + _BITS, leaf)
+    return _Node(node.bitmap, items[:pos] + (child,) + items[pos + 1 :])
+
+
+def _remove(node: Any, shift: int, h: int, seq: int) -> Any:
+    """Return a copy of node without the leaf of seq, which node holds.
+    Returns None for an empty subtrie and a lone leaf for a subtrie that
+    holds nothing else, so the parent can store it inline.
+    """
+    if type(node) is _Collision:
+        leaves = tuple(leaf for leaf in node.leaves if leaf[2] != seq)
+        if len(leaves) == 1:
+            return leaves[0]
+        return _Collision(node.hash, leaves)
+    bit = 1 << ((h >> shift) & _MASK)
+    items = node.items
+    pos = _position(node.bitmap, bit)
+    child = items[pos]
+    if type(child) is not tuple:
+        child = _remove(child, shift + _BITS, h, seq)
+        if child is not None:
+            if type(child) is tuple and len(items) == 1 and shift:
+                return child
+            return _Node(node.bitmap, items[:pos] + (child,) + items[pos + 1 :])
+    items = items[:pos] + items[pos + 1 :]
+    if not items and shift:
+        return None
+    if len(items) == 1 and type(items[0]) is tuple and shift:
+        return items[0]
+    return _Node(node.bitmap ^ bit, items)
+
+
+def _build(leaves: list[tuple], shift: int) -> Any:
+    """Build a trie at shift from leaves with distinct keys in one pass."""
+    if len(leaves) == 1:
+        return leaves[0]
+    h = leaves[0][0]
+    if shift >= _HASH_BITS:
+        return _Collision(h, tuple(leaves))
+    groups: list[list[tuple]] = [[] for _ in range(_WIDTH)]
+    for leaf in leaves:
+        groups[(leaf[0] >> shift) & _MASK].append(leaf)
+    if len(groups[(h >> shift) & _MASK]) == len(leaves) and all(
+        leaf[0] == h for leaf in leaves
+    ):
+        return _Collision(h, tuple(leaves))
+    bitmap = 0
+    items = []
+    shift += _BITS
+    for index, group in enumerate(groups):
+        if group:
+            bitmap |= 1 << index
+            items.append(group[0] if len(group) == 1 else _build(group, shift))
+    return _Node(bitmap, tuple(items))
+
+
+def _root(node: Any) -> Any:
+    """Return node as the root of a trie: never None or a lone leaf."""
+    if node is None:
+        return _EMPTY
+    if type(node) is tuple:
+        return _Node(1 << (node[0] & _MASK), (node,))
+    return node
+
+
+def _leaves(node: Any) -> Iterator[tuple]:
+    """Every leaf of a trie, in no particular order."""
+    if type(node) is _Collision:
+        yield from node.leaves
+        return
+    for item in node.items:
+        if type(item) is tuple:
+            yield item
+        else:
+            yield from _leaves(item)
+
+
+def _vector_set(node: tuple, shift: int, index: int, entry: Any) -> tuple:
+    """Return a copy of the entry vector node with entry at index.
+    index may be one past the last entry, which appends.
+    """
+    if not shift:
+        slot = index & _MASK
+        return node[:slot] + (entry,) + node[slot + 1 :]
+    slot = (index >> shift) & _MASK
+    child = node[slot] if slot < len(node) else ()
+    return (
+        node[:slot]
+        + (_vector_set(child, shift - _BITS, index, entry),)
+        + node[slot + 1 :]
+    )
+
+
+def _vector_build(entries: list) -> tuple[tuple, int]:
+    """Return (root, shift) of an entry vector holding entries."""
+    level = [tuple(entries[i : i + _WIDTH]) for i in range(0, len(entries), _WIDTH)]
+    shift = 0
+    while len(level) > 1:
+        level = [tuple(level[i : i + _WIDTH]) for i in range(0, len(level), _WIDTH)]
+        shift += _BITS
+    return (level[0] if level else ()), shift
+
+
+def _key_hash(fp: Any) -> int:
+    return hash(fp) & _HASH_MASK
+
+
+def _probe(key: Any) -> tuple[int, Any, Optional[tuple]]:
+    """Return the probe of unhashable key, see HamtDictAnyKey._lookup."""
+    try:
+        fp = fingerprint(key)
+    except TypeError:
+        return -1, UNBUCKETED, partition_key(key)
+    return _key_hash(fp), fp, partition_key(key)
+
+
+class HamtDictAnyKey(Mapping[Any, Any]):
+    """An immutable dictionary where the keys don't need to be hashable,
+    with set, delete and update methods that return a new version.
+
+    Versions share structure, so a change copies O(log n) nodes
+    instead of the whole dictionary:
+    Stores (key, value) entries in insertion order in _entries: a
+    persistent vector, a trie of 32 slot tuples (depth _shift / 5).
+    Indexes hashable keys by hash in _hashable and unhashable keys by
+    the hash of their fingerprint in _unhashable: hash array mapped
+    tries mapping a key to its entry slot (seq).
+    Unhashable keys without a fingerprint, and keys of types whose ==
+    could accept anything, are also listed with their partition in
+    _loose: a tuple that is copied when changed, and compared one by
+    one like UnHashMap compares them.
+
+    Removed entries are left as DELETED tombstones and the dictionary
+    is rebuilt once tombstones outnumber live entries.
+
+    Maintains order of items inserted. Hashable like FrozenDictAnyKey.
+    """
+
+    __slots__ = (
+        "_hashable",
+        "_unhashable",
+        "_loose",
+        "_entries",
+        "_shift",
+        "_count",
+        "_len",
+        "_hash",
+    )
+
+    # never changes, for the iterators shared with DictAnyKey
+    _version = 0
+
+    def __init__(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:
+        staging = DictAnyKey()
+        if data is not None:
+            DictAnyKey.update_many(staging, data)
+        # staging has no deleted entries: its slots are our seqs
+        hashable = [
+            (hash(key) & _HASH_MASK, key, slot)
+            for key, slot in staging._hashmap.items()
+        ]
+        unhashable = []
+        loose = []
+        unhashmap = staging._unhashmap
+        placed = () if unhashmap is None else unhashmap._values.items()
+        for token, slot in placed:
+            # reuse the fingerprints and partitions computed while staging
+            fp, part = unhashmap._placement[token]  # type: ignore
+            if fp is not UNBUCKETED:
+                unhashable.append((_key_hash(fp), fp, slot))
+            if fp is UNBUCKETED or part is None:
+                loose.append((part, slot))
+        self._hashable = _root(_build(hashable, 0) if hashable else None)
+        self._unhashable = _root(_build(unhashable, 0) if unhashable else None)
+        self._loose: tuple = tuple(loose)
+        self._entries, self._shift = _vector_build(staging._get_items_list())
+        self._count = self._len = len(staging._keys)
+        self._hash: Optional[int] = None
+
+    def _evolve(self, **changes: Any) -> "HamtDictAnyKey":
+        """Return a new version with changes to some slots, sharing the rest."""
+        new = object.__new__(type(self))
+        for name in (
+            "_hashable",
+            "_unhashable",
+            "_loose",
+            "_entries",
+            "_shift",
+            "_count",
+            "_len",
+        ):
+            setattr(new, name, changes.get(name, getattr(self, name)))
+        new._hash = None
+        return new
+
+    def _entry(self, seq: int) -> tuple[Any, Any]:
+        node = self._entries
+        shift = self._shift
+        while shift:
+            node = node[(seq >> shift) & _MASK]
+            shift -= _BITS
+        entry: tuple[Any, Any] = node[seq & _MASK]
+        return entry
+
+    def _search(
+        self,
+        node: Any,
+        h: int,
+        fp: Any,
+        key: Any,
+        eq: Optional[Callable[[Any, Any], bool]],
+    ) -> int:
+        """Return the seq of key, indexed under h and fp in trie node, or -1."""
+        shift = 0
+        while True:
+            if type(node) is _Collision:
+                if node.hash != h:
+                    return -1
+                candidates = node.leaves
+                break
+            bit = 1 << ((h >> shift) & _MASK)
+            if not node.bitmap & bit:
+                return -1
+            node = node.items[_position(node.bitmap, bit)]
+            if type(node) is tuple:
+                candidates = (node,)
+                break
+            shift += _BITS
+        for leaf in candidates:
+            if leaf[0] != h or not (leaf[1] is fp or leaf[1] == fp):
+                continue
+            seq: int = leaf[2]
+            if eq is None or eq(self._entry(seq)[0], key):
+                return seq
+        return -1
+
+    def _lookup(self, key: Any) -> tuple[int, tuple]:
+        """Search for key once.
+        Returns (seq, probe): seq is the entry slot of key or -1 on a miss.
+        probe is (hash, fingerprint, partition), with partition HASHABLE for
+        hashable keys and hash -1 for keys that have no fingerprint.
+        After a hit found by comparing keys one by one, the probe is that of
+        the stored key: it can be indexed elsewhere than key.
+        """
+        try:
+            h = hash(key) & _HASH_MASK
+        except TypeError:
+            pass
+        else:
+            return self._search(self._hashable, h, key, key, None), (h, key, HASHABLE)
+        try:
+            fp = fingerprint(key)
+        except TypeError:
+            fp = UNBUCKETED
+            h = -1
+        else:
+            h = _key_hash(fp)
+            seq = self._search(self._unhashable, h, fp, key, bucket_eq(key))
+            if seq >= 0:
+                return seq, (h, fp, None)
+        part = partition_key(key)
+        for seq in self._candidates(part, fp):
+            stored = self._entry(seq)[0]
+            if keys_equal(stored, key):
+                return seq, _probe(stored)
+        return -1, (h, fp, part)
+
+    def _candidates(self, part: Optional[tuple], fp: Any) -> Iterator[int]:
+        """The seqs of unhashable keys that could equal a key with part and
+        fp, which was not found by its fingerprint, see UnHashMap._lookup.
+        """
+        loose = self._loose
+        if part is None:
+            bucketed = (leaf[2] for leaf in _leaves(self._unhashable))
+            return chain(bucketed, (seq for _, seq in loose))
+        if fp is UNBUCKETED:
+            # rare: scan every unhashable key of the same partition
+            same_part = (
+                leaf[2]
+                for leaf in _leaves(self._unhashable)
+                if partition_key(self._entry(leaf[2])[0]) == part
+            )
+            others = (seq for p, seq in loose if p == part or p is None)
+            return chain(same_part, others)
+        return (seq for p, seq in loose if p == part or p is None)
+
+    def set(self, key: Any, value: Any) -> "HamtDictAnyKey":
+        """Return a new dictionary with key set to value.
+        Shares all but O(log n) nodes with self.
+        """
+        seq, (h, fp, part) = self._lookup(key)
+        if seq >= 0:
+            old_key, old_value = self._entry(seq)
+            if old_value is value:
+                return self
+            entries = _vector_set(self._entries, self._shift, seq, (old_key, value))
+            return self._evolve(_entries=entries)
+        seq = self._count
+        root, shift = self._entries, self._shift
+        if seq == _WIDTH << shift:
+            root, shift = (root,), shift + _BITS
+        changes: dict[str, Any] = {
+            "_entries": _vector_set(root, shift, seq, (key, value)),
+            "_shift": shift,
+            "_count": seq + 1,
+            "_len": self._len + 1,
+        }
+        if part is HASHABLE:
+            changes["_hashable"] = _insert(self._hashable, 0, (h, fp, seq))
+        else:
+            if fp is not UNBUCKETED:
+                changes["_unhashable"] = _insert(self._unhashable, 0, (h, fp, seq))
+            if fp is UNBUCKETED or part is None:
+                changes["_loose"] = self._loose + ((part, seq),)
+        return self._evolve(**changes)
+
+    def delete(self, key: Any) -> "HamtDictAnyKey":
+        """Return a new dictionary without key.
+        Raises KeyError if key is not in the dictionary.
+        """
+        seq, (h, fp, part) = self._lookup(key)
+        if seq < 0:
+            raise KeyError(key)
+        if 2 * (self._len - 1) < self._count:
+            # tombstones would outnumber live entries: rebuild
+            return type(self)(
+                item
+                for slot, item in enumerate(self._iter_entries())
+                if slot != seq and item is not DELETED
+            )
+        changes: dict[str, Any] = {
+            "_entries": _vector_set(self._entries, self._shift, seq, DELETED),
+            "_len": self._len - 1,
+        }
+        if part is HASHABLE:
+            changes["_hashable"] = _root(_remove(self._hashable, 0, h, seq))
+        else:
+            if fp is not UNBUCKETED:
+                changes["_unhashable"] = _root(_remove(self._unhashable, 0, h, seq))
+            if fp is UNBUCKETED or part is None:
+                changes["_loose"] = tuple(
+                    placed for placed in self._loose if placed[1] != seq
+                )
+        return self._evolve(**changes)
+
+    def update(self, data: Union[Iterable, Mapping]) -> "HamtDictAnyKey":
+        """Return a new dictionary updated from dict/iterable data, see DictAnyKey.update."""
+        if isinstance(data, Mapping):
+            pairs: Iterable = ((key, data[key]) for key in data.keys())
+        else:
+            pairs = data
+        new = self
+        for key, value in pairs:
+            new = new.set(key, value)
+        return new
+
+    def __getitem__(self, key: Any) -> Any:
+        seq, _ = self._lookup(key)
+        if seq < 0:
+            raise KeyError(key)
+        return self._entry(seq)[1]
+
+    def get(self, key: Any, default: Optional[Any] = None) -> Any:
+        """Return the value for key if key is in the dictionary, else default."""
+        seq, _ = self._lookup(key)
+        if seq < 0:
+            return default
+        return self._entry(seq)[1]
+
+    def __contains__(self, key: Any) -> bool:
+        return self._lookup(key)[0] >= 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        return DictKeyIterator(self)
+
+    def keys(self) -> DictKeys:  # type: ignore
+        return DictKeys(self)
+
+    def values(self) -> DictValues:  # type: ignore
+        return DictValues(self)
+
+    def items(self) -> DictItems:  # type: ignore
+        return DictItems(self)
+
+    def _iter_entries(self) -> Iterator[Any]:
+        """Every entry slot in order, including tombstones."""
+        entries: Iterator = iter((self._entries,))
+        for _ in range(self._shift // _BITS + 1):
+            entries = chain.from_iterable(entries)
+        return entries
+
+    def _iter_items(self) -> Iterator[tuple[Any, Any]]:
+        return (item for item in self._iter_entries() if item is not DELETED)
+
+    def _iter_keys(self) -> Iterator[Any]:
+        return (item[0] for item in self._iter_items())
+
+    def _iter_values(self) -> Iterator[Any]:
+        return (item[1] for item in self._iter_items())
+
+    def _get_items_list(self) -> list[tuple]:
+        return list(self._iter_items())
+
+    def _get_keys_list(self) -> list[Any]:
+        return list(self._iter_keys())
+
+    def _get_values_list(self) -> list[Any]:
+        return list(self._iter_values())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return False
+        if len(self) != len(other):
+            return False
+        for key, value in self._iter_items():
+            other_value = peek_value(other, key)
+            if other_value is MISSING or value != other_value:
+                return False
+        return True
+
+    def __hash__(self) -> int:
+        """Return hash value based on the frozenset of the fingerprints of items.
+        Computed once, then cached.
+        Raises TypeError if a key or value has no canonical fingerprint.
+        """
+        if self._hash is None:
+            try:
+                self._hash = hash(
+                    frozenset(
+                        (fingerprint(key), fingerprint(value))
+                        for key, value in self._iter_items()
+                    )
+                )
+            except TypeError:
+                raise TypeError(
+                    f"unhashable type: '{self.__class__.__name__}'"
+                ) from None
+        return self._hash
+
+    def __str__(self) -> str:
+        s = ", ".join(
+            f"{quote_string(key)}: {quote_string(value)}"
+            for key, value in self._iter_items()
+        )
+        return "{" + f"{s}" + "}"
+
+    def __repr__(self) -> str:
+        return f"HamtDictAnyKey({self._get_items_list()})"
+
+    def __reduce__(self) -> tuple:
+        """Pickle the keys and values as two ordered lists, see DictAnyKey.__reduce__.
+        The tries are rebuilt when loaded: they depend on str hashes, which
+        differ between processes.
+        """
+        return (_unpickle, (type(self), self._get_keys_list(), self._get_values_list()))
+
+    @classmethod
+    def _from_columns(cls, keys: list, values: list) -> "HamtDictAnyKey":
+        return cls(zip(keys, values))
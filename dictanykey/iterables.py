@@ -1,21 +1,88 @@
-from collections.abc import Iterable, Iterator
-from typing import Any, Optional
+from collections.abc import Iterable, Set
+from typing import Any
 
 from dictanykey.iterators import DictItemIterator, DictKeyIterator, DictValueIterator
 from dictanykey.parent import Parent
+from dictanykey.utils import Marker
+
+# default for parent lookups, never stored as a value
+MISSING = Marker("missing")
 
 
 class View:
+    __slots__ = ("parent",)
+
     def __init__(self, parent: Parent) -> None:
         self.parent = parent
 
     def __len__(self) -> int:
-        return len(self.parent._get_keys_list())
+        return len(self.parent)
+
+
+class SetView(View, Set):
+    """A set-like view: set operations return SetAnyKey results.
+    The operations live in dictanykey.setanykey, which imports this module.
+    """
+
+    __slots__ = ()
+
+    def isdisjoint(self, other: Iterable[Any]) -> bool:
+        from dictanykey import setanykey
+
+        return setanykey.isdisjoint(self, other)
+
+    def __and__(self, other: Any) -> Any:
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        from dictanykey import setanykey
+
+        return setanykey.intersection(self, other)
+
+    __rand__ = __and__
+
+    def __or__(self, other: Any) -> Any:
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        from dictanykey import setanykey
+
+        return setanykey.union(self, other)
+
+    def __ror__(self, other: Any) -> Any:
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        from dictanykey import setanykey
+
+        return setanykey.union(other, self)
+
+    def __sub__(self, other: Any) -> Any:
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        from dictanykey import setanykey
+
+        return setanykey.difference(self, other)
+
+    def __rsub__(self, other: Any) -> Any:
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        from dictanykey import setanykey
 
+        return setanykey.difference(other, self)
+
+    def __xor__(self, other: Any) -> Any:
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        from dictanykey import setanykey
+
+        return setanykey.symmetric_difference(self, other)
+
+    __rxor__ = __xor__
+
+
+class DictKeys(SetView):
+    __slots__ = ()
 
-class DictKeys(View):
     def __contains__(self, key: Any) -> bool:
-        return key in self.parent._get_keys_list()
+        return key in self.parent
 
     def __iter__(self) -> DictKeyIterator:
         return DictKeyIterator(self.parent)
@@ -25,8 +92,13 @@ class DictKeys(View):
 
 
 class DictValues(View):
+    __slots__ = ()
+
     def __contains__(self, value: Any) -> bool:
-        return value in self.parent._get_values_list()
+        for other in self.parent._iter_values():
+            if other is value or other == value:
+                return True
+        return False
 
     def __iter__(self) -> DictValueIterator:
         return DictValueIterator(self.parent)
@@ -35,35 +107,21 @@ class DictValues(View):
         return f"DictValues({self.parent._get_values_list()})"
 
 
-class DictItems(View):
+class DictItems(SetView):
+    __slots__ = ()
+
     def __contains__(self, item: Any) -> bool:
-        return item in self.parent._get_items_list()
+        try:
+            key, value = item
+        except (TypeError, ValueError):
+            return False
+        other = self.parent.get(key, MISSING)
+        if other is MISSING:
+            return False
+        return other is value or other == value
 
     def __iter__(self) -> DictItemIterator:
         return DictItemIterator(self.parent)
 
     def __repr__(self) -> str:
         return f"DictItems({self.parent._get_items_list()})"
-
-
-class OrderedKeys:
-    def __init__(self, keys: Optional[Iterable] = None) -> None:
-        self.keys: list = list(keys) if keys is not None else []
-
-    def add(self, key: Any) -> None:
-        if key not in self.keys:
-            self.keys.append(key)
-
-    def delete(self, key: Any) -> None:
-        if key in self.keys:
-            i = self.keys.index(key)
-            del self.keys[i]
-
-    def __iter__(self) -> Iterator:
-        return iter(self.keys)
-
-    def __len__(self) -> int:
-        return len(self.keys)
-
-    def __contains__(self, key: Any) -> bool:
-        return key in self.keys
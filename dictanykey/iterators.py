@@ -5,45 +5,51 @@ from dictanykey.parent import Parent
 
 
 class DictKeyIterator:
+    __slots__ = ("parent", "version", "iterator")
+
     def __init__(self, parent: Parent) -> None:
         self.parent = parent
-        self.len: int = len(parent)
-        self.iterator: Iterator = iter(parent._get_keys_list())
+        self.version: int = parent._version
+        self.iterator: Iterator = parent._iter_keys()
 
     def __iter__(self) -> Iterator[Any]:
         return self
 
     def __next__(self) -> Any:
-        if len(self.parent) != self.len:
-            raise RuntimeError("dictionary changed size during iteration")
+        if self.parent._version != self.version:
+            raise RuntimeError("dictionary changed during iteration")
         return next(self.iterator)
 
 
 class DictValueIterator:
+    __slots__ = ("parent", "version", "iterator")
+
     def __init__(self, parent: Parent) -> None:
         self.parent = parent
-        self.len: int = len(parent)
-        self.iterator: Iterator = iter(parent._get_values_list())
+        self.version: int = parent._version
+        self.iterator: Iterator = parent._iter_values()
 
     def __iter__(self) -> Iterator[Any]:
         return self
 
     def __next__(self) -> Any:
-        if len(self.parent) != self.len:
-            raise RuntimeError("dictionary changed size during iteration")
+        if self.parent._version != self.version:
+            raise RuntimeError("dictionary changed during iteration")
         return next(self.iterator)
 
 
 class DictItemIterator:
+    __slots__ = ("parent", "version", "iterator")
+
     def __init__(self, parent: Parent) -> None:
         self.parent = parent
-        self.len: int = len(parent)
-        self.iterator: Iterator = iter(parent._get_items_list())
+        self.version: int = parent._version
+        self.iterator: Iterator = parent._iter_items()
 
     def __iter__(self) -> Iterator[tuple[Any, Any]]:
         return self
 
     def __next__(self) -> tuple[Any, Any]:
-        if len(self.parent) != self.len:
-            raise RuntimeError("dictionary changed size during iteration")
+        if self.parent._version != self.version:
+            raise RuntimeError("dictionary changed during iteration")
         return next(self.iterator)  # type: ignore
@@ -0,0 +1,309 @@
+from collections.abc import Callable, Iterable, Mapping
+from itertools import repeat
+from typing import Any, Optional, Union
+
+from dictanykey.dictanykey import DELETED, HASHABLE, DictAnyKey
+from dictanykey.iterables import DictItems
+
+POLICIES = ("lru", "lfu", "fifo")
+
+
+class LRUDictAnyKey(DictAnyKey):
+    """A DictAnyKey holding at most maxsize items, for use as a cache.
+
+    Inserting a new key into a full dictionary first evicts one item,
+    chosen by policy:
+    "lru": the least recently used item. Reading a key with [] or get(),
+    or setting it, moves it to the end of the entry lists.
+    "lfu": the least frequently used item, the least recently used
+    among those used as often. Uses are counted per slot in _freq, and
+    slots are grouped by count in _buckets: dict, count -> slots in
+    the order they reached that count.
+    "fifo": the oldest inserted item.
+    Hashable and unhashable keys are treated the same, and promoting
+    or evicting a key is O(1), amortized over the compaction of the
+    entry lists.
+
+    on_evict(key, value) is called after each item is evicted.
+    `in`, on the dictionary or its items(), and == don't count as uses.
+    fromkeys(), from_pairs() and from_mapping() take maxsize as a
+    keyword argument. Reading a key during iteration of an "lru"
+    dictionary changes its order, so the iterator raises RuntimeError,
+    like OrderedDict.
+
+    Maintains order of items inserted, or last used for "lru".
+    """
+
+    __slots__ = (
+        "maxsize",
+        "policy",
+        "on_evict",
+        "_head",
+        "_freq",
+        "_buckets",
+        "_min_freq",
+    )
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        data: Optional[Union[Iterable, Mapping]] = None,
+        policy: str = "lru",
+        on_evict: Optional[Callable[[Any, Any], Any]] = None,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, not {policy!r}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_evict = on_evict
+        self._reset_usage()
+        super().__init__(data)
+
+    def _reset_usage(self) -> None:
+        # every slot before _head is a tombstone
+        self._head = 0
+        self._freq: dict[int, int] = {}
+        self._buckets: dict[int, dict[int, None]] = {}
+        self._min_freq = 0
+
+    def _touch(self, key: Any, slot: int, probe: Any) -> None:
+        """Count a use of key, which _lookup just found at slot."""
+        if self.policy == "lru":
+            self._move_to_end(key, slot, probe)
+        elif self.policy == "lfu":
+            count = self._freq[slot]
+            bucket = self._buckets[count]
+            del bucket[slot]
+            if not bucket:
+                del self._buckets[count]
+                if self._min_freq == count:
+                    self._min_freq = count + 1
+            self._freq[slot] = count + 1
+            self._buckets.setdefault(count + 1, {})[slot] = None
+
+    def _move_to_end(self, key: Any, slot: int, probe: Any) -> None:
+        """Move the entry of key from slot to the end of the entry lists."""
+        end = len(self._keys)
+        if slot == end - 1:
+            return
+        if self._shared:
+            self._own(
+                "_keys", "_values", "_hashmap" if probe is HASHABLE else "_unhashmap"
+            )
+        keys, values = self._keys, self._values
+        keys.append(keys[slot])
+        values.append(values[slot])
+        keys[slot] = DELETED
+        values[slot] = None
+        if probe is HASHABLE:
+            self._hashmap[key] = end
+        else:
+            self._unhashmap._values[probe[0]] = end  # type: ignore
+        self._version += 1
+        if len(keys) > 2 * len(self):
+            self._compact()
+
+    def _victim(self) -> int:
+        """Return the slot of the item to evict."""
+        if self.policy == "lfu":
+            bucket = self._buckets.get(self._min_freq)
+            if bucket is None:
+                # the least used items were deleted
+                self._min_freq = min(self._buckets)
+                bucket = self._buckets[self._min_freq]
+            return next(iter(bucket))
+        keys = self._keys
+        while keys[self._head] is DELETED:
+            self._head += 1
+        return self._head
+
+    def _insert(self, key: Any, value: Any, probe: Any) -> None:
+        evicted = None
+        if len(self) >= self.maxsize:
+            slot = self._victim()
+            old_key, old_value = self._keys[slot], self._values[slot]
+            self._delete(old_key, slot, self._lookup(old_key)[1])
+            evicted = (old_key, old_value)
+        super()._insert(key, value, probe)
+        if self.policy == "lfu":
+            slot = len(self._keys) - 1
+            self._freq[slot] = 1
+            self._buckets.setdefault(1, {})[slot] = None
+            self._min_freq = 1
+        if evicted is not None and self.on_evict is not None:
+            self.on_evict(*evicted)
+
+    def _delete(self, key: Any, slot: int, probe: Any) -> None:
+        if self._freq:
+            count = self._freq.pop(slot)
+            bucket = self._buckets[count]
+            del bucket[slot]
+            if not bucket:
+                del self._buckets[count]
+        super()._delete(key, slot, probe)
+        # trailing tombstones are dropped, possibly down to no entries
+        self._head = min(self._head, len(self._keys))
+
+    def _compact(self) -> dict[int, int]:
+        renumber = super()._compact()
+        self._head = 0
+        if self._freq:
+            self._freq, self._buckets = self._renumbered_usage(renumber)
+        return renumber
+
+    def _renumbered_usage(self, renumber: dict[int, int]) -> tuple[dict, dict]:
+        """Return _freq and _buckets with the slots in renumber replaced."""
+        freq = {renumber[slot]: count for slot, count in self._freq.items()}
+        buckets = {
+            count: {renumber[slot]: None for slot in bucket}
+            for count, bucket in self._buckets.items()
+        }
+        return freq, buckets
+
+    def __getitem__(self, key: Any) -> Any:
+        slot, probe = self._lookup(key)
+        if slot < 0:
+            raise KeyError(key)
+        value = self._values[slot]
+        self._touch(key, slot, probe)
+        return value
+
+    def get(self, key: Any, default: Optional[Any] = None) -> Any:
+        """Return the value for key if key is in the dictionary, else default."""
+        slot, probe = self._lookup(key)
+        if slot < 0:
+            return default
+        value = self._values[slot]
+        self._touch(key, slot, probe)
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        slot, probe = self._lookup(key)
+        if slot < 0:
+            self._insert(key, value, probe)
+            return
+        if self._shared:
+            self._own("_values")
+        self._values[slot] = value
+        self._touch(key, slot, probe)
+
+    def setdefault(self, key: Any, default: Optional[Any] = None) -> Any:
+        """Insert key with a value of default if key is not in the dictionary.
+
+        Return the value for key if key is in the dictionary, else default.
+        """
+        slot, probe = self._lookup(key)
+        if slot < 0:
+            self._insert(key, default, probe)
+            return default
+        value = self._values[slot]
+        self._touch(key, slot, probe)
+        return value
+
+    def update(  # type: ignore
+        self, data: Optional[Union[Iterable, Mapping]] = None
+    ) -> None:
+        """Update dict from dict/iterable data, one item at a time so that
+        items are evicted as in __setitem__.
+        """
+        if data is None:
+            return
+        if isinstance(data, Mapping):
+            for key in data.keys():
+                self[key] = data[key]
+        else:
+            for key, value in data:
+                self[key] = value
+
+    update_many = update
+
+    def clear(self) -> None:
+        """Remove all items from self."""
+        super().clear()
+        self._reset_usage()
+
+    def items(self) -> "LRUDictItems":  # type: ignore
+        return LRUDictItems(self)
+
+    @classmethod
+    def fromkeys(  # type: ignore
+        cls,
+        iterable: Iterable[Any],
+        value: Optional[Any] = None,
+        *,
+        maxsize: int,
+        policy: str = "lru",
+    ) -> "LRUDictAnyKey":
+        """Create a new dictionary holding at most maxsize items, with keys
+        from iterable and values set to value.
+        """
+        return cls(maxsize, zip(iterable, repeat(value)), policy=policy)
+
+    @classmethod
+    def from_pairs(  # type: ignore
+        cls, pairs: Iterable[tuple[Any, Any]], *, maxsize: int, policy: str = "lru"
+    ) -> "LRUDictAnyKey":
+        return cls(maxsize, pairs, policy=policy)
+
+    @classmethod
+    def from_mapping(  # type: ignore
+        cls, mapping: Mapping, *, maxsize: int, policy: str = "lru"
+    ) -> "LRUDictAnyKey":
+        if not isinstance(mapping, Mapping):
+            raise TypeError(f"'{type(mapping).__name__}' object is not a mapping")
+        return cls(maxsize, mapping, policy=policy)
+
+    def copy(self) -> "LRUDictAnyKey":
+        new = super().copy()
+        new.maxsize = self.maxsize
+        new.policy = self.policy
+        new.on_evict = self.on_evict
+        new._head = self._head
+        new._freq = self._freq.copy()
+        new._buckets = {count: bucket.copy() for count, bucket in self._buckets.items()}
+        new._min_freq = self._min_freq
+        return new
+
+    def __reduce__(self) -> tuple:
+        function, args = super().__reduce__()
+        state = {
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "on_evict": self.on_evict,
+            "_head": 0,
+            "_freq": {},
+            "_buckets": {},
+            "_min_freq": self._min_freq,
+        }
+        if self._freq:
+            # slots as numbered in the pickled entry lists
+            live = [slot for slot, key in enumerate(self._keys) if key is not DELETED]
+            renumber = {old: new for new, old in enumerate(live)}
+            state["_freq"], state["_buckets"] = self._renumbered_usage(renumber)
+        return (function, args, (None, state))
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({self.maxsize}, {self._get_items_list()}, "
+            f"policy={self.policy!r})"
+        )
+
+
+class LRUDictItems(DictItems):
+    """Items view of an LRUDictAnyKey, `in` doesn't count as a use."""
+
+    __slots__ = ()
+    parent: LRUDictAnyKey
+
+    def __contains__(self, item: Any) -> bool:
+        try:
+            key, value = item
+        except (TypeError, ValueError):
+            return False
+        slot = self.parent._lookup(key)[0]
+        if slot < 0:
+            return False
+        other = self.parent._values[slot]
+        return other is value or other == value
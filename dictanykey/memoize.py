@@ -0,0 +1,149 @@
+from collections import OrderedDict, namedtuple
+from functools import update_wrapper
+from itertools import count
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Optional
+
+from dictanykey.fingerprints import fingerprint, fingerprints_exact, keys_equal
+from dictanykey.utils import Marker
+
+# separates positional from keyword arguments in call keys
+_KWARGS = Marker("kwargs")
+# tags the cache slots of calls with an argument that has no fingerprint
+_LOOSE = Marker("loose")
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def memoize_anykey(
+    maxsize: Any = 128, ttl: Optional[float] = None
+) -> Callable[[Callable], Callable]:
+    """Decorator caching the results of a function, like
+    functools.lru_cache, for arguments that don't need to be hashable.
+
+    Calls are cached by the fingerprint of their arguments (see
+    dictanykey.fingerprints.fingerprint): lists, dicts and sets are
+    compared by value, keyword arguments in any order. As with
+    lru_cache, 1, 1.0 and True are the same argument.
+
+    maxsize: the most results kept, least recently used first out.
+    None keeps every result, 0 none.
+    ttl: seconds a result stays valid, or None for no limit.
+
+    The decorated function has cache_info(), cache_clear() and
+    cache_parameters(), like lru_cache. Calls with an argument that has
+    no fingerprint are cached too, but found by comparing them with each
+    such cached call, like DictAnyKey compares keys without fingerprint.
+    Thread safe: the cache is updated under a lock, the function is
+    called outside of it.
+
+    Can be used without arguments: @memoize_anykey
+    """
+    if callable(maxsize):
+        return _memoize(maxsize, 128, ttl)
+    if maxsize is not None and maxsize < 0:
+        maxsize = 0
+
+    def decorating(func: Callable) -> Callable:
+        return _memoize(func, maxsize, ttl)
+
+    return decorating
+
+
+def _calls_equal(a: tuple, b: tuple) -> bool:
+    """Compare two call keys argument by argument with keys_equal, and
+    keyword arguments by name: == on whole call keys raises for
+    arguments such as ndarrays.
+    """
+    if len(a) != len(b):
+        return False
+    for i, (x, y) in enumerate(zip(a, b)):
+        if i and a[i - 1] is _KWARGS:
+            # b[i - 1] is _KWARGS too: both are keyword argument dicts
+            if x.keys() != y.keys() or not all(keys_equal(x[n], y[n]) for n in x):
+                return False
+        elif not keys_equal(x, y):
+            return False
+    return True
+
+
+def _memoize(func: Callable, maxsize: Optional[int], ttl: Optional[float]) -> Callable:
+    # fingerprint, or (_LOOSE, number) for calls without one
+    # -> [call key, result, expiry time or None]
+    cache: OrderedDict[Any, list] = OrderedDict()
+    # the slots of calls without fingerprint, compared one by one
+    loose: dict[tuple, None] = {}
+    numbers = count()
+    lock = Lock()
+    hits = misses = 0
+
+    def find_loose(key: tuple) -> Optional[tuple]:
+        """Return the slot of call key, which has no fingerprint, or None."""
+        for slot in loose:
+            if _calls_equal(cache[slot][0], key):
+                return slot
+        return None
+
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        nonlocal hits, misses
+        key: tuple = args + (_KWARGS, kwargs) if kwargs else args
+        try:
+            fp = fingerprint(key)
+        except TypeError:
+            # no canonical form
+            fp = _LOOSE
+        with lock:
+            slot = find_loose(key) if fp is _LOOSE else fp
+            entry = None if slot is None else cache.get(slot)
+            if (
+                entry is not None
+                and (entry[2] is None or entry[2] > monotonic())
+                and (
+                    fp is _LOOSE or fingerprints_exact() or _calls_equal(entry[0], key)
+                )
+            ):
+                cache.move_to_end(slot)
+                hits += 1
+                return entry[1]
+            misses += 1
+        result = func(*args, **kwargs)
+        if maxsize == 0:
+            return result
+        expires = None if ttl is None else monotonic() + ttl
+        with lock:
+            if fp is _LOOSE:
+                # the cache may have changed while func ran
+                slot = find_loose(key)
+                if slot is None:
+                    slot = (_LOOSE, next(numbers))
+                    loose[slot] = None
+            else:
+                slot = fp
+            cache[slot] = [key, result, expires]
+            cache.move_to_end(slot)
+            if maxsize is not None and len(cache) > maxsize:
+                evicted, _ = cache.popitem(last=False)
+                loose.pop(evicted, None)
+        return result
+
+    def cache_info() -> CacheInfo:
+        """Report cache statistics."""
+        with lock:
+            return CacheInfo(hits, misses, maxsize, len(cache))
+
+    def cache_clear() -> None:
+        """Clear the cache and cache statistics."""
+        nonlocal hits, misses
+        with lock:
+            cache.clear()
+            loose.clear()
+            hits = misses = 0
+
+    def cache_parameters() -> dict[str, Any]:
+        return {"maxsize": maxsize, "ttl": ttl}
+
+    wrapper.cache_info = cache_info  # type: ignore
+    wrapper.cache_clear = cache_clear  # type: ignore
+    wrapper.cache_parameters = cache_parameters  # type: ignore
+    return update_wrapper(wrapper, func)
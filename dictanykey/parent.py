@@ -1,7 +1,13 @@
-from typing import Any
+from collections.abc import Iterator
+from typing import Any, Protocol
 
 
-class Parent:
+class Parent(Protocol):
+    """What views and iterators use of the dictionary they belong to."""
+
+    # bumped whenever keys are added or removed
+    _version: int
+
     def _get_keys_list(self) -> list[Any]:
         raise NotImplementedError
 
@@ -11,5 +17,23 @@ class Parent:
     def _get_items_list(self) -> list[tuple[Any, Any]]:
         raise NotImplementedError
 
+    def _iter_keys(self) -> Iterator[Any]:
+        raise NotImplementedError
+
+    def _iter_values(self) -> Iterator[Any]:
+        raise NotImplementedError
+
+    def _iter_items(self) -> Iterator[tuple[Any, Any]]:
+        raise NotImplementedError
+
     def __len__(self) -> int:
         raise NotImplementedError
+
+    def __contains__(self, key: Any) -> bool:
+        raise NotImplementedError
+
+    def __getitem__(self, key: Any) -> Any:
+        raise NotImplementedError
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        raise NotImplementedError
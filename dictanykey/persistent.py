@@ -0,0 +1,323 @@
+import pickle
+import sqlite3
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping
+from itertools import islice
+from typing import Any, Optional, Union
+
+from dictanykey.dictanykey import peek_value
+from dictanykey.fingerprints import encode_key
+from dictanykey.iterables import MISSING, DictItems, DictKeys, DictValues
+from dictanykey.iterators import DictKeyIterator
+
+# rows read from the table at a time while iterating
+PAGE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    seq INTEGER PRIMARY KEY,
+    key BLOB NOT NULL UNIQUE,
+    original BLOB NOT NULL,
+    value BLOB NOT NULL
+)
+"""
+_UPSERT = """
+INSERT INTO items (key, original, value) VALUES (?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET value = excluded.value
+"""
+
+
+def _commit_and_close(db: sqlite3.Connection) -> None:
+    db.commit()
+    db.close()
+
+
+class PersistentDictAnyKey(MutableMapping[Any, Any]):
+    """A dictionary where the keys don't need to be hashable, stored in
+    an SQLite database at path, so it can be larger than memory.
+
+    Stores one row per item in the items table:
+    seq: INTEGER PRIMARY KEY, in insertion order
+    key: the canonical encoding of the key (see encode_key), UNIQUE so
+    that lookups use its index
+    original, value: the pickled key, as first inserted, and value
+
+    Writes are committed in batches of batch_size, and by flush(),
+    close() or leaving a with block. A dictionary that is garbage
+    collected, or still open when the interpreter exits, commits and
+    closes its database like close(); items written since the last
+    commit are lost if the process dies. Read values are kept pickled
+    in a least recently used cache of cache_size keys.
+
+    Keys must have a canonical encoding, see encode_key. Keys and values
+    must be picklable. Like shelve, values are unpickled on every read:
+    changing a value read from the dictionary doesn't change the
+    stored value.
+
+    Maintains order of items inserted.
+    """
+
+    __slots__ = (
+        "path",
+        "batch_size",
+        "cache_size",
+        "_db",
+        "_cache",
+        "_pending",
+        "_len",
+        "_version",
+        "_finalizer",
+        "__weakref__",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        data: Optional[Union[Iterable, Mapping]] = None,
+        batch_size: int = 1000,
+        cache_size: int = 1024,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._db = sqlite3.connect(path)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        # pending writes are committed if self is dropped without close()
+        self._finalizer = weakref.finalize(self, _commit_and_close, self._db)
+        # encoded key -> pickled value
+        self._cache: OrderedDict[bytes, bytes] = OrderedDict()
+        self._pending = 0
+        self._len: int = self._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self._version = 0
+        self.update(data)
+
+    def _wrote(self, rows: int) -> None:
+        """Count rows written, committing once batch_size are pending."""
+        self._pending += rows
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def _cache_get(self, key: bytes) -> Any:
+        blob = self._cache.get(key, MISSING)
+        if blob is not MISSING:
+            self._cache.move_to_end(key)
+        return blob
+
+    def _cache_put(self, key: bytes, blob: bytes) -> None:
+        if self.cache_size <= 0:
+            return
+        cache = self._cache
+        cache[key] = blob
+        cache.move_to_end(key)
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _lookup(self, key: Any) -> Any:
+        """Return the pickled value of key, or MISSING."""
+        try:
+            encoded = encode_key(key)
+        except TypeError:
+            # could not have been stored
+            return MISSING
+        blob = self._cache_get(encoded)
+        if blob is MISSING:
+            row = self._db.execute(
+                "SELECT value FROM items WHERE key = ?", (encoded,)
+            ).fetchone()
+            if row is None:
+                return MISSING
+            blob = row[0]
+            self._cache_put(encoded, blob)
+        return blob
+
+    def __getitem__(self, key: Any) -> Any:
+        blob = self._lookup(key)
+        if blob is MISSING:
+            raise KeyError(key)
+        return pickle.loads(blob)
+
+    def get(self, key: Any, default: Optional[Any] = None) -> Any:
+        """Return the value for key if key is in the dictionary, else default."""
+        blob = self._lookup(key)
+        if blob is MISSING:
+            return default
+        return pickle.loads(blob)
+
+    def __contains__(self, key: Any) -> bool:
+        return self._lookup(key) is not MISSING
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        encoded = encode_key(key)
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        updated = self._db.execute(
+            "UPDATE items SET value = ? WHERE key = ?", (blob, encoded)
+        ).rowcount
+        if not updated:
+            self._db.execute(
+                "INSERT INTO items (key, original, value) VALUES (?, ?, ?)",
+                (encoded, pickle.dumps(key, pickle.HIGHEST_PROTOCOL), blob),
+            )
+            self._len += 1
+            self._version += 1
+        self._cache_put(encoded, blob)
+        self._wrote(1)
+
+    def __delitem__(self, key: Any) -> None:
+        try:
+            encoded = encode_key(key)
+        except TypeError:
+            raise KeyError(key) from None
+        deleted = self._db.execute(
+            "DELETE FROM items WHERE key = ?", (encoded,)
+        ).rowcount
+        if not deleted:
+            raise KeyError(key)
+        self._cache.pop(encoded, None)
+        self._len -= 1
+        self._version += 1
+        self._wrote(1)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        return DictKeyIterator(self)
+
+    def keys(self) -> DictKeys:  # type: ignore
+        return DictKeys(self)
+
+    def values(self) -> DictValues:  # type: ignore
+        return DictValues(self)
+
+    def items(self) -> DictItems:  # type: ignore
+        return DictItems(self)
+
+    def _iter_rows(self, columns: str) -> Iterator[tuple]:
+        """Rows of columns in insertion order, read PAGE_SIZE at a time."""
+        seq = -1
+        while True:
+            rows = self._db.execute(
+                f"SELECT seq, {columns} FROM items WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, PAGE_SIZE),
+            ).fetchall()
+            yield from rows
+            if len(rows) < PAGE_SIZE:
+                return
+            seq = rows[-1][0]
+
+    def _iter_keys(self) -> Iterator[Any]:
+        for _, original in self._iter_rows("original"):
+            yield pickle.loads(original)
+
+    def _iter_values(self) -> Iterator[Any]:
+        for _, value in self._iter_rows("value"):
+            yield pickle.loads(value)
+
+    def _iter_items(self) -> Iterator[tuple[Any, Any]]:
+        for _, original, value in self._iter_rows("original, value"):
+            yield pickle.loads(original), pickle.loads(value)
+
+    def _get_keys_list(self) -> list[Any]:
+        return list(self._iter_keys())
+
+    def _get_values_list(self) -> list[Any]:
+        return list(self._iter_values())
+
+    def _get_items_list(self) -> list[tuple[Any, Any]]:
+        return list(self._iter_items())
+
+    def update(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:  # type: ignore
+        """Update dict from dict/iterable data, like DictAnyKey.update.
+        Writes batch_size items per statement and transaction.
+        """
+        if data is None:
+            return
+        if isinstance(data, Mapping):
+            pairs: Iterator = ((key, data[key]) for key in data.keys())
+        else:
+            pairs = iter(data)
+        dumps = pickle.dumps
+        protocol = pickle.HIGHEST_PROTOCOL
+        cache = self._cache
+        db = self._db
+        added = 0
+        while True:
+            rows = [
+                (encode_key(key), dumps(key, protocol), dumps(value, protocol))
+                for key, value in islice(pairs, max(self.batch_size, 1))
+            ]
+            if not rows:
+                break
+            last = db.execute("SELECT IFNULL(MAX(seq), 0) FROM items").fetchone()[0]
+            db.executemany(_UPSERT, rows)
+            # updated rows keep their seq, inserted rows get a larger one:
+            # count them by primary key range instead of scanning the table
+            added += db.execute(
+                "SELECT COUNT(*) FROM items WHERE seq > ?", (last,)
+            ).fetchone()[0]
+            for encoded, _, blob in rows:
+                if encoded in cache:
+                    cache[encoded] = blob
+            self._wrote(len(rows))
+        if added:
+            self._len += added
+            self._version += 1
+
+    def popitem(self) -> tuple[Any, Any]:
+        """Remove and return a (key, value) pair as a 2-tuple.
+
+        Pairs are returned in LIFO (last-in, first-out) order.
+        Raises KeyError if the dict is empty.
+        """
+        row = self._db.execute(
+            "SELECT seq, key, original, value FROM items ORDER BY seq DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            raise KeyError("popitem(): dictionary is empty")
+        seq, encoded, original, value = row
+        self._db.execute("DELETE FROM items WHERE seq = ?", (seq,))
+        self._cache.pop(encoded, None)
+        self._len -= 1
+        self._version += 1
+        self._wrote(1)
+        return pickle.loads(original), pickle.loads(value)
+
+    def clear(self) -> None:
+        """Remove all items from self."""
+        self._db.execute("DELETE FROM items")
+        self._cache.clear()
+        self._len = 0
+        self._version += 1
+        self._wrote(1)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return False
+        if len(self) != len(other):
+            return False
+        for key, value in self._iter_items():
+            other_value = peek_value(other, key)
+            if other_value is MISSING or value != other_value:
+                return False
+        return True
+
+    def flush(self) -> None:
+        """Commit the writes made since the last commit."""
+        self._db.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        """Commit pending writes and close the database."""
+        self._pending = 0
+        self._finalizer()
+
+    def __enter__(self) -> "PersistentDictAnyKey":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"PersistentDictAnyKey({self.path!r})"
@@ -0,0 +1,154 @@
+from collections.abc import Iterable, Iterator, MutableSet
+from typing import Any, Optional
+
+from dictanykey.dictanykey import DictAnyKey
+from dictanykey.iterables import DictKeys
+
+
+class SetAnyKey(MutableSet[Any]):
+    """A set where the members don't need to be hashable
+    Stores members as the keys of a DictAnyKey: _map
+
+    Maintains order of members added.
+
+    Set operations with other SetAnyKeys and DictAnyKey key views
+    run native set algebra on the hashable members and only scan the
+    unhashable members. Like set, the order of their results is arbitrary.
+    """
+
+    __slots__ = ("_map",)
+
+    def __init__(self, data: Optional[Iterable[Any]] = None) -> None:
+        self._map = DictAnyKey.fromkeys(() if data is None else data)
+
+    @classmethod
+    def _from_partitions(
+        cls, hashable: Iterable[Any], unhashable: Iterable[Any]
+    ) -> "SetAnyKey":
+        new = cls()
+        new._map = DictAnyKey._from_partitions(hashable, unhashable)
+        return new
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self._map
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._map)
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def __repr__(self) -> str:
+        return f"SetAnyKey({self._map._get_keys_list()})"
+
+    def add(self, value: Any) -> None:
+        """Add value to the set, if it is not already a member."""
+        slot, probe = self._map._lookup(value)
+        if slot < 0:
+            self._map._insert(value, None, probe)
+
+    def discard(self, value: Any) -> None:
+        """Remove value from the set, if it is a member."""
+        slot, probe = self._map._lookup(value)
+        if slot >= 0:
+            self._map._delete(value, slot, probe)
+
+    def copy(self) -> "SetAnyKey":
+        """Return a shallow copy in O(1), see DictAnyKey.copy."""
+        new = type(self)()
+        new._map = self._map.copy()
+        return new
+
+    def isdisjoint(self, other: Iterable[Any]) -> bool:
+        return isdisjoint(self, other)
+
+    def __and__(self, other: Any) -> "SetAnyKey":
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        return intersection(self, other)
+
+    __rand__ = __and__
+
+    def __or__(self, other: Any) -> "SetAnyKey":
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        return union(self, other)
+
+    def __ror__(self, other: Any) -> "SetAnyKey":
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        return union(other, self)
+
+    def __sub__(self, other: Any) -> "SetAnyKey":
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        return difference(self, other)
+
+    def __rsub__(self, other: Any) -> "SetAnyKey":
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        return difference(other, self)
+
+    def __xor__(self, other: Any) -> "SetAnyKey":
+        if not isinstance(other, Iterable):
+            return NotImplemented
+        return symmetric_difference(self, other)
+
+    __rxor__ = __xor__
+
+
+def _partitioned(members: Iterable[Any]) -> DictAnyKey:
+    """Return a DictAnyKey keyed by members, reusing existing indexes."""
+    if isinstance(members, SetAnyKey):
+        return members._map
+    if isinstance(members, DictAnyKey):
+        return members
+    if isinstance(members, DictKeys) and isinstance(members.parent, DictAnyKey):
+        return members.parent
+    return SetAnyKey(members)._map
+
+
+def intersection(a: Iterable[Any], b: Iterable[Any]) -> SetAnyKey:
+    """Members of both a and b."""
+    left, right = _partitioned(a), _partitioned(b)
+    return SetAnyKey._from_partitions(
+        left._hashable_keys() & right._hashable_keys(),
+        [key for key in left._unhashable_keys() if key in right],
+    )
+
+
+def union(a: Iterable[Any], b: Iterable[Any]) -> SetAnyKey:
+    """Members of a or b."""
+    left, right = _partitioned(a), _partitioned(b)
+    unhashable = list(left._unhashable_keys())
+    unhashable.extend(key for key in right._unhashable_keys() if key not in left)
+    return SetAnyKey._from_partitions(
+        left._hashable_keys() | right._hashable_keys(), unhashable
+    )
+
+
+def difference(a: Iterable[Any], b: Iterable[Any]) -> SetAnyKey:
+    """Members of a that are not in b."""
+    left, right = _partitioned(a), _partitioned(b)
+    return SetAnyKey._from_partitions(
+        left._hashable_keys() - right._hashable_keys(),
+        [key for key in left._unhashable_keys() if key not in right],
+    )
+
+
+def symmetric_difference(a: Iterable[Any], b: Iterable[Any]) -> SetAnyKey:
+    """Members of exactly one of a and b."""
+    left, right = _partitioned(a), _partitioned(b)
+    unhashable = [key for key in left._unhashable_keys() if key not in right]
+    unhashable.extend(key for key in right._unhashable_keys() if key not in left)
+    return SetAnyKey._from_partitions(
+        left._hashable_keys() ^ right._hashable_keys(), unhashable
+    )
+
+
+def isdisjoint(a: Iterable[Any], b: Iterable[Any]) -> bool:
+    """Return True if a and b have no members in common."""
+    left, right = _partitioned(a), _partitioned(b)
+    if not left._hashable_keys().isdisjoint(right._hashable_keys()):
+        return False
+    return not any(key in right for key in left._unhashable_keys())
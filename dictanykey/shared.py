@@ -0,0 +1,384 @@
+import mmap
+import os
+import pickle
+import struct
+import sys
+import weakref
+from collections.abc import Iterable, Iterator, Mapping
+from hashlib import blake2b
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Optional, Union
+
+from dictanykey.dictanykey import peek_value
+from dictanykey.fingerprints import encode_key
+from dictanykey.iterables import MISSING, DictItems, DictKeys, DictValues
+from dictanykey.iterators import DictKeyIterator
+
+# Layout of an exported table, all integers little endian, sections
+# aligned to 8 bytes:
+# header: magic, count, index size, entries offset, index offset, data offset
+# index: index size 64 bit key hashes, then index size entry numbers (-1: empty)
+# entries: count records of (data offset, encoded key, key and value lengths)
+# data: per entry the encoded key, the pickled key and the pickled value
+MAGIC = b"DAKSHM01"
+_HEADER = struct.Struct("<8s5Q")
+_RECORD = 4
+
+
+def key_hash(encoded: bytes) -> int:
+    """Return the 64 bit hash of an encoded key, the same in every process."""
+    return int.from_bytes(blake2b(encoded, digest_size=8).digest(), "little")
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+def dumps(items: Iterable[tuple[Any, Any]]) -> bytearray:
+    """Return items serialized in the shared layout.
+
+    Raises TypeError if a key has no canonical encoding (see encode_key)
+    and ValueError if two keys encode alike.
+    """
+    protocol = pickle.HIGHEST_PROTOCOL
+    data = bytearray()
+    records: list[int] = []
+    hashes: list[int] = []
+    for key, value in items:
+        encoded = encode_key(key)
+        pickled_key = pickle.dumps(key, protocol)
+        pickled_value = pickle.dumps(value, protocol)
+        records += (len(data), len(encoded), len(pickled_key), len(pickled_value))
+        hashes.append(key_hash(encoded))
+        data += encoded
+        data += pickled_key
+        data += pickled_value
+    count = len(hashes)
+    # open addressing with linear probing, at most half full
+    size = 8
+    while size < 2 * count:
+        size *= 2
+    mask = size - 1
+    index_hashes = [0] * size
+    index_slots = [-1] * size
+    for entry, h in enumerate(hashes):
+        i = h & mask
+        while index_slots[i] >= 0:
+            other = index_slots[i]
+            if index_hashes[i] == h and _encoded(data, records, other) == _encoded(
+                data, records, entry
+            ):
+                raise ValueError(f"keys {other} and {entry} encode alike")
+            i = (i + 1) & mask
+        index_hashes[i] = h
+        index_slots[i] = entry
+    index_offset = _HEADER.size + _pad(_HEADER.size)
+    entries_offset = index_offset + 16 * size
+    data_offset = entries_offset + 8 * len(records)
+    out = bytearray(
+        _HEADER.pack(MAGIC, count, size, entries_offset, index_offset, data_offset)
+    )
+    out += bytes(_pad(len(out)))
+    out += struct.pack(f"<{size}Q{size}q", *index_hashes, *index_slots)
+    out += struct.pack(f"<{len(records)}Q", *records)
+    out += data
+    return out
+
+
+def _encoded(data: bytearray, records: list[int], entry: int) -> bytes:
+    start, length = records[_RECORD * entry], records[_RECORD * entry + 1]
+    return bytes(data[start : start + length])
+
+
+def _buffer(segment: SharedMemory) -> memoryview:
+    """Return the buffer of segment, which is None once it is closed."""
+    buf = segment.buf
+    if buf is None:
+        raise ValueError("shared memory segment is closed")
+    return buf
+
+
+# Segments are not tracked: the resource tracker would unlink them when
+# the process that created or attached to them exits, while other
+# processes still use them.
+if sys.version_info >= (3, 13):
+
+    def _create_segment(name: Optional[str], size: int) -> SharedMemory:
+        return SharedMemory(name, create=True, size=size, track=False)
+
+    def _attach_segment(name: str) -> Union[SharedMemory, mmap.mmap]:
+        return SharedMemory(name, track=False)
+
+    def _unlink_segment(name: str) -> None:
+        segment = SharedMemory(name, track=False)
+        segment.close()
+        segment.unlink()
+
+else:
+    # before 3.13 SharedMemory always registers segments with the tracker,
+    # and unlinking one unregisters it again: on POSIX, segments are
+    # attached to and unlinked with the private module SharedMemory uses.
+    # Windows frees a segment once no process has it open.
+    if os.name == "posix":
+        import _posixshmem  # type: ignore
+
+    def _create_segment(name: Optional[str], size: int) -> SharedMemory:
+        segment = SharedMemory(name, create=True, size=size)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister("/" + segment.name, "shared_memory")
+        return segment
+
+    def _attach_segment(name: str) -> Union[SharedMemory, mmap.mmap]:
+        if os.name != "posix":
+            return SharedMemory(name)
+        fd = _posixshmem.shm_open("/" + name, os.O_RDONLY, mode=0o600)
+        try:
+            return mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+    def _unlink_segment(name: str) -> None:
+        if os.name == "posix":
+            _posixshmem.shm_unlink("/" + name)
+
+
+def _release(
+    views: tuple[memoryview, ...], handle: Union[SharedMemory, mmap.mmap, None]
+) -> None:
+    """Release the views of a buffer, then close the segment or mmap it is
+    in, which can't be closed while views of it exist.
+    """
+    for view in views:
+        view.release()
+    if handle is not None:
+        handle.close()
+
+
+class SharedDictAnyKey(Mapping[Any, Any]):
+    """A read only DictAnyKey view of a FrozenDictAnyKey exported to
+    shared memory or a file by FrozenDictAnyKey.export.
+
+    Looks keys up in the exported buffer: keys are found by the hash of
+    their canonical encoding (see dictanykey.fingerprints.encode_key) in a
+    prebuilt open addressing index, and only the value found is
+    unpickled. Processes attached to the same buffer share one copy of
+    the table.
+
+    Like PersistentDictAnyKey, values are unpickled on every read.
+
+    A shared memory segment outlives the processes attached to it, the
+    one that exported it included, until unlink() is called (on Windows,
+    until no process has it open). The buffer is released by close(),
+    or when the mapping is garbage collected or the interpreter exits.
+
+    Maintains order of items of the exported dictionary.
+    """
+
+    __slots__ = (
+        "name",
+        "path",
+        "_segment",
+        "_mmap",
+        "_buf",
+        "_hashes",
+        "_slots",
+        "_entries",
+        "_len",
+        "_mask",
+        "_data",
+        "_version",
+        "_finalizer",
+        "__weakref__",
+    )
+
+    def __init__(self, name: Optional[str] = None, path: Optional[str] = None) -> None:
+        if (name is None) == (path is None):
+            raise TypeError("pass exactly one of name or path")
+        self.name = name
+        self.path = path
+        self._segment: Optional[SharedMemory] = None
+        self._mmap: Optional[mmap.mmap] = None
+        if name is None:
+            with open(path, "rb") as file:  # type: ignore
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            segment = _attach_segment(name)
+            if isinstance(segment, SharedMemory):
+                self._segment = segment
+            else:
+                self._mmap = segment
+        if self._segment is not None:
+            buf = _buffer(self._segment)
+        else:
+            buf = memoryview(self._mmap)  # type: ignore
+        self._map(buf)
+        self._version = 0
+
+    @classmethod
+    def _create(
+        cls,
+        items: Iterable[tuple[Any, Any]],
+        name: Optional[str],
+        path: Optional[str],
+    ) -> "SharedDictAnyKey":
+        """Export items to a new segment called name, or to a file at path."""
+        data = dumps(items)
+        if path is not None:
+            with open(path, "wb") as file:
+                file.write(data)
+            return cls(path=path)
+        segment = _create_segment(name, len(data))
+        try:
+            buf = _buffer(segment)
+            buf[: len(data)] = data
+            new = cls.__new__(cls)
+            new.name = segment.name
+            new.path = None
+            new._segment = segment
+            new._mmap = None
+            new._map(buf)
+            new._version = 0
+        except BaseException:
+            segment.close()
+            _unlink_segment(segment.name)
+            raise
+        return new
+
+    def _map(self, buf: memoryview) -> None:
+        header = _HEADER.unpack_from(buf)
+        magic, count, size, entries_offset, index_offset, data_offset = header
+        if magic != MAGIC:
+            raise ValueError("not an exported FrozenDictAnyKey")
+        self._buf = buf
+        self._len: int = count
+        self._mask = size - 1
+        self._hashes = buf[index_offset : index_offset + 8 * size].cast("Q")
+        self._slots = buf[index_offset + 8 * size : entries_offset].cast("q")
+        self._entries = buf[entries_offset:data_offset].cast("Q")
+        self._data = data_offset
+        views = (self._hashes, self._slots, self._entries, buf)
+        handle = self._segment if self._segment is not None else self._mmap
+        self._finalizer = weakref.finalize(self, _release, views, handle)
+
+    def _find(self, key: Any) -> int:
+        """Return the number of the entry of key, or -1."""
+        try:
+            encoded = encode_key(key)
+        except TypeError:
+            # could not have been exported
+            return -1
+        h = key_hash(encoded)
+        hashes, slots, entries = self._hashes, self._slots, self._entries
+        mask = self._mask
+        i = h & mask
+        while True:
+            entry: int = slots[i]
+            if entry < 0:
+                return -1
+            if hashes[i] == h and entries[_RECORD * entry + 1] == len(encoded):
+                start = self._data + entries[_RECORD * entry]
+                if self._buf[start : start + len(encoded)] == encoded:
+                    return entry
+            i = (i + 1) & mask
+
+    def _load(self, entry: int, column: int) -> Any:
+        """Unpickle the key (column 0) or value (column 1) of entry."""
+        entries = self._entries
+        record = _RECORD * entry
+        start = self._data + entries[record] + entries[record + 1]
+        if column:
+            start += entries[record + 2]
+        return pickle.loads(self._buf[start : start + entries[record + 2 + column]])
+
+    def __getitem__(self, key: Any) -> Any:
+        entry = self._find(key)
+        if entry < 0:
+            raise KeyError(key)
+        return self._load(entry, 1)
+
+    def get(self, key: Any, default: Optional[Any] = None) -> Any:
+        """Return the value for key if key is in the dictionary, else default."""
+        entry = self._find(key)
+        if entry < 0:
+            return default
+        return self._load(entry, 1)
+
+    def __contains__(self, key: Any) -> bool:
+        return self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        return DictKeyIterator(self)
+
+    def keys(self) -> DictKeys:  # type: ignore
+        return DictKeys(self)
+
+    def values(self) -> DictValues:  # type: ignore
+        return DictValues(self)
+
+    def items(self) -> DictItems:  # type: ignore
+        return DictItems(self)
+
+    def _iter_keys(self) -> Iterator[Any]:
+        for entry in range(self._len):
+            yield self._load(entry, 0)
+
+    def _iter_values(self) -> Iterator[Any]:
+        for entry in range(self._len):
+            yield self._load(entry, 1)
+
+    def _iter_items(self) -> Iterator[tuple[Any, Any]]:
+        for entry in range(self._len):
+            yield self._load(entry, 0), self._load(entry, 1)
+
+    def _get_keys_list(self) -> list[Any]:
+        return list(self._iter_keys())
+
+    def _get_values_list(self) -> list[Any]:
+        return list(self._iter_values())
+
+    def _get_items_list(self) -> list[tuple[Any, Any]]:
+        return list(self._iter_items())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Mapping):
+            return False
+        if len(self) != len(other):
+            return False
+        for key, value in self._iter_items():
+            other_value = peek_value(other, key)
+            if other_value is MISSING or value != other_value:
+                return False
+        return True
+
+    def close(self) -> None:
+        """Detach from the shared buffer. The table is no longer readable."""
+        self._finalizer()
+
+    def unlink(self) -> None:
+        """Delete the shared memory segment or file, once every process
+        has attached. Attached processes can still read it.
+        """
+        if self.path is not None:
+            os.remove(self.path)
+        else:
+            _unlink_segment(self.name)  # type: ignore
+
+    def __enter__(self) -> "SharedDictAnyKey":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __reduce__(self) -> tuple:
+        # attach again in the process the mapping is sent to
+        return (type(self), (self.name, self.path))
+
+    def __repr__(self) -> str:
+        if self.path is not None:
+            return f"SharedDictAnyKey(path={self.path!r})"
+        return f"SharedDictAnyKey({self.name!r})"
@@ -0,0 +1,157 @@
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from threading import RLock, Timer
+from typing import Any, Optional, Union
+
+from dictanykey.dictanykey import DictAnyKey
+from dictanykey.frozen_dictanykey import FrozenDictAnyKey
+from dictanykey.iterables import DictItems, DictKeys, DictValues
+
+
+class SnapshotDictAnyKey(Mapping[Any, Any]):
+    """A dictionary where the keys don't need to be hashable, for data
+    read far more often than it is written.
+
+    Readers read the published FrozenDictAnyKey in _snapshot without
+    any locking: each read sees one consistent version, and snapshot()
+    returns it to read several keys from the same version.
+
+    Writers change the staging DictAnyKey in _pending under _lock, then
+    publish it by freezing it and swapping the _snapshot reference.
+    Writes are published:
+    - at once, by default
+    - after window seconds, when window is given: all writes made
+      within the window are published together
+    - when the outermost batch() block exits
+    - by flush()
+    Reads don't see writes until they are published.
+
+    Maintains order of items inserted.
+    """
+
+    __slots__ = ("_snapshot", "_pending", "_lock", "_depth", "_window", "_timer")
+
+    def __init__(
+        self,
+        data: Optional[Union[Iterable, Mapping]] = None,
+        window: Optional[float] = None,
+    ) -> None:
+        self._pending = DictAnyKey(data)
+        self._lock = RLock()
+        # number of batch() blocks entered
+        self._depth = 0
+        self._window = window
+        self._timer: Optional[Timer] = None
+        self._snapshot = self._freeze()
+
+    def snapshot(self) -> FrozenDictAnyKey:
+        """Return the published version."""
+        return self._snapshot
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._snapshot[key]
+
+    def get(self, key: Any, default: Optional[Any] = None) -> Any:
+        """Return the value for key if key is in the dictionary, else default."""
+        return self._snapshot.get(key, default)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._snapshot)
+
+    def keys(self) -> DictKeys:  # type: ignore
+        return self._snapshot.keys()
+
+    def values(self) -> DictValues:  # type: ignore
+        return self._snapshot.values()
+
+    def items(self) -> DictItems:  # type: ignore
+        return self._snapshot.items()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, SnapshotDictAnyKey):
+            other = other._snapshot
+        return self._snapshot == other
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._pending[key] = value
+            self._wrote()
+
+    def __delitem__(self, key: Any) -> None:
+        with self._lock:
+            del self._pending[key]
+            self._wrote()
+
+    def update(self, data: Optional[Union[Iterable, Mapping]] = None) -> None:
+        """Update dict from dict/iterable data, published as one write."""
+        with self._lock:
+            self._pending.update(data)
+            self._wrote()
+
+    def clear(self) -> None:
+        """Remove all items from self."""
+        with self._lock:
+            self._pending.clear()
+            self._wrote()
+
+    @contextmanager
+    def batch(self) -> Iterator["SnapshotDictAnyKey"]:
+        """Group the writes made in the with block into one publish,
+        when the outermost block exits. Other writers wait for the block
+        to exit. If the block raises, its writes are discarded.
+        """
+        with self._lock:
+            saved = self._pending.copy()
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._pending = saved
+                raise
+            finally:
+                self._depth -= 1
+            if not self._depth:
+                self.flush()
+
+    def flush(self) -> None:
+        """Publish the writes made since the last publish."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._snapshot = self._freeze()
+
+    def _wrote(self) -> None:
+        """Publish a write, or schedule publishing it. Call holding _lock."""
+        if self._depth:
+            return
+        if self._window is None:
+            self.flush()
+        elif self._timer is None:
+            self._timer = Timer(self._window, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _freeze(self) -> FrozenDictAnyKey:
+        """Return a FrozenDictAnyKey of _pending. Call holding _lock."""
+        pending = self._pending
+        if len(pending._keys) != len(pending):
+            pending._compact()
+        # the copy shares storage with _pending until _pending is written to
+        return FrozenDictAnyKey._from_staging(pending.copy())
+
+    def __reduce__(self) -> tuple:
+        # the lock and timer can't be pickled: only the published version is
+        return (type(self), (self._snapshot, self._window))
+
+    def __str__(self) -> str:
+        return str(self._snapshot)
+
+    def __repr__(self) -> str:
+        return f"SnapshotDictAnyKey({self._snapshot._get_items_list()})"
@@ -1,73 +1,290 @@
+from collections.abc import Iterable, Iterator, Mapping
+from itertools import chain
 from typing import Any, Optional
 
+from dictanykey.fingerprints import (
+    bucket_eq,
+    fingerprint,
+    keys_equal,
+    partition_key,
+)
 from dictanykey.iterables import DictItems, DictKeys, DictValues
+from dictanykey.utils import Marker
+
+# probe fingerprint for keys that have no canonical form
+UNBUCKETED = Marker("unbucketed")
+
+
+def scan_candidates(
+    fp: Any,
+    part: Optional[tuple],
+    every: Iterable[int],
+    partitions: Mapping[tuple, Iterable[int]],
+    unbucketed: Mapping[tuple, Iterable[int]],
+    foreign: Iterable[int],
+) -> Iterable[int]:
+    """Return the tokens of the keys to compare with a key that has
+    fingerprint fp (or UNBUCKETED) and partition part, once its bucket
+    is searched: every token if part is None, else the unbucketed
+    tokens of part, or all its tokens if the key has no fingerprint,
+    then the foreign tokens.
+    """
+    if part is None:
+        return every
+    if fp is UNBUCKETED:
+        # rare: scan every unhashable key of the same partition
+        return chain(partitions.get(part, ()), foreign)
+    return chain(unbucketed.get(part, ()), foreign)
 
 
 class UnHashMap:
     """A dictionary where the keys don't need to be hashable.
-    Stores keys in _keys: list
-    Stores values in _values: list
+    Stores keys in _keys: dict[token, key]
+    Stores values in _values: dict[token, value]
+    Tokens are handed out in insertion order, so both dicts keep order.
+
+    Groups tokens by the fingerprint of their key in _buckets so
+    a lookup only looks at the keys in one bucket. Canonical
+    fingerprints are equal only for equal keys; buckets hold more than
+    one key only for key adapters registered with their own eq.
 
-    Uses == to compare keys rather than hash function
+    Keys without a fingerprint are compared one by one, but only
+    against keys that could be equal: tokens are also grouped by
+    partition_key (type, plus len for builtin containers) in
+    _partitions, and by partition again in _unbucketed for keys with no
+    fingerprint. Keys of types whose == could accept anything go in
+    _foreign and are compared with every scan.
 
-    Much slower key lookup speeds compared to dict but
-    keys don't need to be hashable.
+    Uses == (or a registered key adapter) to compare keys rather
+    than hash function
+
+    Lookups of lists, tuples, dicts and sets of hashable items are
+    close to dict speed; keys with no canonical fingerprint fall
+    back to scanning their partition.
+
+    lookups and comparisons count calls to _lookup and key comparisons,
+    see stats().
     """
 
+    __slots__ = (
+        "_keys",
+        "_values",
+        "_placement",
+        "_buckets",
+        "_partitions",
+        "_unbucketed",
+        "_foreign",
+        "_next_token",
+        "_version",
+        "lookups",
+        "comparisons",
+    )
+
     def __init__(self, data: Optional[list[tuple]] = None) -> None:
         """Initialize self.  See help(type(self)) for accurate signature."""
-        self._keys: list = []
-        self._values: list = []
+        self._keys: dict[int, Any] = {}
+        self._values: dict[int, Any] = {}
+        # token -> (fingerprint or UNBUCKETED, partition or None)
+        self._placement: dict[int, tuple[Any, Optional[tuple]]] = {}
+        self._buckets: dict[Any, list[int]] = {}
+        self._partitions: dict[tuple, dict[int, None]] = {}
+        self._unbucketed: dict[tuple, dict[int, None]] = {}
+        self._foreign: dict[int, None] = {}
+        self._next_token = 0
+        self._version = 0
+        self.lookups = 0
+        self.comparisons = 0
         if data is not None:
             for key, value in data:
                 self[key] = value
 
     def __contains__(self, value: Any) -> bool:
         """True if the dictionary has the specified key, else False."""
-        return value in self._keys
+        return self._lookup(value)[0] >= 0
 
     def __setitem__(self, key: Any, value: Any) -> None:
         """Set self[key] to value."""
-        if key not in self._keys:
-            self._keys.append(key)
-            self._values.append(value)
+        probe = self._lookup(key)
+        i = probe[0]
+        if i < 0:
+            self._insert(key, value, probe)
         else:
-            i = self._getindex(key)
             self._values[i] = value
 
     def __len__(self) -> int:
         return len(self._keys)
 
     def __getitem__(self, key: Any) -> Any:
+        i = self._getindex(key)
+        return self._values[i]
+
+    def _lookup(self, key: Any) -> tuple[int, Any, Optional[tuple]]:
+        """Search for key once.
+        Returns a probe (token, fingerprint, partition): token is the
+        token of key, or -1 if key is missing; fingerprint is the
+        fingerprint of key or UNBUCKETED. The probe can be passed to
+        _insert after a miss.
+        """
+        self.lookups += 1
+        keys = self._keys
+        try:
+            fp = fingerprint(key)
+        except TypeError:
+            fp = UNBUCKETED
+        else:
+            bucket = self._buckets.get(fp)
+            if bucket is not None:
+                eq = bucket_eq(key)
+                if eq is None:
+                    # canonical fingerprints are equal only for equal keys
+                    return bucket[0], fp, None
+                for compared, token in enumerate(bucket, 1):
+                    if eq(keys[token], key):
+                        self.comparisons += compared
+                        return token, fp, None
+                self.comparisons += len(bucket)
+        part = partition_key(key)
+        candidates = scan_candidates(
+            fp, part, keys, self._partitions, self._unbucketed, self._foreign
+        )
+        compared = 0
+        for token in candidates:
+            compared += 1
+            if keys_equal(keys[token], key):
+                self.comparisons += compared
+                return token, fp, part
+        self.comparisons += compared
+        return -1, fp, part
+
+    @staticmethod
+    def _miss(key: Any) -> tuple[int, Any, Optional[tuple]]:
+        """Return the probe _lookup returns for key in an empty UnHashMap."""
         try:
-            i = self._getindex(key)
-            return self._values[i]
-        except KeyError:
-            raise KeyError(key) from None
+            fp = fingerprint(key)
+        except TypeError:
+            fp = UNBUCKETED
+        return -1, fp, partition_key(key)
+
+    def _insert(
+        self, key: Any, value: Any, probe: tuple[int, Any, Optional[tuple]]
+    ) -> None:
+        """Add key, which _lookup just missed."""
+        token = self._next_token
+        self._next_token = token + 1
+        self._version += 1
+        self._keys[token] = key
+        self._values[token] = value
+        _, fp, part = probe
+        self._placement[token] = (fp, part)
+        if fp is not UNBUCKETED:
+            bucket = self._buckets.get(fp)
+            if bucket is None:
+                self._buckets[fp] = [token]
+            else:
+                bucket.append(token)
+        if part is None:
+            self._foreign[token] = None
+            return
+        _add_token(self._partitions, part, token)
+        if fp is UNBUCKETED:
+            _add_token(self._unbucketed, part, token)
+
+    def _remove(self, token: int) -> Any:
+        """Remove the key with token and return its value."""
+        self._version += 1
+        del self._keys[token]
+        fp, part = self._placement.pop(token)
+        if fp is not UNBUCKETED:
+            bucket = self._buckets[fp]
+            if len(bucket) == 1:
+                del self._buckets[fp]
+            else:
+                bucket.remove(token)
+        if part is None:
+            del self._foreign[token]
+        else:
+            _discard_token(self._partitions, part, token)
+            if fp is UNBUCKETED:
+                _discard_token(self._unbucketed, part, token)
+        return self._values.pop(token)
+
+    def stats(self) -> dict[str, int]:
+        """Return lookup counters and the shape of the index."""
+        return {
+            "lookups": self.lookups,
+            "comparisons": self.comparisons,
+            "buckets": len(self._buckets),
+            "partitions": len(self._partitions),
+            "unbucketed": sum(len(tokens) for tokens in self._unbucketed.values()),
+            "foreign": len(self._foreign),
+        }
+
+    def reset_stats(self) -> None:
+        """Zero the lookups and comparisons counters."""
+        self.lookups = 0
+        self.comparisons = 0
+
+    def copy(self) -> "UnHashMap":
+        """Return a shallow copy of self, with its own index."""
+        new = UnHashMap()
+        new._keys = self._keys.copy()
+        new._values = self._values.copy()
+        new._placement = self._placement.copy()
+        new._buckets = {fp: bucket.copy() for fp, bucket in self._buckets.items()}
+        new._partitions = {
+            part: tokens.copy() for part, tokens in self._partitions.items()
+        }
+        new._unbucketed = {
+            part: tokens.copy() for part, tokens in self._unbucketed.items()
+        }
+        new._foreign = self._foreign.copy()
+        new._next_token = self._next_token
+        new.lookups = self.lookups
+        new.comparisons = self.comparisons
+        return new
 
     def _getindex(self, key: Any) -> int:
-        """Use _keys.index method to look up and return index of key.
+        """Look up and return token of key.
         Raises KeyError if key is not in _keys.
         """
-        try:
-            return self._keys.index(key)
-        except ValueError:
-            raise KeyError(key) from None
+        i = self._lookup(key)[0]
+        if i < 0:
+            raise KeyError(key)
+        return i
 
     def _get_keys_list(self) -> list[Any]:
-        return self._keys
+        return list(self._keys.values())
 
     def _get_values_list(self) -> list[Any]:
-        return [self[key] for key in self._get_keys_list()]
+        return list(self._values.values())
 
     def _get_items_list(self) -> list[tuple]:
-        return [(key, self[key]) for key in self._get_keys_list()]
+        return list(zip(self._keys.values(), self._values.values()))
+
+    def _iter_keys(self) -> Iterator[Any]:
+        return iter(self._keys.values())
+
+    def _iter_values(self) -> Iterator[Any]:
+        return iter(self._values.values())
+
+    def _iter_items(self) -> Iterator[tuple[Any, Any]]:
+        return zip(self._keys.values(), self._values.values())
 
     def __delitem__(self, key: Any) -> None:
         """Delete self[key]."""
-        i = self._getindex(key)
-        del self._keys[i]
-        del self._values[i]
+        self._remove(self._getindex(key))
+
+    def pop(self, key: Any) -> Any:
+        """Remove specified key and return the corresponding value.
+        Raises KeyError if key is not found.
+        """
+        return self._remove(self._getindex(key))
+
+    def _remap_values(self, mapping: dict) -> None:
+        """Replace every value with mapping[value]."""
+        values = self._values
+        for token, value in values.items():
+            values[token] = mapping[value]
 
     def __repr__(self) -> str:
         """Return repr(self)."""
@@ -75,20 +292,36 @@ class UnHashMap:
 
     def keys(self) -> DictKeys:
         """Returns a set-like object providing a view on self's keys"""
-        return DictKeys(self)  # type: ignore
+        return DictKeys(self)
 
     def values(self) -> DictValues:
         """Returns an object providing a view on self's values"""
-        return DictValues(self)  # type: ignore
+        return DictValues(self)
 
     def items(self) -> DictItems:
         """Returns set-like object providing a view on self's items"""
-        return DictItems(self)  # type: ignore
+        return DictItems(self)
 
     def get(self, key: Any, default: Optional[Any] = None) -> Any:
         """Return the value for key if key is in the dictionary, else default."""
-        try:
-            i = self._getindex(key)
-        except KeyError:
+        i = self._lookup(key)[0]
+        if i < 0:
             return default
         return self._values[i]
+
+
+def _add_token(groups: dict[tuple, dict[int, None]], part: tuple, token: int) -> None:
+    tokens = groups.get(part)
+    if tokens is None:
+        groups[part] = {token: None}
+    else:
+        tokens[token] = None
+
+
+def _discard_token(
+    groups: dict[tuple, dict[int, None]], part: tuple, token: int
+) -> None:
+    tokens = groups[part]
+    del tokens[token]
+    if not tokens:
+        del groups[part]
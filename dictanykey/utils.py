@@ -10,3 +10,26 @@ def quote_string(s: Any) -> Any:
     if chr(39) in s:
         return chr(34) + s + chr(34)
     return chr(39) + s + chr(39)
+
+
+class Marker:
+    """Named sentinel object.
+    Unpickles as the marker created with the same name, so markers
+    stored in keys or fingerprints keep their identity.
+    """
+
+    _markers: dict[str, "Marker"] = {}
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        Marker._markers[name] = self
+
+    def __repr__(self) -> str:
+        return f"<{self.name}>"
+
+    def __reduce__(self) -> tuple:
+        return (_marker, (self.name,))
+
+
+def _marker(name: str) -> Marker:
+    return Marker._markers[name]
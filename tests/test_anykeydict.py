@@ -1,6 +1,16 @@
+import copy
+import pickle
 import unittest
+import weakref
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from dictanykey.default_dictanykey import DefaultDictAnyKey
 from dictanykey.dictanykey import DictAnyKey as TestClass
+from dictanykey.frozen_dictanykey import FrozenDictAnyKey
 
 
 class TestInit(unittest.TestCase):
@@ -293,6 +303,76 @@ class TestCopyMethod(unittest.TestCase):
         c = d.copy()
         self.assertTrue(d == c)
 
+    def test_shares_storage(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        c = d.copy()
+        self.assertIs(c._keys, d._keys)
+        self.assertIs(c._values, d._values)
+        self.assertIs(c._hashmap, d._hashmap)
+        self.assertIs(c._unhashmap, d._unhashmap)
+
+    def test_set_value_copies_values_only(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        c = d.copy()
+        c[[2]] = "deux"
+        self.assertEqual(d[[2]], "two")
+        self.assertEqual(c[[2]], "deux")
+        self.assertIsNot(c._values, d._values)
+        self.assertIs(c._keys, d._keys)
+        self.assertIs(c._unhashmap, d._unhashmap)
+
+    def test_insert_copies_touched_partition(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        c = d.copy()
+        c[3] = "three"
+        self.assertIs(c._unhashmap, d._unhashmap)
+        self.assertIsNot(c._hashmap, d._hashmap)
+        d[[4]] = "four"
+        self.assertIsNot(c._unhashmap, d._unhashmap)
+        self.assertListEqual([1, [2], [4]], d._get_keys_list())
+        self.assertListEqual([1, [2], 3], c._get_keys_list())
+        self.assertNotIn([4], c)
+        self.assertNotIn(3, d)
+
+    def test_delete_and_compact(self):
+        d = TestClass((i, [i]) for i in range(10))
+        d[[10]] = "list"
+        c = d.copy()
+        for i in range(9):
+            del c[i]
+        del c[[10]]
+        self.assertListEqual([(9, [9])], c._get_items_list())
+        self.assertEqual(len(d), 11)
+        self.assertEqual(d[[10]], "list")
+        self.assertEqual(d[0], [0])
+
+    def test_bulk_update(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        c = d.copy()
+        c.update_many({1: "uno", 3: "three"})
+        c.update_many([([2], "deux"), ([5], "five")])
+        self.assertListEqual([(1, "one"), ([2], "two")], d._get_items_list())
+        self.assertListEqual(
+            [(1, "uno"), ([2], "deux"), (3, "three"), ([5], "five")],
+            c._get_items_list(),
+        )
+
+    def test_copy_of_copy(self):
+        d = TestClass([(1, "one")])
+        c = d.copy()
+        e = c.copy()
+        e[2] = "two"
+        c.clear()
+        self.assertListEqual([(1, "one")], d._get_items_list())
+        self.assertListEqual([], c._get_items_list())
+        self.assertListEqual([(1, "one"), (2, "two")], e._get_items_list())
+
+    def test_copy_module(self):
+        d = TestClass([([1], "one")])
+        c = copy.copy(d)
+        c[[1]] = "uno"
+        self.assertEqual(d[[1]], "one")
+
 
 class TestPopMethod(unittest.TestCase):
     def test_hashable(self):
@@ -535,3 +615,217 @@ class TestReprStrMethod(unittest.TestCase):
         d = TestClass([("hello", "world"), ("hi", "there")])
         expected = "{'hello': 'world', 'hi': 'there'}"
         self.assertEqual(str(d), expected)
+
+
+class TestEntryTable(unittest.TestCase):
+    def test_delete_keeps_order(self):
+        d = TestClass([(1, "one"), ([2], "two"), (3, "three"), ([4], "four")])
+        del d[1]
+        del d[[4]]
+        d[1] = "one again"
+        self.assertListEqual([[2], 3, 1], d._get_keys_list())
+        self.assertListEqual(["two", "three", "one again"], d._get_values_list())
+
+    def test_compaction(self):
+        d = TestClass((i, i) for i in range(100))
+        d[[100]] = 100
+        for i in range(0, 100, 3):
+            del d[i]
+        for i in range(1, 100, 3):
+            del d[i]
+        self.assertLessEqual(len(d._keys), 2 * len(d))
+        expected = list(range(2, 100, 3)) + [[100]]
+        self.assertListEqual(expected, d._get_keys_list())
+        self.assertEqual(d[[100]], 100)
+        self.assertEqual(d[98], 98)
+
+    def test_update_existing_keeps_slot(self):
+        d = TestClass([(1, "one"), ([2], "two"), (3, "three")])
+        d[[2]] = "TWO"
+        d[1] = "ONE"
+        self.assertListEqual([1, [2], 3], d._get_keys_list())
+        self.assertListEqual(["ONE", "TWO", "three"], d._get_values_list())
+        self.assertEqual(len(d._keys), 3)
+
+
+class CountingKey:
+    """Unhashable key that counts == comparisons."""
+
+    comparisons = 0
+    __hash__ = None  # type: ignore
+
+    def __init__(self, n):
+        self.n = n
+
+    def __eq__(self, other):
+        CountingKey.comparisons += 1
+        return isinstance(other, CountingKey) and self.n == other.n
+
+
+class TestSingleProbe(unittest.TestCase):
+    def setUp(self):
+        self.d = TestClass((CountingKey(i), i) for i in range(10))
+        CountingKey.comparisons = 0
+
+    def test_lookup_hit_and_miss(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        self.assertEqual(d._lookup(1)[0], 0)
+        self.assertEqual(d._lookup([2])[0], 1)
+        self.assertEqual(d._lookup(3)[0], -1)
+        self.assertEqual(d._lookup([3])[0], -1)
+
+    def test_getitem_probes_once(self):
+        self.assertEqual(self.d[CountingKey(9)], 9)
+        self.assertLessEqual(CountingKey.comparisons, 10)
+
+    def test_setdefault_probes_once(self):
+        self.assertEqual(self.d.setdefault(CountingKey(10), 10), 10)
+        self.assertLessEqual(CountingKey.comparisons, 10)
+
+    def test_pop_probes_once(self):
+        self.assertEqual(self.d.pop(CountingKey(9)), 9)
+        self.assertLessEqual(CountingKey.comparisons, 10)
+
+
+class TestBulkMethods(unittest.TestCase):
+    def test_from_pairs_hashable(self):
+        d = TestClass.from_pairs([(1, "a"), (2, "b"), (1, "c")])
+        self.assertEqual(d._get_items_list(), [(1, "c"), (2, "b")])
+        self.assertIsInstance(d, TestClass)
+
+    def test_from_pairs_mixed_keeps_order(self):
+        d = TestClass.from_pairs([([1], "a"), (2, "b"), ([1], "c"), (3, "d")])
+        self.assertEqual(d._get_items_list(), [([1], "c"), (2, "b"), (3, "d")])
+        self.assertEqual(d[[1]], "c")
+
+    def test_from_pairs_iterator(self):
+        d = TestClass.from_pairs((k, str(k)) for k in [[1], 2])
+        self.assertEqual(d._get_items_list(), [([1], "[1]"), (2, "2")])
+
+    def test_from_mapping(self):
+        d = TestClass.from_mapping({1: "a", 2: "b"})
+        self.assertEqual(d._get_items_list(), [(1, "a"), (2, "b")])
+        d = TestClass.from_mapping(TestClass([([1], "a"), (2, "b")]))
+        self.assertEqual(d._get_items_list(), [([1], "a"), (2, "b")])
+        with self.assertRaises(TypeError):
+            TestClass.from_mapping([(1, "a")])
+
+    def test_update_many_merges_like_update(self):
+        for data in (
+            {1: "ONE", 3: "three"},
+            [(1, "ONE"), ([2], "TWO"), (3, "three")],
+            TestClass([([3], "three"), (1, "ONE")]),
+        ):
+            expected = TestClass([(1, "one"), ([2], "two")])
+            pairs = data.items() if hasattr(data, "items") else data
+            for key, value in pairs:
+                expected[key] = value
+            d = TestClass([(1, "one"), ([2], "two")])
+            d.update_many(data)
+            self.assertEqual(d._get_items_list(), expected._get_items_list())
+
+    def test_update_many_bumps_version(self):
+        d = TestClass([(1, "one")])
+        version = d._version
+        d.update_many({1: "ONE"})
+        self.assertEqual(d._version, version)
+        d.update_many({2: "two"})
+        self.assertNotEqual(d._version, version)
+
+    def test_update_many_malformed_pairs(self):
+        d = TestClass()
+        with self.assertRaises(TypeError):
+            d.update_many([1, 2])
+        with self.assertRaises(ValueError):
+            d.update_many([(1, 2, 3)])
+
+    def test_fromkeys_mixed(self):
+        d = TestClass.fromkeys([[1], 2, [1]], 0)
+        self.assertEqual(d._get_items_list(), [([1], 0), (2, 0)])
+
+
+class TestPickle(unittest.TestCase):
+    def test_unhashable_keys_and_tombstones(self):
+        d = TestClass([([1], "one"), (2, "two"), ({"a": 1}, "dict"), (3, "three")])
+        del d[2]
+        copied = pickle.loads(pickle.dumps(d))
+        self.assertEqual(copied._get_items_list(), d._get_items_list())
+        self.assertEqual(copied[[1]], "one")
+        self.assertEqual(copied[{"a": 1}], "dict")
+
+    def test_columnar_payload(self):
+        d = TestClass([([1], "one"), (2, "two"), (3, "three")])
+        del d[2]
+        function, args = d.__reduce__()
+        self.assertEqual(args, (TestClass, [[1], 3], ["one", "three"]))
+        self.assertEqual(function(*args), d)
+
+    def test_hashable_keys_reuse_lists(self):
+        keys, values = [1, "a"], ["one", "a"]
+        d = TestClass._from_columns(keys, values)
+        self.assertIs(d._keys, keys)
+        self.assertIs(d._values, values)
+        self.assertIsNone(d._unhashmap)
+        d[2] = "two"
+        self.assertEqual(d[2], "two")
+
+    def test_equal_hashable_keys(self):
+        d = TestClass._from_columns([1, 1.0, [1]], ["int", "float", "list"])
+        self.assertListEqual([(1, "float"), ([1], "list")], d._get_items_list())
+
+    def test_protocols(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            with self.subTest(protocol=protocol):
+                copied = pickle.loads(pickle.dumps(d, protocol))
+                self.assertListEqual(d._get_items_list(), copied._get_items_list())
+
+    def test_deepcopy(self):
+        d = TestClass([([1], [2])])
+        copied = copy.deepcopy(d)
+        copied[[1]].append(3)
+        self.assertEqual(d[[1]], [2])
+        self.assertEqual(copied[[1]], [2, 3])
+
+    @unittest.skipUnless(numpy, "numpy is not installed")
+    def test_out_of_band_array_values(self):
+        d = TestClass([([1], numpy.arange(1000)), ("b", numpy.ones(10))])
+        buffers = []
+        data = pickle.dumps(d, protocol=5, buffer_callback=buffers.append)
+        self.assertEqual(len(buffers), 2)
+        self.assertLess(len(data), 1000)
+        copied = pickle.loads(data, buffers=buffers)
+        self.assertTrue((copied[[1]] == numpy.arange(1000)).all())
+        self.assertTrue((copied["b"] == numpy.ones(10)).all())
+
+
+class TestCompactLayout(unittest.TestCase):
+    def test_no_instance_dict(self):
+        d = TestClass([(1, "one")])
+        for obj in (d, d.keys(), d.values(), d.items(), iter(d), iter(d.items())):
+            with self.subTest(type=type(obj).__name__):
+                self.assertFalse(hasattr(obj, "__dict__"))
+
+    def test_weak_references(self):
+        for d in (TestClass(), DefaultDictAnyKey(), FrozenDictAnyKey()):
+            with self.subTest(type=type(d).__name__):
+                self.assertIs(weakref.ref(d)(), d)
+
+    def test_unhashable_index_created_lazily(self):
+        d = TestClass([(1, "one")])
+        self.assertIsNone(d._unhashmap)
+        self.assertNotIn([1], d)
+        self.assertIsNone(d._unhashmap)
+        self.assertIsNone(d.get([1]))
+        d[[1]] = "list"
+        self.assertIsNotNone(d._unhashmap)
+        self.assertEqual(d[[1]], "list")
+        self.assertEqual(len(d), 2)
+        d.clear()
+        self.assertIsNone(d._unhashmap)
+
+    def test_compact_without_unhashable_index(self):
+        d = TestClass((i, i) for i in range(10))
+        for i in range(9):
+            del d[i]
+        self.assertEqual(d._get_items_list(), [(9, 9)])
@@ -0,0 +1,198 @@
+import pickle
+import threading
+import unittest
+
+from dictanykey.concurrent_dictanykey import ConcurrentDictAnyKey as TestClass
+from dictanykey.dictanykey import DictAnyKey
+
+
+class Loose:
+    """Unhashable key with no fingerprint that equals its value."""
+
+    __hash__ = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        if isinstance(other, Loose):
+            return other.value == self.value
+        return other == self.value
+
+
+def run_threads(target, count=8):
+    barrier = threading.Barrier(count)
+
+    def run(n):
+        barrier.wait()
+        target(n)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class TestMapping(unittest.TestCase):
+    def test_items_in_insertion_order(self):
+        d = TestClass([([1, 2], "list"), (1, "one"), ({"a": 1}, "dict")])
+        d[1.0] = "uno"
+        d["new"] = "str"
+        self.assertListEqual(
+            [([1, 2], "list"), (1, "uno"), ({"a": 1}, "dict"), ("new", "str")],
+            d._get_items_list(),
+        )
+        self.assertEqual(len(d), 4)
+        self.assertEqual(d[{"a": 1}], "dict")
+        self.assertIn([1, 2], d)
+        self.assertNotIn([2, 1], d)
+        with self.assertRaises(KeyError):
+            d[[3]]
+
+    def test_delete_and_pop(self):
+        d = TestClass([([1], "one"), (2, "two"), (3, "three")])
+        del d[[1]]
+        self.assertEqual(d.pop(2), "two")
+        self.assertEqual(d.pop(2, None), None)
+        with self.assertRaises(KeyError):
+            d.pop(2)
+        with self.assertRaises(KeyError):
+            del d[[1]]
+        d[[1]] = "uno"
+        self.assertListEqual([3, [1]], list(d))
+
+    def test_popitem_and_clear(self):
+        d = TestClass([([1], "one"), (2, "two")])
+        self.assertEqual(d.popitem(), (2, "two"))
+        self.assertEqual(len(d), 1)
+        d.clear()
+        self.assertEqual(len(d), 0)
+        with self.assertRaises(KeyError):
+            d.popitem()
+
+    def test_keys_without_fingerprint(self):
+        d = TestClass([([1], "list")])
+        # equal to a key of a stripe
+        d[[Loose(1)]] = "loose"
+        self.assertListEqual([([1], "loose")], d._get_items_list())
+        d[[Loose(2)]] = "two"
+        self.assertEqual(d[[2]], "two")
+        self.assertEqual(d[[Loose(2)]], "two")
+        del d[[2]]
+        self.assertNotIn([Loose(2)], d)
+        self.assertEqual(d.pop([Loose(1)]), "loose")
+        self.assertEqual(len(d), 0)
+
+    def test_views_eq_and_copy(self):
+        items = [([1], "one"), (2, "two")]
+        d = TestClass(items, stripes=3)
+        self.assertListEqual([[1], 2], list(d.keys()))
+        self.assertListEqual(["one", "two"], list(d.values()))
+        self.assertIn(([1], "one"), d.items())
+        self.assertEqual(d, DictAnyKey(items))
+        e = d.copy()
+        e[3] = "three"
+        self.assertEqual(len(d), 2)
+        self.assertEqual(len(e._locks), 3)
+
+    def test_iterates_a_snapshot(self):
+        d = TestClass((i, i) for i in range(10))
+        for key in d:
+            d[[key]] = key
+        self.assertEqual(len(d), 20)
+
+    def test_pickle(self):
+        d = TestClass([([1], "one"), (2, "two")], stripes=4)
+        loaded = pickle.loads(pickle.dumps(d))
+        self.assertListEqual(d._get_items_list(), loaded._get_items_list())
+        self.assertEqual(len(loaded._locks), 4)
+
+    def test_repr_and_str(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        self.assertEqual(repr(d), "ConcurrentDictAnyKey([(1, 'one'), ([2], 'two')])")
+        self.assertEqual(str(d), "{1: 'one', [2]: 'two'}")
+
+    def test_stripes(self):
+        with self.assertRaises(ValueError):
+            TestClass(stripes=0)
+
+
+class TestAtomicOperations(unittest.TestCase):
+    def test_setdefault(self):
+        d = TestClass([([1], "one")])
+        self.assertEqual(d.setdefault([1], "uno"), "one")
+        self.assertEqual(d.setdefault([2], "two"), "two")
+        self.assertIsNone(d.setdefault(3))
+        self.assertListEqual([[1], [2], 3], list(d))
+
+    def test_get_or_compute(self):
+        d = TestClass()
+        self.assertEqual(d.get_or_compute([2], len), 1)
+        self.assertEqual(d.get_or_compute([2], lambda key: "other"), 1)
+
+    def test_update_if(self):
+        d = TestClass([([1], 1)])
+        self.assertTrue(d.update_if([1], 2, lambda value: value == 1))
+        self.assertFalse(d.update_if([1], 3, lambda value: value == 1))
+        self.assertFalse(d.update_if([2], 3, lambda value: True))
+        self.assertEqual(d[[1]], 2)
+        self.assertNotIn([2], d)
+
+
+class TestThreads(unittest.TestCase):
+    def test_concurrent_inserts(self):
+        d = TestClass(stripes=4)
+
+        def insert(n):
+            for i in range(500):
+                d[[n, i]] = i
+                d[n * 1000 + i] = i
+
+        run_threads(insert)
+        self.assertEqual(len(d), 8 * 1000)
+        for n in range(8):
+            # each thread's items keep their relative order
+            mine = [key for key in d if isinstance(key, list) and key[0] == n]
+            self.assertListEqual([[n, i] for i in range(500)], mine)
+
+    def test_get_or_compute_once(self):
+        d = TestClass()
+        calls = []
+
+        def compute(key):
+            calls.append(key)
+            return len(key)
+
+        run_threads(lambda n: [d.get_or_compute([i], compute) for i in range(200)])
+        self.assertEqual(len(calls), 200)
+        self.assertEqual(len(d), 200)
+
+    def test_update_if_counter(self):
+        d = TestClass([({"counter": 1}, 0)])
+
+        def increment(n):
+            for _ in range(300):
+                while True:
+                    value = d[{"counter": 1}]
+                    if d.update_if({"counter": 1}, value + 1, value.__eq__):
+                        break
+
+        run_threads(increment)
+        self.assertEqual(d[{"counter": 1}], 8 * 300)
+
+    def test_setdefault_and_pop(self):
+        d = TestClass()
+        popped = []
+
+        def work(n):
+            for i in range(300):
+                d.setdefault([i % 50], n)
+                value = d.pop([i % 50], None)
+                if value is not None:
+                    popped.append(value)
+
+        run_threads(work)
+        self.assertEqual(len(d), 0)
+        self.assertEqual(len(d._entries), 0)
+        self.assertTrue(all(len(index) == 0 for index in d._stripes))
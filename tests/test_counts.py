@@ -1,6 +1,17 @@
+import array
+import pickle
 import unittest
+from collections import Counter
+from unittest.mock import patch
 
-from dictanykey.counts import value_counts
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from dictanykey import counts
+from dictanykey.counts import CountsAnyKey, value_counts
+from dictanykey.default_dictanykey import DefaultDictAnyKey
 from dictanykey.dictanykey import DictAnyKey
 
 
@@ -126,3 +137,272 @@ class TestValueCounts(unittest.TestCase):
         result = value_counts(value_gen())
         expected = DictAnyKey([(1, 2), (2, 1), (3, 1)])
         self.assertEqual(result, expected)
+
+
+class TestCounterFastPath(unittest.TestCase):
+    def reference(self, values):
+        d = DefaultDictAnyKey(int)
+        for value in values:
+            d[value] += 1
+        return d._get_items_list()
+
+    def test_first_seen_order_across_chunks(self):
+        values = [3, [1], 3, "a", (1, [2]), [1], 2, {"x": 1}, 3, (1, [2]), True, 1.0]
+        for size in (1, 2, 3, 5, 4096):
+            with self.subTest(chunk_size=size):
+                with patch.object(counts, "CHUNK_SIZE", size):
+                    result = value_counts(values, sort=False)
+                self.assertEqual(result._get_items_list(), self.reference(values))
+
+    def test_sort_is_stable_on_merged_counts(self):
+        values = [[1], 2, [3], 4, [1], 2]
+        result = value_counts(values, ascending=False)
+        self.assertEqual(result._get_items_list(), [([1], 2), (2, 2), ([3], 1), (4, 1)])
+
+    def test_hashable_values_use_counter(self):
+        with patch.object(counts.DictAnyKey, "_lookup", side_effect=AssertionError):
+            result = value_counts(range(10000), sort=False)
+        self.assertEqual(len(result), 10000)
+
+
+class TestTopValues(unittest.TestCase):
+    values = [4, 1, 1, 4, 5, 1, [2], [2], [2], 7, 4]
+
+    def test_top_descending(self):
+        result = value_counts(self.values, top=2, ascending=False)
+        self.assertEqual(result._get_items_list(), [(4, 3), (1, 3)])
+
+    def test_top_ascending(self):
+        result = value_counts(self.values, top=3)
+        self.assertEqual(result._get_items_list(), [(4, 3), (1, 3), ([2], 3)])
+
+    def test_top_unsorted_keeps_first_seen_order(self):
+        result = value_counts(self.values, top=2, sort=False)
+        self.assertEqual(result._get_items_list(), [(4, 3), (1, 3)])
+
+    def test_top_matches_full_sort(self):
+        full = value_counts(self.values, ascending=False)._get_items_list()
+        for k in range(len(full) + 2):
+            with self.subTest(top=k):
+                result = value_counts(self.values, top=k, ascending=False)
+                self.assertEqual(result._get_items_list(), full[:k])
+
+    def test_most_common(self):
+        result = value_counts(self.values)
+        self.assertIsInstance(result, CountsAnyKey)
+        self.assertEqual(result.most_common(2), [(4, 3), (1, 3)])
+        self.assertEqual(result.most_common(0), [])
+        self.assertEqual(
+            result.most_common(),
+            value_counts(self.values, ascending=False)._get_items_list(),
+        )
+
+    def test_repr(self):
+        self.assertEqual(
+            repr(value_counts([[1], 2, [1]])),
+            "CountsAnyKey(DictAnyKey([(2, 1), ([1], 2)]))",
+        )
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestArrayCounts(unittest.TestCase):
+    def assertSameCounts(self, values, **kwargs):
+        result = value_counts(values, **kwargs)
+        expected = value_counts(list(values), **kwargs)
+        self.assertEqual(result._get_items_list(), expected._get_items_list())
+        return result
+
+    def test_int_array(self):
+        for values in ([4, 1, 1, 4, 5, 1, -3], [2**40, 7, 2**40], []):
+            for sort in (True, False):
+                with self.subTest(values=values, sort=sort):
+                    self.assertSameCounts(
+                        numpy.array(values, dtype=numpy.int64), sort=sort
+                    )
+
+    def test_narrow_int_ranges(self):
+        for values in (
+            numpy.array([-128, 127, 5, 5], dtype=numpy.int8),
+            numpy.arange(-128, 128, dtype=numpy.int8),
+            numpy.array([-32768, 32767, 0, -32768], dtype=numpy.int16),
+            numpy.arange(-30000, 30000, 7, dtype=numpy.int16),
+            numpy.array([0, 255, 255], dtype=numpy.uint8),
+        ):
+            with self.subTest(dtype=values.dtype, size=len(values)):
+                self.assertSameCounts(values, sort=False)
+
+    def test_subclasses_fall_back(self):
+        # the buffer of a masked array ignores its mask
+        values = numpy.ma.masked_array([1, 2, 1], mask=[False, False, False])
+        with patch.object(counts, "_unique_with_first", side_effect=AssertionError):
+            result = value_counts(values, sort=False)
+        self.assertEqual(result._get_items_list(), [(1, 2), (2, 1)])
+
+    def test_other_dtypes(self):
+        for values in (
+            numpy.array([True, False, True]),
+            numpy.array([2**64 - 1, 3, 2**64 - 1], dtype=numpy.uint64),
+            numpy.array([1.5, 2.5, 1.5]),
+            numpy.array(["b", "a", "b"]),
+        ):
+            with self.subTest(dtype=values.dtype):
+                result = self.assertSameCounts(values, sort=False)
+                self.assertNotIsInstance(next(iter(result)), numpy.generic)
+
+    def test_nan_counted_like_iterating(self):
+        values = numpy.array([1.0, numpy.nan, numpy.nan, 1.0])
+        result = value_counts(values, sort=False)
+        self.assertEqual(list(result.values()), [2, 1, 1])
+        expected = value_counts(list(values), sort=False)
+        self.assertEqual(list(expected.values()), [2, 1, 1])
+        self.assertNotIsInstance(next(iter(result)), numpy.generic)
+
+    def test_top(self):
+        values = numpy.array([3, 1, 1, 2, 2, 3, 3])
+        self.assertEqual(
+            value_counts(values, top=2, ascending=False).most_common(), [(3, 3), (1, 2)]
+        )
+
+    def test_rows(self):
+        values = numpy.array([[1, 2], [3, 4], [1, 2], [5, 6]])
+        result = value_counts(values, sort=False)
+        self.assertEqual(result[numpy.array([1, 2])], 2)
+        self.assertEqual(list(result.values()), [2, 1, 1])
+        self.assertTrue((next(iter(result)) == numpy.array([1, 2])).all())
+
+    def test_object_dtype_falls_back(self):
+        values = numpy.array([[1], [2], [1]], dtype=object)
+        self.assertEqual(len(value_counts(values)), 2)
+
+    def test_does_not_iterate_arrays(self):
+        values = numpy.arange(10) % 3
+        with patch.object(counts, "_iter_counts", side_effect=AssertionError):
+            result = value_counts(values, sort=False)
+        self.assertEqual(result._get_items_list(), [(0, 4), (1, 3), (2, 3)])
+
+    def test_buffer_input(self):
+        self.assertSameCounts(array.array("d", [1.0, 2.0, 1.0]))
+        self.assertSameCounts(b"abca", sort=False)
+
+
+class TestParallelCounts(unittest.TestCase):
+    def test_same_as_serial(self):
+        values = (
+            [i % 7 for i in range(200)]
+            + [[i % 3] for i in range(50)]
+            + [True, 1.0, (1, [2])]
+        )
+        values = values[::3] + values[1::3] + values[2::3]
+        for sort in (True, False):
+            with self.subTest(sort=sort):
+                serial = value_counts(values, sort=sort)
+                parallel = value_counts(values, sort=sort, workers=2, chunksize=16)
+                self.assertEqual(parallel._get_items_list(), serial._get_items_list())
+
+    def test_generator_input(self):
+        result = value_counts((i % 3 for i in range(100)), workers=2, chunksize=10)
+        self.assertEqual(result._get_items_list(), [(1, 33), (2, 33), (0, 34)])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            value_counts([1], workers=0)
+        with self.assertRaises(ValueError):
+            value_counts([1], chunksize=0)
+
+
+class TestCountsAnyKey(unittest.TestCase):
+    def assertMatchesCounter(self, result, expected):
+        self.assertIsInstance(result, CountsAnyKey)
+        self.assertEqual(result._get_items_list(), list(expected.items()))
+
+    def test_counts_like_counter(self):
+        a = "abracadabra"
+        b = "alakazam"
+        self.assertMatchesCounter(CountsAnyKey(a), Counter(a))
+        for op in ("__add__", "__sub__", "__or__", "__and__"):
+            with self.subTest(op=op):
+                result = getattr(CountsAnyKey(a), op)(CountsAnyKey(b))
+                self.assertMatchesCounter(result, getattr(Counter(a), op)(Counter(b)))
+
+    def test_update_and_subtract(self):
+        c = CountsAnyKey([[1], 2, [1]])
+        c.update([[1], 3])
+        c.update(CountsAnyKey([2, [4]]))
+        c.update({5: 2})
+        self.assertEqual(
+            c._get_items_list(), [([1], 3), (2, 2), (3, 1), ([4], 1), (5, 2)]
+        )
+        c.subtract([[1], [1], [1], [6]])
+        c.subtract(CountsAnyKey([2, 2, 2]))
+        self.assertEqual(
+            c._get_items_list(),
+            [([1], 0), (2, -1), (3, 1), ([4], 1), (5, 2), ([6], -1)],
+        )
+
+    def test_missing_count_is_zero(self):
+        c = CountsAnyKey([[1]])
+        self.assertEqual(c[[2]], 0)
+        self.assertNotIn([2], c)
+        del c[[2]]
+        del c[[1]]
+        self.assertEqual(len(c), 0)
+
+    def test_unhashable_arithmetic(self):
+        a = CountsAnyKey([[1], [1], 2, {"x": 1}])
+        b = CountsAnyKey([[1], 3, {"x": 1}, {"x": 1}])
+        self.assertEqual(
+            (a + b)._get_items_list(), [([1], 3), (2, 1), ({"x": 1}, 3), (3, 1)]
+        )
+        self.assertEqual((a - b)._get_items_list(), [([1], 1), (2, 1)])
+        self.assertEqual(
+            (a | b)._get_items_list(), [([1], 2), (2, 1), ({"x": 1}, 2), (3, 1)]
+        )
+        self.assertEqual((a & b)._get_items_list(), [([1], 1), ({"x": 1}, 1)])
+
+    def test_merge_keeps_order_of_new_values(self):
+        a = CountsAnyKey([1])
+        b = CountsAnyKey([[2], 3, [4], 1, 5])
+        a.update(b)
+        self.assertEqual(list(a), [1, [2], 3, [4], 5])
+        self.assertEqual(a[[4]], 1)
+        self.assertEqual(a[5], 1)
+
+    def test_merge_does_not_probe_new_hashable_values(self):
+        a = CountsAnyKey([1, [1]])
+        b = CountsAnyKey(range(100))
+        with patch.object(CountsAnyKey, "_lookup", side_effect=AssertionError):
+            a.update(b)
+        self.assertEqual(a[1], 2)
+        self.assertEqual(a.total(), 102)
+
+    def test_total_and_most_common(self):
+        c = CountsAnyKey([[1], 2, [1]])
+        self.assertEqual(c.total(), 3)
+        self.assertEqual(c.most_common(1), [([1], 2)])
+
+    def test_copy_is_independent(self):
+        c = CountsAnyKey([[1]])
+        copied = c.copy()
+        copied.update([[1]])
+        self.assertEqual(c[[1]], 1)
+        self.assertEqual(copied[[1]], 2)
+
+    def test_operators_leave_operands_unchanged(self):
+        a = CountsAnyKey([[1], 1, "a"])
+        b = CountsAnyKey([[1], [2], 2])
+        self.assertEqual((a + b)[[1]], 2)
+        self.assertEqual((a - b)._get_keys_list(), [1, "a"])
+        self.assertEqual((b | a)._get_keys_list(), [[1], [2], 2, 1, "a"])
+        self.assertEqual(a._get_items_list(), [([1], 1), (1, 1), ("a", 1)])
+        self.assertEqual(b._get_items_list(), [([1], 1), ([2], 1), (2, 1)])
+
+    def test_pickle_keeps_counts(self):
+        c = CountsAnyKey([[1], 2, [1]])
+        copied = pickle.loads(pickle.dumps(c))
+        self.assertIsInstance(copied, CountsAnyKey)
+        self.assertListEqual([([1], 2), (2, 1)], copied._get_items_list())
+        self.assertEqual(copied[[3]], 0)
+
+    def test_repr_round_trips(self):
+        c = CountsAnyKey([[1], 2, [1]])
+        self.assertEqual(eval(repr(c)), c)
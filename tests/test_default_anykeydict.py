@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 from dictanykey.default_dictanykey import DefaultDictAnyKey as TestClass
@@ -250,6 +251,19 @@ class TestGetItem(unittest.TestCase):
         value = d[4]
         self.assertListEqual(value, [4])
 
+    def test_default_factory_changes_dict(self):
+        def factory():
+            # one key out, the missing key in: same number of entries
+            del d[[1]]
+            d[[3]] = "inner"
+            return "new"
+
+        d = TestClass(None, [([1], "one")])
+        d.default_factory = factory
+        self.assertEqual(d[[3]], "new")
+        self.assertListEqual([([3], "new")], list(d.items()))
+        self.assertEqual(len(d), 1)
+
 
 class TestDel(unittest.TestCase):
     def test_hashable(self):
@@ -409,3 +423,22 @@ class TestCopyMethod(unittest.TestCase):
         d = TestClass(None, [(1, "one"), ([2, 2], "two two"), (2, "two")])
         c = d.copy()
         self.assertTrue(d == c)
+
+    def test_copy_on_write(self):
+        d = TestClass(list, [([1], [])])
+        c = d.copy()
+        self.assertIs(c.default_factory, list)
+        self.assertIs(c._keys, d._keys)
+        c[[2]].append("new")
+        self.assertNotIn([2], d)
+        self.assertEqual(c[[2]], ["new"])
+
+
+class TestPickle(unittest.TestCase):
+    def test_keeps_default_factory(self):
+        d = TestClass(list, [([1], ["one"]), (2, [])])
+        copied = pickle.loads(pickle.dumps(d))
+        self.assertIs(copied.default_factory, list)
+        self.assertListEqual(d._get_items_list(), copied._get_items_list())
+        copied[[3]].append("three")
+        self.assertEqual(copied[[3]], ["three"])
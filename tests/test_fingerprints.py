@@ -0,0 +1,208 @@
+import unittest
+
+from dictanykey import DictAnyKey, register_key_adapter, unregister_key_adapter
+from dictanykey.fingerprints import (
+    encode_key,
+    fingerprint,
+    fingerprints_exact,
+    get_key_adapter,
+    keys_equal,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Unhashable:
+    __hash__ = None  # type: ignore
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_hashable_is_itself(self):
+        for value in [1, "one", (1, 2), None, frozenset({1})]:
+            self.assertEqual(fingerprint(value), value)
+
+    def test_equal_lists(self):
+        self.assertEqual(fingerprint([1, 2]), fingerprint([1, 2]))
+        self.assertEqual(fingerprint([1, [2, 3]]), fingerprint([1.0, [2, 3]]))
+        self.assertNotEqual(fingerprint([1, 2]), fingerprint([2, 1]))
+
+    def test_list_differs_from_tuple(self):
+        self.assertNotEqual(fingerprint([1, 2]), fingerprint((1, 2)))
+        self.assertNotEqual(fingerprint([[1]]), fingerprint(([1],)))
+
+    def test_tuple_with_unhashable_items(self):
+        self.assertEqual(fingerprint((1, [2])), fingerprint((1, [2])))
+        hash(fingerprint((1, [2])))
+
+    def test_dict_ignores_order(self):
+        a = {"a": [1], "b": {"c": 2}}
+        b = {"b": {"c": 2}, "a": [1]}
+        self.assertEqual(fingerprint(a), fingerprint(b))
+        self.assertNotEqual(fingerprint(a), fingerprint({"a": [1]}))
+
+    def test_set_matches_frozenset(self):
+        self.assertEqual(fingerprint({1, 2}), frozenset({1, 2}))
+
+    def test_no_canonical_form(self):
+        with self.assertRaises(TypeError):
+            fingerprint(Unhashable())
+        with self.assertRaises(TypeError):
+            fingerprint([1, Unhashable()])
+
+
+class Ambiguous:
+    """Unhashable key whose == result can't be used as a bool, like ndarray."""
+
+    __hash__ = None  # type: ignore
+
+    def __init__(self, *items):
+        self.items = items
+
+    def __eq__(self, other):
+        return AmbiguousResult()
+
+
+class AmbiguousResult:
+    def __bool__(self):
+        raise ValueError("truth value is ambiguous")
+
+
+class Record:
+    __hash__ = None  # type: ignore
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def __eq__(self, other):
+        return (self.name, self.size) == (other.name, other.size)
+
+
+class TestKeyAdapters(unittest.TestCase):
+    def tearDown(self):
+        for cls in (Ambiguous, Record):
+            try:
+                unregister_key_adapter(cls)
+            except KeyError:
+                pass
+
+    def test_adapter_avoids_eq(self):
+        register_key_adapter(Ambiguous, lambda key: key.items)
+        d = DictAnyKey([(Ambiguous(1, 2), "a"), (Ambiguous(3), "b")])
+        self.assertEqual(d[Ambiguous(3)], "b")
+        d[Ambiguous(1, 2)] = "A"
+        self.assertEqual(len(d), 2)
+        del d[Ambiguous(1, 2)]
+        self.assertNotIn(Ambiguous(1, 2), d)
+
+    def test_adapter_applies_to_nested_keys(self):
+        register_key_adapter(Ambiguous, lambda key: key.items)
+        d = DictAnyKey([([Ambiguous(1)], "a")])
+        self.assertEqual(d[[Ambiguous(1)]], "a")
+
+    def test_adapter_with_eq(self):
+        # to_hashable only looks at name, eq settles collisions
+        register_key_adapter(Record, lambda key: key.name, lambda a, b: a == b)
+        d = DictAnyKey([(Record("x", 1), 1), (Record("x", 2), 2)])
+        self.assertEqual(len(d), 2)
+        self.assertEqual(d[Record("x", 2)], 2)
+        self.assertNotIn(Record("x", 3), d)
+
+    def test_fingerprints_exact(self):
+        self.assertTrue(fingerprints_exact())
+        register_key_adapter(Ambiguous, lambda key: key.items)
+        self.assertTrue(fingerprints_exact())
+        register_key_adapter(Record, lambda key: key.name, lambda a, b: a == b)
+        self.assertFalse(fingerprints_exact())
+        # replacing the adapter with one without eq
+        register_key_adapter(Record, lambda key: (key.name, key.size))
+        self.assertTrue(fingerprints_exact())
+        register_key_adapter(Record, lambda key: key.name, lambda a, b: a == b)
+        unregister_key_adapter(Record)
+        self.assertTrue(fingerprints_exact())
+
+    def test_unregistered_falls_back_to_scan(self):
+        d = DictAnyKey([(Record("x", 1), 1)])
+        self.assertEqual(d[Record("x", 1)], 1)
+        self.assertEqual(d._unhashmap.stats()["foreign"], 1)
+
+    def test_bytearray(self):
+        self.assertIsNotNone(get_key_adapter(bytearray))
+        d = DictAnyKey([(bytearray(b"ab"), 1)])
+        self.assertEqual(d[bytearray(b"ab")], 1)
+        self.assertNotIn(bytearray(b"ba"), d)
+
+    def test_keys_equal(self):
+        register_key_adapter(Ambiguous, lambda key: key.items)
+        self.assertTrue(keys_equal(Ambiguous(1), Ambiguous(1)))
+        self.assertFalse(keys_equal(Ambiguous(1), [1]))
+        self.assertTrue(keys_equal([1], [1]))
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestNumpyAdapter(unittest.TestCase):
+    def test_ndarray_keys(self):
+        a = numpy.array([1, 2, 3])
+        d = DictAnyKey([(a, "a"), (numpy.array([[1, 2], [3, 4]]), "b")])
+        self.assertEqual(d[numpy.array([1, 2, 3])], "a")
+        self.assertEqual(d[numpy.array([[1, 2], [3, 4]])], "b")
+        self.assertNotIn(numpy.array([1, 2, 3], dtype=float), d)
+        self.assertNotIn(numpy.array([1, 2]), d)
+
+
+class TestEncodeKey(unittest.TestCase):
+    def test_deterministic(self):
+        self.assertEqual(encode_key([1, "a", None]), b"ul3:i1;s1:an")
+        self.assertEqual(encode_key({"b": 2, "a": 1}), b"ud2:s1:ai1;s1:bi2;")
+        self.assertEqual(encode_key((1, "a")), b"t2:i1;s1:a")
+
+    def test_equal_keys_encode_alike(self):
+        self.assertEqual(encode_key(1), encode_key(1.0))
+        self.assertEqual(encode_key(1), encode_key(True))
+        self.assertEqual(encode_key(2), encode_key(complex(2, 0)))
+        self.assertEqual(encode_key({1: "a", 2: "b"}), encode_key({2: "b", 1: "a"}))
+        self.assertEqual(encode_key({3, 1, 2}), encode_key({2, 3, 1}))
+        self.assertEqual(encode_key([(1, 2.0)]), encode_key([(1.0, 2)]))
+
+    def test_nested_sets_encode_like_frozensets(self):
+        # as in DictAnyKey, where they share a fingerprint
+        pairs = [
+            ([{1}], [frozenset({1})]),
+            ({"a": {1}}, {"a": frozenset({1})}),
+            ([(1, {2})], [(1, frozenset({2}))]),
+        ]
+        for key, other in pairs:
+            with self.subTest(key=key):
+                self.assertEqual(len(DictAnyKey([(key, 1), (other, 2)])), 1)
+                self.assertEqual(encode_key(key), encode_key(other))
+        self.assertNotEqual(encode_key((1, {2})), encode_key((1, frozenset({2}))))
+
+    def test_different_keys_encode_apart(self):
+        keys = [
+            1,
+            1.5,
+            "1",
+            b"1",
+            bytearray(b"1"),
+            [1],
+            (1,),
+            {1},
+            frozenset({1}),
+            {1: None},
+            ["a", "b"],
+            ["ab"],
+            [["a"], "b"],
+            None,
+            complex(1, 1),
+        ]
+        encoded = {encode_key(key) for key in keys}
+        self.assertEqual(len(encoded), len(keys))
+
+    def test_no_canonical_encoding(self):
+        with self.assertRaises(TypeError):
+            encode_key(object())
+        with self.assertRaises(TypeError):
+            encode_key([1, object()])
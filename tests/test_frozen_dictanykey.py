@@ -1,5 +1,9 @@
+import pickle
 import unittest
+from unittest.mock import patch
 
+from dictanykey.dictanykey import _STORAGE
+from dictanykey.fingerprints import register_key_adapter, unregister_key_adapter
 from dictanykey.frozen_dictanykey import FrozenDictAnyKey as TestClass
 
 
@@ -228,6 +232,10 @@ class TestCopyMethod(unittest.TestCase):
         c = d.copy()
         self.assertTrue(d == c)
 
+    def test_returns_self(self):
+        d = TestClass([([1], "one")])
+        self.assertIs(d.copy(), d)
+
 
 class TestHashMethod(unittest.TestCase):
     def test_hashable_keys(self):
@@ -248,21 +256,59 @@ class TestHashMethod(unittest.TestCase):
 
     def test_unhashable_keys(self):
         d1 = TestClass([([1], "one"), ([2], "two")])
-        d2 = TestClass([([1], "one"), ([2], "two")])
-        # FrozenDictAnyKey with unhashable keys cannot be hashed
-        with self.assertRaises(TypeError):
-            hash(d1)
-        with self.assertRaises(TypeError):
-            hash(d2)
+        d2 = TestClass([([2], "two"), ([1], "one")])
+        # unhashable keys are hashed by fingerprint
+        self.assertEqual(hash(d1), hash(d2))
 
     def test_mixed_keys(self):
         d1 = TestClass([(1, "one"), ([2], "two")])
         d2 = TestClass([(1, "one"), ([2], "two")])
-        # FrozenDictAnyKey with mixed keys cannot be hashed due to unhashable keys
+        self.assertEqual(hash(d1), hash(d2))
+        self.assertNotEqual(hash(d1), hash(TestClass([(1, "one"), ((2,), "two")])))
+
+    def test_unhashable_values(self):
+        d1 = TestClass([(1, [1]), ([2], {"a": {1, 2}})])
+        d2 = TestClass([(1, [1]), ([2], {"a": {2, 1}})])
+        self.assertEqual(hash(d1), hash(d2))
+        self.assertEqual(len({d1: 1, d2: 2}), 1)
+
+    def test_equal_dicts_hash_equal(self):
+        d1 = TestClass([(1, "one"), ([1.0], 2)])
+        d2 = TestClass([(1.0, "one"), ([True], 2)])
+        self.assertEqual(d1, d2)
+        self.assertEqual(hash(d1), hash(d2))
+
+    def test_no_fingerprint_raises(self):
+        class Opaque:
+            __hash__ = None  # type: ignore
+
         with self.assertRaises(TypeError):
-            hash(d1)
+            hash(TestClass([(Opaque(), 1)]))
         with self.assertRaises(TypeError):
-            hash(d2)
+            hash(TestClass([(1, Opaque())]))
+
+    def test_hash_is_cached(self):
+        d = TestClass([([1], "one")])
+        self.assertIsNone(d._hash)
+        h = hash(d)
+        with patch("dictanykey.frozen_dictanykey.fingerprint") as fp:
+            self.assertEqual(hash(d), h)
+        fp.assert_not_called()
+
+    def test_cached_hash_is_not_pickled(self):
+        d = TestClass([([1], "one")])
+        hash(d)
+        copied = pickle.loads(pickle.dumps(d))
+        self.assertIsNone(copied._hash)
+        self.assertEqual(hash(copied), hash(d))
+
+    def test_pickle_rebuilds_index(self):
+        d = TestClass([(1, "one"), ([2], "two"), (Opaque(3), "three")])
+        copied = pickle.loads(pickle.dumps(d))
+        self.assertIsInstance(copied, TestClass)
+        self.assertListEqual(d._get_items_list(), copied._get_items_list())
+        self.assertEqual(copied[[2]], "two")
+        self.assertEqual(copied[Opaque(3)], "three")
 
     def test_empty(self):
         d1 = TestClass()
@@ -349,3 +395,78 @@ class TestReprStrMethod(unittest.TestCase):
         d = TestClass([([1], "one"), ([2], "two")])
         expected = "{[1]: 'one', [2]: 'two'}"
         self.assertEqual(str(d), expected)
+
+
+class Opaque:
+    """Unhashable key with no fingerprint."""
+
+    __hash__ = None  # type: ignore
+
+    def __init__(self, n):
+        self.n = n
+
+    def __eq__(self, other):
+        return isinstance(other, Opaque) and self.n == other.n
+
+
+class TestFrozenLayout(unittest.TestCase):
+    def test_tuple_storage(self):
+        d = TestClass([(1, "one"), ([2], "two"), (1, "ONE")])
+        self.assertEqual(d._keys, (1, [2]))
+        self.assertEqual(d._values, ("ONE", "two"))
+        self.assertIsNone(d._unhashmap)
+        self.assertEqual(d._shared, _STORAGE)
+        self.assertEqual(d._lookup_unhashable([2])[0], 1)
+        self.assertEqual(d._lookup_unhashable([3])[0], -1)
+
+    def test_unhashable_lookups_use_buckets(self):
+        d = TestClass([([i], i) for i in range(1000)])
+        with patch("dictanykey.frozen_dictanykey.keys_equal") as keys_equal:
+            self.assertEqual(d[[500]], 500)
+            self.assertNotIn([1000], d)
+        keys_equal.assert_not_called()
+
+    def test_keys_without_fingerprint(self):
+        d = TestClass([(Opaque(1), "a"), ([Opaque(2)], "b"), ([3], "c"), (4, "d")])
+        self.assertEqual(d[Opaque(1)], "a")
+        self.assertEqual(d[[Opaque(2)]], "b")
+        self.assertEqual(d[[3]], "c")
+        self.assertNotIn(Opaque(3), d)
+        self.assertNotIn([Opaque(3)], d)
+        self.assertEqual(list(d.keys() & [[3], 4]), [4, [3]])
+
+    def test_unbucketed_probe_uses_cached_partitions(self):
+        keys = [[Opaque(i)] for i in range(20)] + [[i, i] for i in range(20)]
+        d = TestClass([(key, i) for i, key in enumerate(keys)])
+        self.assertEqual(len(d._partitions), 2)
+        with patch("dictanykey.frozen_dictanykey.partition_key") as part:
+            part.return_value = (list, 1)
+            self.assertEqual(d[[Opaque(19)]], 19)
+            self.assertNotIn([Opaque(20)], d)
+        self.assertEqual(part.call_count, 2)
+
+    def test_adapter_keys_sharing_a_fingerprint(self):
+        class Loose:
+            __hash__ = None  # type: ignore
+
+            def __init__(self, n):
+                self.n = n
+
+        register_key_adapter(Loose, lambda obj: obj.n % 2, eq=lambda a, b: a.n == b.n)
+        self.addCleanup(unregister_key_adapter, Loose)
+        d = TestClass([(Loose(1), "one"), (Loose(3), "three")])
+        self.assertEqual(d[Loose(3)], "three")
+        self.assertEqual(d[Loose(1)], "one")
+        self.assertNotIn(Loose(5), d)
+
+    def test_bulk_constructors(self):
+        self.assertIsInstance(TestClass.from_pairs([([1], 1)]), TestClass)
+        self.assertEqual(TestClass.fromkeys([[1], 2])._keys, ([1], 2))
+        self.assertEqual(TestClass.from_mapping({1: 2})[1], 2)
+
+    def test_pickle(self):
+        d = TestClass([([1], "one"), ({"a": 1}, "dict"), (2, "two")])
+        copied = pickle.loads(pickle.dumps(d))
+        self.assertEqual(copied[[1]], "one")
+        self.assertEqual(copied[{"a": 1}], "dict")
+        self.assertEqual(copied, d)
@@ -0,0 +1,279 @@
+import pickle
+import random
+import unittest
+
+from dictanykey.dictanykey import DictAnyKey
+from dictanykey.hamt import HamtDictAnyKey as TestClass
+from dictanykey.hamt import _Collision, _Node
+
+
+class Colliding:
+    """Hashable key whose instances all share one hash."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return 7
+
+    def __eq__(self, other):
+        return isinstance(other, Colliding) and other.value == self.value
+
+
+class Foreign(list):
+    """Unhashable key with no fingerprint, equal to lists."""
+
+
+class Opaque:
+    """Unhashable key with no fingerprint."""
+
+    __hash__ = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Opaque) and other.value == self.value
+
+
+def trie_nodes(node):
+    """Every node of a trie."""
+    yield node
+    if isinstance(node, _Node):
+        for item in node.items:
+            if not isinstance(item, tuple):
+                yield from trie_nodes(item)
+
+
+class TestInit(unittest.TestCase):
+    def test_mixed_keys(self):
+        d = TestClass([(1, "one"), ([2], "two"), (3, "three")])
+        self.assertListEqual([1, [2], 3], d._get_keys_list())
+        self.assertListEqual(["one", "two", "three"], d._get_values_list())
+
+    def test_empty(self):
+        d = TestClass()
+        self.assertEqual(len(d), 0)
+        self.assertListEqual([], d._get_items_list())
+
+    def test_duplicates_keep_first_position(self):
+        d = TestClass([([1], "a"), (2, "b"), ([1], "c")])
+        self.assertListEqual([([1], "c"), (2, "b")], d._get_items_list())
+
+    def test_from_dictanykey(self):
+        source = DictAnyKey([(1, "one"), ({"a": 1}, "dict"), (Opaque(1), "opaque")])
+        d = TestClass(source)
+        self.assertEqual(d, source)
+        self.assertEqual(d[Opaque(1)], "opaque")
+
+
+class TestSet(unittest.TestCase):
+    def test_returns_new_version(self):
+        d = TestClass([(1, "one")])
+        e = d.set([2], "two")
+        self.assertListEqual([(1, "one")], d._get_items_list())
+        self.assertListEqual([(1, "one"), ([2], "two")], e._get_items_list())
+
+    def test_existing_key_keeps_position(self):
+        d = TestClass([([1], "one"), (2, "two")])
+        e = d.set([1], "uno")
+        self.assertListEqual([([1], "uno"), (2, "two")], e._get_items_list())
+        self.assertEqual(d[[1]], "one")
+
+    def test_same_value_returns_self(self):
+        value = object()
+        d = TestClass([(1, value)])
+        self.assertIs(d.set(1, value), d)
+
+    def test_equal_hashable_keys(self):
+        d = TestClass([(1, "one")]).set(1.0, "float").set(True, "bool")
+        self.assertListEqual([(1, "bool")], d._get_items_list())
+
+    def test_grows_past_one_vector_node(self):
+        d = TestClass()
+        for i in range(2000):
+            d = d.set(i, -i)
+        self.assertEqual(len(d), 2000)
+        self.assertListEqual(list(range(2000)), d._get_keys_list())
+        self.assertEqual(d[1999], -1999)
+
+    def test_shares_structure(self):
+        d = TestClass((i, i) for i in range(10_000))
+        e = d.set(5, "five")
+        old = {id(node) for node in trie_nodes(d._hashable)}
+        new = {id(node) for node in trie_nodes(e._hashable)}
+        # setting an existing key only copies the path to its entry
+        self.assertEqual(old, new)
+        self.assertEqual(sum(a is not b for a, b in zip(d._entries, e._entries)), 1)
+        f = d.set(-1, "new")
+        new = {id(node) for node in trie_nodes(f._hashable)}
+        self.assertLess(len(new - old), 5)
+
+
+class TestDelete(unittest.TestCase):
+    def test_returns_new_version(self):
+        d = TestClass([(1, "one"), ([2], "two"), (3, "three")])
+        e = d.delete([2])
+        self.assertListEqual([(1, "one"), (3, "three")], e._get_items_list())
+        self.assertEqual(len(d), 3)
+        self.assertNotIn([2], e)
+
+    def test_missing_key(self):
+        d = TestClass([(1, "one")])
+        with self.assertRaises(KeyError):
+            d.delete(2)
+        with self.assertRaises(KeyError):
+            d.delete([1])
+
+    def test_delete_all(self):
+        d = TestClass((i, i) for i in range(100))
+        for i in range(100):
+            d = d.delete(i)
+        self.assertEqual(len(d), 0)
+        self.assertListEqual([], d._get_items_list())
+        self.assertEqual(d.set(1, 1)._get_items_list(), [(1, 1)])
+
+    def test_rebuilds_when_mostly_deleted(self):
+        d = TestClass((i, i) for i in range(100))
+        for i in range(60):
+            d = d.delete(i)
+        self.assertLessEqual(d._count, 2 * len(d))
+        self.assertListEqual(list(range(60, 100)), d._get_keys_list())
+
+    def test_equal_key_indexed_elsewhere(self):
+        # the entry is removed from the index of the stored key, which can
+        # differ from that of the deleted key
+        for deleted in ([1], Foreign([2])):
+            pairs = [(Foreign([1]), "f"), ([2], "two"), ([3], "three")]
+            with self.subTest(deleted=deleted):
+                d = TestClass(pairs).delete(deleted)
+                expected = DictAnyKey(pairs)
+                del expected[deleted]
+                self.assertEqual(d, expected)
+                self.assertIsNone(d.get(Foreign([5])))
+                self.assertNotIn(deleted, d)
+                for key in expected:
+                    self.assertIn(key, d)
+                    self.assertEqual(d.set(key, 0)[key], 0)
+
+    def test_reinsert_goes_last(self):
+        d = TestClass([(1, "one"), (2, "two")]).delete(1).set(1, "uno")
+        self.assertListEqual([(2, "two"), (1, "uno")], d._get_items_list())
+
+
+class TestUpdate(unittest.TestCase):
+    def test_pairs(self):
+        d = TestClass([(1, "one")])
+        e = d.update([([1], "list"), (1, "uno")])
+        self.assertListEqual([(1, "uno"), ([1], "list")], e._get_items_list())
+        self.assertListEqual([(1, "one")], d._get_items_list())
+
+    def test_mapping(self):
+        d = TestClass([(1, "one")]).update(DictAnyKey([([2], "two")]))
+        self.assertListEqual([(1, "one"), ([2], "two")], d._get_items_list())
+
+
+class TestKeys(unittest.TestCase):
+    def test_colliding_hashes(self):
+        d = TestClass((Colliding(i), i) for i in range(5))
+        self.assertIsInstance(d._hashable, _Collision)
+        d = d.set(Colliding(5), 5).delete(Colliding(0))
+        self.assertListEqual(list(range(1, 6)), d._get_values_list())
+        self.assertEqual(d[Colliding(3)], 3)
+        self.assertNotIn(Colliding(0), d)
+        for i in range(1, 5):
+            d = d.delete(Colliding(i))
+        self.assertListEqual([(Colliding(5), 5)], d._get_items_list())
+
+    def test_keys_without_fingerprint(self):
+        d = TestClass([(Opaque(1), "a")]).set(Opaque(2), "b").set(Opaque(1), "c")
+        self.assertListEqual(["c", "b"], d._get_values_list())
+        self.assertEqual(len(d._loose), 2)
+        d = d.delete(Opaque(1))
+        self.assertEqual(len(d._loose), 1)
+        self.assertNotIn(Opaque(1), d)
+        self.assertEqual(d[Opaque(2)], "b")
+
+    def test_set_and_frozenset_keys_are_distinct(self):
+        # like DictAnyKey: unhashable keys never match hashable keys
+        d = TestClass([(frozenset({1}), "frozen")]).set({1}, "set")
+        self.assertEqual(len(d), 2)
+        self.assertEqual(d[{1}], "set")
+
+    def test_matches_dictanykey(self):
+        rng = random.Random(0)
+
+        def key():
+            value = rng.randrange(40)
+            return rng.choice(
+                [
+                    value,
+                    str(value),
+                    [value],
+                    {"a": value},
+                    Colliding(value),
+                    Opaque(value),
+                ]
+            )
+
+        reference = DictAnyKey()
+        d = TestClass()
+        versions = []
+        for _ in range(2000):
+            if reference and rng.random() < 0.4:
+                k = rng.choice(reference._get_keys_list())
+                del reference[k]
+                d = d.delete(k)
+            else:
+                k, v = key(), rng.random()
+                reference[k] = v
+                d = d.set(k, v)
+            versions.append((d, reference._get_items_list()))
+        for version, items in versions[::50]:
+            self.assertListEqual(items, version._get_items_list())
+            for k, v in items:
+                self.assertEqual(version[k], v)
+
+
+class TestMapping(unittest.TestCase):
+    def test_views(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        self.assertListEqual([1, [2]], list(d.keys()))
+        self.assertListEqual(["one", "two"], list(d.values()))
+        self.assertListEqual([(1, "one"), ([2], "two")], list(d.items()))
+        self.assertIn(([2], "two"), d.items())
+        self.assertListEqual([1, [2]], list(d))
+
+    def test_get(self):
+        d = TestClass([([1], "one")])
+        self.assertEqual(d.get([1]), "one")
+        self.assertIsNone(d.get([2]))
+        self.assertEqual(d.get(2, "default"), "default")
+        with self.assertRaises(KeyError):
+            d[[2]]
+
+    def test_immutable(self):
+        d = TestClass([(1, "one")])
+        with self.assertRaises(TypeError):
+            d[2] = "two"  # type: ignore
+        with self.assertRaises(AttributeError):
+            d.other = 1  # type: ignore
+
+    def test_eq_and_hash(self):
+        d = TestClass([([1], {"a": 1}), (2, "two")])
+        e = TestClass([(2, "two")]).set([1], {"a": 1})
+        self.assertEqual(d, e)
+        self.assertEqual(hash(d), hash(e))
+        self.assertEqual(d, DictAnyKey([(2, "two"), ([1], {"a": 1})]))
+        self.assertNotEqual(d, d.set(2, "deux"))
+
+    def test_repr_and_str(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        self.assertEqual(repr(d), "HamtDictAnyKey([(1, 'one'), ([2], 'two')])")
+        self.assertEqual(str(d), "{1: 'one', [2]: 'two'}")
+
+    def test_pickle(self):
+        d = TestClass([(1, "one"), ([2], "two")]).delete(1).set(3, "three")
+        loaded = pickle.loads(pickle.dumps(d))
+        self.assertListEqual(d._get_items_list(), loaded._get_items_list())
+        self.assertEqual(loaded[[2]], "two")
@@ -234,3 +234,63 @@ class TestIteratorEdgeCases(unittest.TestCase):
         dict_items = [item for item in items if isinstance(item[0], dict)]
         self.assertEqual(len(dict_items), 1)
         self.assertEqual(dict_items[0][1], "dict1_duplicate")
+
+
+class TestVersioning(unittest.TestCase):
+    def test_delete_then_insert_detected(self):
+        d = DictAnyKey([(1, "one"), (2, "two"), (3, "three")])
+        iterator = DictKeyIterator(d)
+        next(iterator)
+        del d[2]
+        d[4] = "four"
+        self.assertEqual(len(d), 3)
+        with self.assertRaises(RuntimeError):
+            next(iterator)
+
+    def test_unhashable_delete_then_insert_detected(self):
+        d = DictAnyKey([([1], "one"), ([2], "two")])
+        iterator = DictItemIterator(d)
+        next(iterator)
+        d.pop([2])
+        d[[3]] = "three"
+        with self.assertRaises(RuntimeError):
+            next(iterator)
+
+    def test_value_update_allowed(self):
+        d = DictAnyKey([(1, "one"), ([2], "two"), (3, "three")])
+        values = []
+        for key in d:
+            d[key] = "updated"
+        for value in DictValueIterator(d):
+            values.append(value)
+        self.assertEqual(values, ["updated"] * 3)
+
+    def test_clear_detected(self):
+        d = DictAnyKey([(1, "one"), (2, "two")])
+        iterator = DictKeyIterator(d)
+        next(iterator)
+        d.clear()
+        d[1] = "one"
+        d[2] = "two"
+        with self.assertRaises(RuntimeError):
+            next(iterator)
+
+    def test_iteration_skips_deleted(self):
+        d = DictAnyKey([(i, i) for i in range(10)])
+        for i in range(0, 10, 3):
+            del d[i]
+        self.assertEqual(list(DictKeyIterator(d)), [1, 2, 4, 5, 7, 8])
+        self.assertEqual(list(DictValueIterator(d)), [1, 2, 4, 5, 7, 8])
+
+    def test_dict_iter_detects_mutation(self):
+        d = DictAnyKey([(1, "one"), (2, "two")])
+        with self.assertRaises(RuntimeError):
+            for key in d:
+                d[[key]] = "new"
+
+    def test_view_len(self):
+        d = DictAnyKey([(1, "one"), ([2], "two")])
+        self.assertEqual(len(d.keys()), 2)
+        self.assertEqual(len(d.items()), 2)
+        del d[1]
+        self.assertEqual(len(d.values()), 1)
@@ -0,0 +1,203 @@
+import pickle
+import unittest
+
+from dictanykey.concurrent_dictanykey import ConcurrentDictAnyKey
+from dictanykey.dictanykey import DictAnyKey
+from dictanykey.hamt import HamtDictAnyKey
+from dictanykey.lru_dictanykey import LRUDictAnyKey as TestClass
+
+
+class TestLRU(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        d = TestClass(3, [([1], "one"), (2, "two"), ([3], "three")])
+        d[[1]]
+        d.get(2)
+        d[[4]] = "four"
+        self.assertListEqual([[1], 2, [4]], list(d))
+        d[[1]] = "uno"
+        d.setdefault(2)
+        d[5] = "five"
+        self.assertListEqual([[1], 2, 5], list(d))
+        self.assertEqual(d[[1]], "uno")
+
+    def test_contains_is_not_a_use(self):
+        d = TestClass(2, [([1], "one"), (2, "two")])
+        self.assertIn([1], d)
+        d[3] = "three"
+        self.assertNotIn([1], d)
+
+    def test_items_contains_is_not_a_use(self):
+        d = TestClass(2, [([1], "one"), (2, "two")])
+        self.assertIn(([1], "one"), d.items())
+        self.assertNotIn(([1], "uno"), d.items())
+        self.assertNotIn(3, d.items())
+        d[3] = "three"
+        self.assertListEqual([2, 3], list(d))
+
+    def test_on_evict(self):
+        evicted = []
+        d = TestClass(2, on_evict=lambda key, value: evicted.append((key, value)))
+        d[[1]] = "one"
+        d[2] = "two"
+        d[2] = "dos"
+        self.assertListEqual([], evicted)
+        d.update([([3], "three"), (4, "four")])
+        self.assertListEqual([([1], "one"), (2, "dos")], evicted)
+        self.assertEqual(len(d), 2)
+
+    def test_many_uses(self):
+        d = TestClass(50)
+        for i in range(5000):
+            d[[i % 80]] = i
+            d.get(i % 7)
+            if i % 3 == 0:
+                d[i % 7] = i
+            if i % 11 == 0:
+                d.pop([i % 80], None)
+        self.assertEqual(len(d), 50)
+        self.assertLessEqual(len(d._keys), 100)
+        self.assertEqual(set(range(7)), {k for k in d if isinstance(k, int)})
+        for key in d:
+            self.assertEqual(d._lookup(key)[0], d._keys.index(key))
+
+    def test_iterating_while_reading_raises(self):
+        d = TestClass(3, [(1, "one"), (2, "two")])
+        with self.assertRaises(RuntimeError):
+            for key in d:
+                d[key]
+
+
+class TestLFU(unittest.TestCase):
+    def test_evicts_least_frequently_used(self):
+        d = TestClass(3, [(1, "one"), ([2], "two"), (3, "three")], policy="lfu")
+        d[1]
+        d[1]
+        d[[2]]
+        d[4] = "four"
+        self.assertListEqual([1, [2], 4], list(d))
+        # ties go to the least recently used
+        d[4]
+        d[5] = "five"
+        self.assertListEqual([1, 4, 5], list(d))
+
+    def test_deleted_keys(self):
+        d = TestClass(3, [([1], "one"), (2, "two"), (3, "three")], policy="lfu")
+        d[2]
+        d[3]
+        del d[[1]]
+        d[[4]] = "four"
+        d[[4]]
+        d[[4]]
+        d[5] = "five"
+        self.assertListEqual([3, [4], 5], list(d))
+        d.clear()
+        d[1] = "one"
+        self.assertEqual(d._freq, {0: 1})
+
+    def test_counts_survive_compaction(self):
+        d = TestClass(10, ((i, i) for i in range(10)), policy="lfu")
+        for _ in range(3):
+            d[0]
+        for i in range(10, 40):
+            d[[i]] = i
+            d.pop([i])
+        self.assertEqual(len(d._keys), 10)
+        d[[40]] = 40
+        self.assertIn(0, d)
+        self.assertNotIn(1, d)
+
+
+class TestFIFO(unittest.TestCase):
+    def test_evicts_oldest(self):
+        d = TestClass(3, [([1], "one"), (2, "two"), ([3], "three")], policy="fifo")
+        d[[1]]
+        d[[1]] = "uno"
+        d[4] = "four"
+        self.assertListEqual([2, [3], 4], list(d))
+        del d[2]
+        d[5] = "five"
+        d[6] = "six"
+        self.assertListEqual([4, 5, 6], list(d))
+
+
+class TestDictAnyKey(unittest.TestCase):
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            TestClass(0)
+        with self.assertRaises(ValueError):
+            TestClass(2, policy="mru")
+        d = TestClass(2, {1: "one", 2: "two", 3: "three"})
+        self.assertEqual(d, DictAnyKey({2: "two", 3: "three"}))
+
+    def test_fromkeys(self):
+        with self.assertRaises(TypeError):
+            TestClass.fromkeys([1, 2])
+        d = TestClass.fromkeys([1, [2], 3], 0, maxsize=2, policy="fifo")
+        self.assertEqual(repr(d), "LRUDictAnyKey(2, [([2], 0), (3, 0)], policy='fifo')")
+
+    def test_from_pairs_and_mapping(self):
+        pairs = [([i], i) for i in range(200)]
+        with self.assertRaises(TypeError):
+            TestClass.from_pairs(pairs)
+        with self.assertRaises(TypeError):
+            TestClass.from_mapping(DictAnyKey(pairs))
+        d = TestClass.from_pairs(pairs, maxsize=200)
+        self.assertEqual(d, DictAnyKey(pairs))
+        d = TestClass.from_mapping(DictAnyKey(pairs), maxsize=2, policy="lfu")
+        self.assertEqual(
+            repr(d), "LRUDictAnyKey(2, [([198], 198), ([199], 199)], policy='lfu')"
+        )
+
+    def test_repr_and_str(self):
+        d = TestClass(2, [(1, "one"), ([2], "two")], policy="fifo")
+        self.assertEqual(
+            repr(d), "LRUDictAnyKey(2, [(1, 'one'), ([2], 'two')], policy='fifo')"
+        )
+        self.assertEqual(str(d), "{1: 'one', [2]: 'two'}")
+
+    def test_eq_is_not_a_use(self):
+        pairs = [(1, "one"), ([2], "two"), (3, "three")]
+        d = TestClass(3, pairs)
+        d2 = TestClass(3, pairs)
+        others = (
+            d2,
+            DictAnyKey(pairs),
+            HamtDictAnyKey(pairs),
+            ConcurrentDictAnyKey(pairs),
+        )
+        for other in others:
+            with self.subTest(other=type(other).__name__):
+                version = d._version
+                self.assertEqual(d, other)
+                self.assertEqual(other, d)
+                self.assertFalse(d != other)
+                self.assertFalse(other != d)
+                self.assertListEqual([1, [2], 3], list(d))
+                self.assertListEqual([1, [2], 3], list(d2))
+                self.assertEqual(d._version, version)
+        iterator = iter(d)
+        next(iterator)
+        self.assertEqual(d2, d)
+        self.assertListEqual([[2], 3], list(iterator))
+
+    def test_equal_to_itself(self):
+        d = TestClass(3, [(1, "one"), ([2], "two")])
+        self.assertEqual(d, d)
+        self.assertListEqual([1, [2]], list(d))
+
+    def test_copy_and_pickle(self):
+        for policy in ("lru", "lfu", "fifo"):
+            d = TestClass(3, [(1, "one"), ([2], "two"), (3, "three")], policy=policy)
+            d[1]
+            d[1]
+            del d[[2]]
+            d[[4]] = "four"
+            for other in (d.copy(), pickle.loads(pickle.dumps(d))):
+                self.assertEqual(other.maxsize, 3)
+                self.assertEqual(other.policy, policy)
+                self.assertListEqual(list(d.items()), list(other.items()))
+                d2 = d.copy()
+                d2[5] = "five"
+                other[5] = "five"
+                self.assertListEqual(list(d2.items()), list(other.items()))
+            self.assertIn(3, d)
@@ -0,0 +1,207 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from dictanykey.fingerprints import register_key_adapter, unregister_key_adapter
+from dictanykey.memoize import CacheInfo, memoize_anykey
+
+
+class Opaque:
+    """Unhashable argument with no fingerprint."""
+
+    __hash__ = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Opaque) and other.value == self.value
+
+
+class Tolerant:
+    """Unhashable argument equal to values within 0.5."""
+
+    __hash__ = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Tolerant) and abs(other.value - self.value) < 0.5
+
+
+def counted(func):
+    """Wrap func, counting its calls in func.calls."""
+
+    def wrapper(*args, **kwargs):
+        wrapper.calls += 1
+        return func(*args, **kwargs)
+
+    wrapper.calls = 0
+    return wrapper
+
+
+class TestCaching(unittest.TestCase):
+    def test_unhashable_arguments(self):
+        inner = counted(lambda payload, scale=1: len(payload) * scale)
+        total = memoize_anykey()(inner)
+        self.assertEqual(total([1, 2, 3]), 3)
+        self.assertEqual(total([1, 2, 3]), 3)
+        self.assertEqual(total({"a": [1], "b": {2}}), 2)
+        self.assertEqual(total({"b": {2}, "a": [1]}), 2)
+        self.assertEqual(inner.calls, 2)
+        self.assertEqual(total.cache_info(), CacheInfo(2, 2, 128, 2))
+
+    def test_keyword_arguments(self):
+        inner = counted(lambda *args, **kwargs: (args, kwargs))
+        f = memoize_anykey()(inner)
+        f(1, a=[1], b=2)
+        f(1, b=2, a=[1])
+        self.assertEqual(inner.calls, 1)
+        # positional and keyword arguments are told apart
+        f(1, {"a": [1], "b": 2})
+        self.assertEqual(inner.calls, 2)
+
+    def test_equal_numbers_share_a_result(self):
+        inner = counted(lambda x: [x])
+        f = memoize_anykey()(inner)
+        self.assertEqual(f([1]), [[1]])
+        self.assertEqual(f([1.0]), [[1]])
+        self.assertEqual(inner.calls, 1)
+
+    def test_without_arguments(self):
+        @memoize_anykey
+        def f(x):
+            return x
+
+        self.assertEqual(f([1]), [1])
+        self.assertEqual(f.cache_parameters(), {"maxsize": 128, "ttl": None})
+        self.assertEqual(f.__name__, "f")
+
+    def test_arguments_without_fingerprint(self):
+        inner = counted(lambda x, scale=1: x.value * scale)
+        f = memoize_anykey()(inner)
+        self.assertEqual(f(Opaque(1)), 1)
+        self.assertEqual(f(Opaque(1)), 1)
+        self.assertEqual(f(Opaque(2)), 2)
+        self.assertEqual(f(Opaque(1), scale=2), 2)
+        self.assertEqual(f(Opaque(1), scale=2), 2)
+        self.assertEqual(inner.calls, 3)
+        self.assertEqual(f.cache_info(), CacheInfo(2, 3, 128, 3))
+        f.cache_clear()
+        f(Opaque(1))
+        self.assertEqual(inner.calls, 4)
+
+    def test_evicts_arguments_without_fingerprint(self):
+        inner = counted(lambda x: x)
+        f = memoize_anykey(maxsize=2)(inner)
+        f(Opaque(1))
+        f([2])
+        f(Opaque(3))  # evicts Opaque(1)
+        f(Opaque(3))
+        self.assertEqual(inner.calls, 3)
+        f(Opaque(1))
+        self.assertEqual(inner.calls, 4)
+        self.assertEqual(f.cache_info().currsize, 2)
+
+    @unittest.skipUnless(numpy, "numpy is not installed")
+    def test_arrays_with_inexact_adapters(self):
+        # call keys holding arrays are compared argument by argument
+        register_key_adapter(Tolerant, lambda t: round(t.value), Tolerant.__eq__)
+        try:
+            inner = counted(lambda array, t: float(array.sum()) + t.value)
+            f = memoize_anykey()(inner)
+            self.assertEqual(f(numpy.arange(3), Tolerant(1.0)), 4.0)
+            self.assertEqual(f(numpy.arange(3), Tolerant(1.1)), 4.0)
+            self.assertEqual(f(numpy.arange(3), Opaque(1)), 4.0)
+            self.assertEqual(f(numpy.arange(3), Opaque(1)), 4.0)
+            self.assertEqual(inner.calls, 2)
+        finally:
+            unregister_key_adapter(Tolerant)
+
+    def test_adapters_with_eq(self):
+        register_key_adapter(Tolerant, lambda t: round(t.value), Tolerant.__eq__)
+        try:
+            inner = counted(lambda items: items[0].value)
+            f = memoize_anykey()(inner)
+            self.assertEqual(f([Tolerant(1.4)]), 1.4)
+            self.assertEqual(f([Tolerant(1.3)]), 1.4)
+            self.assertEqual(inner.calls, 1)
+            # same fingerprint, but not equal
+            self.assertEqual(f([Tolerant(0.6)]), 0.6)
+            self.assertEqual(inner.calls, 2)
+        finally:
+            unregister_key_adapter(Tolerant)
+
+    def test_cache_clear(self):
+        f = memoize_anykey()(lambda x: x)
+        f([1])
+        f([1])
+        f.cache_clear()
+        self.assertEqual(f.cache_info(), CacheInfo(0, 0, 128, 0))
+
+
+class TestEviction(unittest.TestCase):
+    def test_least_recently_used_first(self):
+        inner = counted(lambda x: x)
+        f = memoize_anykey(maxsize=2)(inner)
+        f([1])
+        f([2])
+        f([1])
+        f([3])  # evicts [2]
+        f([1])
+        self.assertEqual(inner.calls, 3)
+        f([2])
+        self.assertEqual(inner.calls, 4)
+        self.assertEqual(f.cache_info().currsize, 2)
+
+    def test_maxsize_zero_and_none(self):
+        inner = counted(lambda x: x)
+        f = memoize_anykey(maxsize=0)(inner)
+        f([1])
+        f([1])
+        self.assertEqual(inner.calls, 2)
+        self.assertEqual(f.cache_info(), CacheInfo(0, 2, 0, 0))
+        g = memoize_anykey(maxsize=None)(lambda x: x)
+        for i in range(1000):
+            g([i])
+        self.assertEqual(g.cache_info().currsize, 1000)
+
+    def test_ttl(self):
+        inner = counted(lambda x: x)
+        f = memoize_anykey(ttl=10)(inner)
+        with patch("dictanykey.memoize.monotonic", return_value=100.0):
+            f([1])
+        with patch("dictanykey.memoize.monotonic", return_value=109.0):
+            f([1])
+        self.assertEqual(inner.calls, 1)
+        with patch("dictanykey.memoize.monotonic", return_value=110.5):
+            f([1])
+        self.assertEqual(inner.calls, 2)
+        self.assertEqual(f.cache_info(), CacheInfo(1, 2, 128, 1))
+
+
+class TestThreads(unittest.TestCase):
+    def test_concurrent_calls(self):
+        f = memoize_anykey(maxsize=50)(lambda x: sum(x["values"]))
+        errors = []
+
+        def call():
+            for i in range(500):
+                if f({"values": [i % 80, 1]}) != i % 80 + 1:
+                    errors.append(i)
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual([], errors)
+        info = f.cache_info()
+        self.assertEqual(info.hits + info.misses, 8 * 500)
+        self.assertLessEqual(info.currsize, 50)
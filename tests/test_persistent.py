@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from dictanykey.dictanykey import DictAnyKey
+from dictanykey.fingerprints import encode_key
+from dictanykey.persistent import PersistentDictAnyKey as TestClass
+
+
+class PersistentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "items.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class TestMapping(PersistentTestCase):
+    def test_items_in_insertion_order(self):
+        with TestClass(self.path) as d:
+            d[[1, 2]] = "list"
+            d[1] = "one"
+            d[{"a": 1}] = "dict"
+            d[1.0] = "uno"
+            self.assertListEqual(
+                [([1, 2], "list"), (1, "uno"), ({"a": 1}, "dict")],
+                d._get_items_list(),
+            )
+            self.assertEqual(len(d), 3)
+            self.assertEqual(d[{"a": 1}], "dict")
+            self.assertIn([1, 2], d)
+            self.assertNotIn([2, 1], d)
+
+    def test_delete(self):
+        with TestClass(self.path, [([1], "one"), (2, "two")]) as d:
+            del d[[1]]
+            self.assertListEqual([(2, "two")], d._get_items_list())
+            with self.assertRaises(KeyError):
+                del d[[1]]
+            d[[1]] = "uno"
+            self.assertListEqual([2, [1]], list(d))
+
+    def test_unencodable_keys(self):
+        with TestClass(self.path) as d:
+            with self.assertRaises(TypeError):
+                d[object()] = 1
+            self.assertNotIn(object(), d)
+            self.assertIsNone(d.get(object()))
+            with self.assertRaises(KeyError):
+                d[object()]
+
+    def test_popitem_and_clear(self):
+        with TestClass(self.path, [([1], "one"), (2, "two")]) as d:
+            self.assertEqual(d.popitem(), (2, "two"))
+            self.assertEqual(len(d), 1)
+            d.clear()
+            self.assertEqual(len(d), 0)
+            with self.assertRaises(KeyError):
+                d.popitem()
+
+    def test_update(self):
+        with TestClass(self.path, batch_size=2) as d:
+            d.update([([1], "a"), (2, "b"), ([1], "c"), (3, "d"), (4, "e")])
+            d.update(DictAnyKey([(2, "B"), ([5], "f")]))
+            self.assertListEqual(
+                [([1], "c"), (2, "B"), (3, "d"), (4, "e"), ([5], "f")],
+                d._get_items_list(),
+            )
+            self.assertEqual(len(d), 5)
+
+    def test_views_and_eq(self):
+        items = [([1], "one"), (2, "two")]
+        with TestClass(self.path, items) as d:
+            self.assertListEqual([[1], 2], list(d.keys()))
+            self.assertListEqual(["one", "two"], list(d.values()))
+            self.assertIn(([1], "one"), d.items())
+            self.assertEqual(d, DictAnyKey(items))
+            self.assertNotEqual(d, DictAnyKey(items[:1]))
+
+    def test_iterates_in_pages(self):
+        with TestClass(self.path, [([i], i) for i in range(2500)]) as d:
+            self.assertListEqual(list(range(2500)), list(d.values()))
+
+    def test_change_during_iteration(self):
+        with TestClass(self.path, [(1, 1), (2, 2)]) as d:
+            with self.assertRaises(RuntimeError):
+                for key in d:
+                    d[[key]] = key
+
+    def test_values_are_copies(self):
+        with TestClass(self.path, [([1], [])]) as d:
+            d[[1]].append("lost")
+            self.assertEqual(d[[1]], [])
+
+
+class TestStorage(PersistentTestCase):
+    def committed(self):
+        db = sqlite3.connect(self.path)
+        try:
+            return db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        finally:
+            db.close()
+
+    def test_reopen(self):
+        with TestClass(self.path) as d:
+            d[[1, "a"]] = {"v": 1}
+            d[2] = "two"
+        with TestClass(self.path) as d:
+            self.assertEqual(len(d), 2)
+            self.assertEqual(d[[1, "a"]], {"v": 1})
+            self.assertListEqual([[1, "a"], 2], list(d))
+
+    def test_batched_commits(self):
+        d = TestClass(self.path, batch_size=3)
+        d[1] = 1
+        d[2] = 2
+        self.assertEqual(self.committed(), 0)
+        d[3] = 3
+        self.assertEqual(self.committed(), 3)
+        d[4] = 4
+        d.flush()
+        self.assertEqual(self.committed(), 4)
+        d[5] = 5
+        d.close()
+        self.assertEqual(self.committed(), 5)
+
+    def test_dropped_without_close(self):
+        def write():
+            d = TestClass(self.path, batch_size=10)
+            d[[1]] = "one"
+            d[2] = "two"
+
+        write()
+        self.assertEqual(self.committed(), 2)
+        with TestClass(self.path) as d:
+            self.assertListEqual([([1], "one"), (2, "two")], d._get_items_list())
+
+    def test_bounded_cache(self):
+        with TestClass(self.path, [(i, i) for i in range(10)], cache_size=3) as d:
+            for i in range(10):
+                self.assertEqual(d[i], i)
+            self.assertEqual(len(d._cache), 3)
+            self.assertListEqual(
+                [encode_key(7), encode_key(8), encode_key(9)], list(d._cache)
+            )
+            d[9] = "nine"
+            self.assertEqual(d[9], "nine")
+            del d[8]
+            self.assertNotIn(8, d)
+            self.assertEqual(len(d._cache), 2)
+
+    def test_no_cache(self):
+        with TestClass(self.path, [(1, 1)], cache_size=0) as d:
+            self.assertEqual(d[1], 1)
+            self.assertEqual(len(d._cache), 0)
@@ -0,0 +1,129 @@
+import unittest
+from unittest.mock import patch
+
+from dictanykey import DictAnyKey, SetAnyKey
+
+
+class TestSetAnyKey(unittest.TestCase):
+    def test_members(self):
+        s = SetAnyKey([1, [1], 1, [1], {"a": 1}])
+        self.assertEqual(len(s), 3)
+        self.assertIn([1], s)
+        self.assertIn({"a": 1}, s)
+        self.assertNotIn([2], s)
+        self.assertEqual(list(s), [1, [1], {"a": 1}])
+
+    def test_add_discard(self):
+        s = SetAnyKey()
+        s.add([1])
+        s.add([1])
+        s.add(2)
+        self.assertEqual(list(s), [[1], 2])
+        s.discard([1])
+        s.discard([3])
+        self.assertEqual(list(s), [2])
+        with self.assertRaises(KeyError):
+            s.remove([3])
+
+    def test_equality(self):
+        self.assertEqual(SetAnyKey([1, 2]), {2, 1})
+        self.assertEqual(SetAnyKey([[1], 2]), SetAnyKey([2, [1]]))
+        self.assertNotEqual(SetAnyKey([[1]]), SetAnyKey([[2]]))
+
+    def test_operators(self):
+        a = SetAnyKey([1, 2, [1], [2]])
+        b = SetAnyKey([2, 3, [2], [3]])
+        self.assertEqual(a & b, SetAnyKey([2, [2]]))
+        self.assertEqual(a | b, SetAnyKey([1, 2, 3, [1], [2], [3]]))
+        self.assertEqual(a - b, SetAnyKey([1, [1]]))
+        self.assertEqual(a ^ b, SetAnyKey([1, 3, [1], [3]]))
+        self.assertIsInstance(a & b, SetAnyKey)
+
+    def test_in_place_operators(self):
+        a = SetAnyKey([1, [1]])
+        a |= [[2]]
+        self.assertEqual(a, SetAnyKey([1, [1], [2]]))
+        a -= [[1]]
+        self.assertEqual(a, SetAnyKey([1, [2]]))
+
+    def test_isdisjoint(self):
+        self.assertTrue(SetAnyKey([1, [1]]).isdisjoint([2, [2]]))
+        self.assertFalse(SetAnyKey([1, [1]]).isdisjoint([[1]]))
+        self.assertFalse(SetAnyKey([1, [1]]).isdisjoint([1]))
+
+    def test_copy_is_independent(self):
+        a = SetAnyKey([1, [1]])
+        b = a.copy()
+        b.add(2)
+        self.assertEqual(a, SetAnyKey([1, [1]]))
+        self.assertEqual(b, SetAnyKey([1, [1], 2]))
+
+    def test_repr(self):
+        self.assertEqual(repr(SetAnyKey([1, [1]])), "SetAnyKey([1, [1]])")
+
+
+class TestKeysView(unittest.TestCase):
+    def setUp(self):
+        self.a = DictAnyKey([(1, "a"), ([1], "b"), (2, "c"), ({"x": 1}, "d")])
+        self.b = DictAnyKey([(2, "c"), ([1], "z"), (3, "q")])
+
+    def test_contains(self):
+        self.assertIn([1], self.a.keys())
+        self.assertIn(2, self.a.keys())
+        self.assertNotIn([2], self.a.keys())
+
+    def test_operators(self):
+        a, b = self.a.keys(), self.b.keys()
+        self.assertEqual(a & b, SetAnyKey([2, [1]]))
+        self.assertEqual(a | b, SetAnyKey([1, 2, 3, [1], {"x": 1}]))
+        self.assertEqual(a - b, SetAnyKey([1, {"x": 1}]))
+        self.assertEqual(a ^ b, SetAnyKey([1, 3, {"x": 1}]))
+
+    def test_operators_with_other_iterables(self):
+        self.assertEqual(self.a.keys() & [[1], 5], SetAnyKey([[1]]))
+        self.assertEqual({1, 5} & self.a.keys(), SetAnyKey([1]))
+        self.assertEqual({1, 5} - self.a.keys(), SetAnyKey([5]))
+        self.assertEqual([[1], [9]] - self.a.keys(), SetAnyKey([[9]]))
+        self.assertEqual({5} | self.b.keys(), SetAnyKey([2, 3, 5, [1]]))
+
+    def test_comparisons(self):
+        d = DictAnyKey([(1, "a"), (2, "b")])
+        self.assertEqual(d.keys(), {1, 2})
+        self.assertTrue(d.keys() <= {1, 2, 3})
+        self.assertFalse(self.a.keys() <= self.b.keys())
+
+    def test_isdisjoint(self):
+        self.assertFalse(self.a.keys().isdisjoint(self.b.keys()))
+        self.assertTrue(self.a.keys().isdisjoint([[5], 7]))
+
+    def test_does_not_copy_keys(self):
+        d = DictAnyKey.fromkeys(range(10))
+        with patch.object(DictAnyKey, "_get_keys_list", side_effect=AssertionError):
+            self.assertIn(5, d.keys())
+            self.assertEqual(len(d.keys() & {5, 50}), 1)
+
+
+class TestItemsView(unittest.TestCase):
+    def setUp(self):
+        self.a = DictAnyKey([(1, "a"), ([1], "b"), (2, [2])])
+        self.b = DictAnyKey([(1, "a"), ([1], "z"), (2, [2])])
+
+    def test_contains(self):
+        items = self.a.items()
+        self.assertIn(([1], "b"), items)
+        self.assertIn((2, [2]), items)
+        self.assertNotIn(([1], "z"), items)
+        self.assertNotIn(([5], "b"), items)
+        self.assertNotIn("not a pair", items)
+        self.assertNotIn(5, items)
+
+    def test_operators(self):
+        a, b = self.a.items(), self.b.items()
+        self.assertEqual(a & b, SetAnyKey([(1, "a"), (2, [2])]))
+        self.assertEqual(a - b, SetAnyKey([([1], "b")]))
+        self.assertEqual(a ^ b, SetAnyKey([([1], "b"), ([1], "z")]))
+        self.assertEqual(len(a | b), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import dictanykey
+from dictanykey.frozen_dictanykey import FrozenDictAnyKey
+from dictanykey.shared import dumps
+
+ITEMS = [
+    (1, "one"),
+    ([2, "b"], {"two": 2}),
+    ({"a": 1, "b": [3]}, [3]),
+    ("x", None),
+    ((4, 4.5), b"four"),
+]
+
+
+class SharedTestCase(unittest.TestCase):
+    def setUp(self):
+        self.frozen = FrozenDictAnyKey(ITEMS)
+        self.shared = self.frozen.export()
+
+    def tearDown(self):
+        self.shared.close()
+        self.shared.unlink()
+
+
+class TestLookup(SharedTestCase):
+    def test_getitem(self):
+        for key, value in ITEMS:
+            self.assertEqual(self.shared[key], value)
+        self.assertEqual(self.shared[{"b": [3], "a": 1}], [3])
+        self.assertEqual(self.shared[1.0], "one")
+        with self.assertRaises(KeyError):
+            self.shared[[2]]
+
+    def test_get_and_contains(self):
+        self.assertEqual(self.shared.get([2, "b"]), {"two": 2})
+        self.assertIsNone(self.shared.get("y"))
+        self.assertEqual(self.shared.get("y", 0), 0)
+        self.assertIn((4, 4.5), self.shared)
+        self.assertNotIn((4, 4), self.shared)
+        # keys without a canonical encoding cannot have been exported
+        self.assertNotIn(object(), self.shared)
+
+    def test_views_keep_order(self):
+        self.assertEqual(len(self.shared), len(ITEMS))
+        self.assertListEqual([key for key, _ in ITEMS], list(self.shared))
+        self.assertListEqual([value for _, value in ITEMS], list(self.shared.values()))
+        self.assertListEqual(ITEMS, list(self.shared.items()))
+        self.assertIn(([2, "b"], {"two": 2}), self.shared.items())
+
+    def test_eq(self):
+        self.assertEqual(self.shared, self.frozen)
+        self.assertEqual(FrozenDictAnyKey(self.shared), self.frozen)
+        self.assertNotEqual(self.shared, FrozenDictAnyKey(ITEMS[1:]))
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.shared[1] = "uno"  # type: ignore
+
+
+class TestAttach(SharedTestCase):
+    def test_attach_by_name(self):
+        with FrozenDictAnyKey.attach(self.shared.name) as other:
+            self.assertEqual(other, self.frozen)
+            self.assertEqual(repr(other), f"SharedDictAnyKey({self.shared.name!r})")
+
+    def test_pickles_as_attachment(self):
+        with pickle.loads(pickle.dumps(self.shared)) as other:
+            self.assertEqual(other.name, self.shared.name)
+            self.assertEqual(other[[2, "b"]], {"two": 2})
+
+    def test_other_process(self):
+        root = os.path.dirname(os.path.dirname(dictanykey.__file__))
+        code = (
+            "import sys\n"
+            "from dictanykey import FrozenDictAnyKey\n"
+            "table = FrozenDictAnyKey.attach(sys.argv[1])\n"
+            "print(table[{'a': 1, 'b': [3]}], len(table))\n"
+            "table.close()\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code, self.shared.name],
+            env={**os.environ, "PYTHONPATH": root},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(output.stdout, "[3] 5\n")
+        # the segment outlives processes that attached to it
+        self.assertEqual(self.shared[1], "one")
+        with FrozenDictAnyKey.attach(self.shared.name) as other:
+            self.assertEqual(len(other), 5)
+
+
+class TestFile(unittest.TestCase):
+    def test_export_to_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "table.dak")
+            frozen = FrozenDictAnyKey(ITEMS)
+            frozen.export(path=path).close()
+            with FrozenDictAnyKey.attach(path=path) as table:
+                self.assertEqual(table, frozen)
+                self.assertEqual(table[[2, "b"]], {"two": 2})
+                self.assertEqual(repr(table), f"SharedDictAnyKey(path={path!r})")
+
+    def test_not_exported(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "other")
+            with open(path, "wb") as file:
+                file.write(bytes(64))
+            with self.assertRaises(ValueError):
+                FrozenDictAnyKey.attach(path=path)
+
+
+class TestExport(unittest.TestCase):
+    def test_empty(self):
+        shared = FrozenDictAnyKey().export()
+        try:
+            self.assertEqual(len(shared), 0)
+            self.assertNotIn(1, shared)
+            self.assertListEqual([], list(shared))
+        finally:
+            shared.close()
+            shared.unlink()
+
+    def test_many_keys(self):
+        frozen = FrozenDictAnyKey(([i, str(i)], i) for i in range(5000))
+        with frozen.export() as shared:
+            shared.unlink()
+            for i in range(0, 5000, 7):
+                self.assertEqual(shared[[i, str(i)]], i)
+            self.assertNotIn([5000, "5000"], shared)
+            self.assertListEqual(list(range(5000)), list(shared.values()))
+
+    def test_keys_without_encoding(self):
+        with self.assertRaises(TypeError):
+            FrozenDictAnyKey([(object(), 1)]).export()
+
+    def test_keys_encoding_alike(self):
+        with self.assertRaises(ValueError):
+            dumps([(1, "a"), (1.0, "b")])
+
+    def test_name_or_path(self):
+        with self.assertRaises(TypeError):
+            FrozenDictAnyKey().export(name="a", path="b")
+        with self.assertRaises(TypeError):
+            FrozenDictAnyKey.attach()
+
+    def test_outlives_exporting_process(self):
+        root = os.path.dirname(os.path.dirname(dictanykey.__file__))
+        code = (
+            "from dictanykey import FrozenDictAnyKey\n"
+            "table = FrozenDictAnyKey([([1], 'one')]).export()\n"
+            "print(table.name)\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONPATH": root},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # no leaked segment warning, nor BufferError closing the segment
+        self.assertEqual(output.stderr, "")
+        with FrozenDictAnyKey.attach(output.stdout.strip()) as table:
+            table.unlink()
+            self.assertEqual(table[[1]], "one")
+
+    def test_imported_on_first_use(self):
+        root = os.path.dirname(os.path.dirname(dictanykey.__file__))
+        code = (
+            "import sys\n"
+            "import dictanykey\n"
+            "heavy = ['sqlite3', 'mmap', 'multiprocessing.shared_memory']\n"
+            "print([name for name in heavy if name in sys.modules])\n"
+            "print(dictanykey.SharedDictAnyKey.__name__)\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONPATH": root},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(output.stdout, "[]\nSharedDictAnyKey\n")
@@ -0,0 +1,137 @@
+import pickle
+import threading
+import time
+import unittest
+
+from dictanykey.dictanykey import DictAnyKey
+from dictanykey.frozen_dictanykey import FrozenDictAnyKey
+from dictanykey.snapshot import SnapshotDictAnyKey as TestClass
+
+
+class TestReads(unittest.TestCase):
+    def test_mapping(self):
+        d = TestClass([([1], "one"), (2, "two")])
+        self.assertEqual(d[[1]], "one")
+        self.assertEqual(d.get([3], "default"), "default")
+        self.assertIn(2, d)
+        self.assertEqual(len(d), 2)
+        self.assertListEqual([[1], 2], list(d))
+        self.assertListEqual(["one", "two"], list(d.values()))
+        self.assertIn(([1], "one"), d.items())
+        self.assertEqual(d, DictAnyKey([(2, "two"), ([1], "one")]))
+        with self.assertRaises(KeyError):
+            d[[3]]
+
+    def test_snapshot_is_immutable_and_consistent(self):
+        d = TestClass([([1], "one")])
+        before = d.snapshot()
+        self.assertIsInstance(before, FrozenDictAnyKey)
+        d[[1]] = "uno"
+        d[[2]] = "two"
+        self.assertEqual(before, DictAnyKey([([1], "one")]))
+        self.assertEqual(d.snapshot(), DictAnyKey([([1], "uno"), ([2], "two")]))
+
+    def test_repr_and_str(self):
+        d = TestClass([(1, "one"), ([2], "two")])
+        self.assertEqual(repr(d), "SnapshotDictAnyKey([(1, 'one'), ([2], 'two')])")
+        self.assertEqual(str(d), "{1: 'one', [2]: 'two'}")
+
+    def test_pickle(self):
+        d = TestClass([(1, "one"), ([2], "two")], window=5.0)
+        loaded = pickle.loads(pickle.dumps(d))
+        self.assertEqual(loaded, d)
+        self.assertEqual(loaded._window, 5.0)
+
+
+class TestWrites(unittest.TestCase):
+    def test_published_at_once_by_default(self):
+        d = TestClass()
+        d[[1]] = "one"
+        d.update([(2, "two"), ([3], "three")])
+        del d[2]
+        self.assertListEqual([([1], "one"), ([3], "three")], list(d.items()))
+        with self.assertRaises(KeyError):
+            del d[2]
+        d.clear()
+        self.assertEqual(len(d), 0)
+
+    def test_batch_publishes_once(self):
+        d = TestClass([(1, "one")])
+        first = d.snapshot()
+        with d.batch():
+            d[[2]] = "two"
+            with d.batch():
+                del d[1]
+            self.assertIs(d.snapshot(), first)
+        self.assertListEqual([([2], "two")], list(d.items()))
+
+    def test_failed_batch_is_discarded(self):
+        d = TestClass([(1, "one")])
+        with self.assertRaises(ValueError):
+            with d.batch():
+                d[[2]] = "two"
+                del d[1]
+                raise ValueError
+        self.assertListEqual([(1, "one")], list(d.items()))
+        d[3] = "three"
+        self.assertListEqual([(1, "one"), (3, "three")], list(d.items()))
+
+    def test_window(self):
+        d = TestClass(window=0.05)
+        d[[1]] = "one"
+        d[[2]] = "two"
+        self.assertEqual(len(d), 0)
+        timer = d._timer
+        timer.join()
+        self.assertListEqual([[1], [2]], list(d))
+        self.assertIsNone(d._timer)
+
+    def test_flush(self):
+        d = TestClass(window=60.0)
+        d[[1]] = "one"
+        self.assertNotIn([1], d)
+        d.flush()
+        self.assertIn([1], d)
+        self.assertIsNone(d._timer)
+
+    def test_published_versions_are_not_changed(self):
+        d = TestClass((i, i) for i in range(10))
+        versions = []
+        for i in range(10):
+            versions.append(d.snapshot())
+            if i % 2:
+                del d[i]
+            else:
+                d[[i]] = i
+        for i in range(10):
+            d[i] = -i
+        self.assertListEqual(list(range(10)), list(versions[0].values()))
+        self.assertEqual(len(versions[2]), 10)
+        self.assertNotIn(1, versions[2])
+
+
+class TestThreads(unittest.TestCase):
+    def test_readers_see_whole_batches(self):
+        d = TestClass([("a", 0), (["b"], 0)])
+        stop = threading.Event()
+        torn = []
+
+        def read():
+            while not stop.is_set():
+                snapshot = d.snapshot()
+                if snapshot["a"] != snapshot[["b"]]:
+                    torn.append(snapshot)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for i in range(1, 200):
+            with d.batch():
+                d["a"] = i
+                d[["b"]] = i
+        time.sleep(0.01)
+        stop.set()
+        for reader in readers:
+            reader.join()
+        self.assertListEqual([], torn)
+        self.assertEqual(d["a"], 199)
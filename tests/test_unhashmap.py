@@ -222,3 +222,102 @@ class TestGetMethod(unittest.TestCase):
         self.assertEqual(value, "NaN")
         value = TestGetItem.d.get({1: "ONE"}, "Missing")
         self.assertEqual(value, "Missing")
+
+
+class Unhashable:
+    __hash__ = None  # type: ignore
+
+    def __init__(self, n):
+        self.n = n
+
+    def __eq__(self, other):
+        return isinstance(other, Unhashable) and self.n == other.n
+
+
+class ListSubclass(list):
+    pass
+
+
+class TestBuckets(unittest.TestCase):
+    def test_bucketed_lookup(self):
+        d = TestClass([([i], i) for i in range(100)])
+        self.assertEqual(d[[42]], 42)
+        self.assertEqual(len(d._buckets), 100)
+        self.assertEqual(d.stats()["unbucketed"], 0)
+
+    def test_unbucketed_fallback(self):
+        d = TestClass([(Unhashable(1), "one"), ([2], "two")])
+        self.assertEqual(d[Unhashable(1)], "one")
+        self.assertEqual(d.stats()["foreign"], 1)
+        del d[Unhashable(1)]
+        self.assertEqual(d._foreign, {})
+        self.assertNotIn(Unhashable(1), d)
+
+    def test_subclass_probe_finds_list(self):
+        d = TestClass([([1, 2], "one two")])
+        self.assertEqual(d[ListSubclass([1, 2])], "one two")
+
+    def test_delete_empties_bucket(self):
+        d = TestClass([([1], "one"), ({"a": 1}, "a")])
+        del d[[1]]
+        del d[{"a": 1}]
+        self.assertEqual(d._buckets, {})
+        self.assertEqual(len(d), 0)
+
+    def test_order_after_delete(self):
+        d = TestClass([([1], "one"), ([2], "two"), ([3], "three")])
+        del d[[2]]
+        d[[2]] = "two again"
+        self.assertListEqual([[1], [3], [2]], d._get_keys_list())
+
+
+class Opaque:
+    """Hashable item that makes its container fingerprint-free."""
+
+    __hash__ = None  # type: ignore
+
+    def __init__(self, n):
+        self.n = n
+
+    def __eq__(self, other):
+        return isinstance(other, Opaque) and self.n == other.n
+
+
+class TestPartitions(unittest.TestCase):
+    def test_unbucketed_probe_scans_its_partition(self):
+        keys = [[Opaque(i)] for i in range(20)]
+        keys += [[Opaque(i), Opaque(i)] for i in range(20)]
+        keys += [{"a": Opaque(i)} for i in range(20)]
+        d = TestClass([(key, i) for i, key in enumerate(keys)])
+        d.reset_stats()
+        self.assertEqual(d[[Opaque(19)]], 19)
+        self.assertEqual(d.stats()["comparisons"], 20)
+        self.assertNotIn([Opaque(1), Opaque(2), Opaque(3)], d)
+        self.assertEqual(d.stats()["comparisons"], 20)
+
+    def test_bucketed_probe_skips_other_partitions(self):
+        d = TestClass([([Opaque(i)], i) for i in range(20)])
+        d[[1, 2]] = "one two"
+        d.reset_stats()
+        self.assertEqual(d[[1, 2]], "one two")
+        self.assertNotIn([3, 4], d)
+        self.assertNotIn([3], d)
+        stats = d.stats()
+        self.assertEqual(stats["lookups"], 3)
+        self.assertEqual(stats["comparisons"], 20)
+
+    def test_foreign_keys_always_compared(self):
+        d = TestClass([(Unhashable(1), "one")])
+        d[[1]] = "list"
+        d.reset_stats()
+        self.assertNotIn([2], d)
+        self.assertEqual(d.stats()["comparisons"], 1)
+
+    def test_remove_cleans_partitions(self):
+        d = TestClass([([Opaque(1)], 1), ([2], 2), (Unhashable(3), 3)])
+        del d[[Opaque(1)]]
+        del d[[2]]
+        del d[Unhashable(3)]
+        self.assertEqual(d._partitions, {})
+        self.assertEqual(d._unbucketed, {})
+        self.assertEqual(d._foreign, {})